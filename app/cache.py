@@ -0,0 +1,260 @@
+"""TwoTierCache: in-process TTL-LRU in front of Redis, invalidated in every worker over Redis pub/sub.
+
+Values are msgpack-encoded in Redis and kept decoded in process, so a local hit is a dict lookup with no
+I/O or decoding. invalidate() deletes the Redis entry, bumps `{namespace}:{key}:gen` and publishes
+`{namespace}:{key}` on CACHE_INVALIDATION_CHANNEL; each worker's listener (started in the app lifespan)
+evicts its local copy. Local entries also expire after `local_ttl`, which bounds staleness while the
+listener is disconnected; on reconnect the local tiers are cleared because invalidations may have been missed.
+
+A value computed from the database is stored with the version() taken before the read, so a write that
+raced an invalidation is dropped instead of caching the old value for the full TTL:
+
+    adaptation_cache = TwoTierCache("adaptation", ttl=CACHE_ADAPTATION_TTL)
+    rules, version = await asyncio.gather(adaptation_cache.get(child_id), adaptation_cache.version(child_id))
+    if rules is None:
+        rules = derive(await load_profile(db, child_id))
+        await adaptation_cache.set(child_id, asdict(rules), version)
+    after_commit(db, lambda: adaptation_cache.invalidate(child_id))
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import msgpack
+import structlog
+
+from app.constants import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_LOCAL_MAX_ENTRIES,
+    CACHE_LOCAL_TTL,
+)
+from app.redis_client import batched, get_redis, pubsub_client
+
+logger = structlog.get_logger()
+
+# Caches by namespace, for the invalidation listener
+_caches: dict[str, "TwoTierCache"] = {}
+_listener: asyncio.Task | None = None
+
+# Seconds between listener reconnect attempts
+_RECONNECT_SECONDS = 5.0
+
+# KEYS: entry, generation. ARGV: value, generation seen by version() ('' = none), ttl s.
+_SET_IF_CURRENT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+class TwoTierCache:
+    """Cache for one namespace. `load` turns the stored (msgpack-decoded) value into what get() returns."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        local_ttl: float = CACHE_LOCAL_TTL,
+        max_entries: int = CACHE_LOCAL_MAX_ENTRIES,
+        load: Callable[[Any], Any] | None = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self._load = load or (lambda value: value)
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # Bumped on every eviction; a Redis read that raced one is not stored locally
+        self._generation = 0
+        self._scripts: dict = {}
+        self._client = None
+        _caches[namespace] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}:gen"
+
+    def _script(self, redis, name: str, source: str):
+        if redis is not self._client:
+            self._client, self._scripts = redis, {}
+        if name not in self._scripts:
+            self._scripts[name] = redis.register_script(source)
+        return self._scripts[name]
+
+    def get_local(self, key) -> Any | None:
+        """The in-process value, or None. No I/O."""
+        key = str(key)
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _put_local(self, key: str, value: Any) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, key) -> Any | None:
+        """Local tier, then Redis (batched with concurrent reads); None on a miss or Redis error."""
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        redis = get_redis()
+        if not redis:
+            return None
+        key = str(key)
+        generation = self._generation
+        try:
+            raw = await batched(redis).get(self._redis_key(key))
+            if not raw:
+                return None
+            value = self._load(msgpack.unpackb(raw))
+        except Exception:
+            return None
+        if generation == self._generation:
+            self._put_local(key, value)
+        return value
+
+    async def version(self, key) -> tuple[int, bytes]:
+        """Token for set(), taken before reading what the value is computed from (batched with concurrent reads)."""
+        generation = self._generation
+        redis = get_redis()
+        if not redis:
+            return generation, b""
+        try:
+            stamp = await batched(redis).get(self._generation_key(str(key)))
+        except Exception:
+            stamp = None
+        return generation, stamp or b""
+
+    async def versions(self, keys) -> dict[str, tuple[int, bytes]]:
+        """version() for several keys, in one batched Redis round trip."""
+        keys = [str(k) for k in keys]
+        return dict(zip(keys, await asyncio.gather(*(self.version(k) for k in keys))))
+
+    async def set(self, key, stored: Any, version: tuple[int, bytes] | None = None) -> None:
+        """Store `stored` (msgpack-serialisable) in Redis and its loaded form locally.
+
+        With a `version`, nothing is stored where the key was invalidated since the version was taken.
+        """
+        await self.set_many({key: stored}, None if version is None else {key: version})
+
+    async def get_many(self, keys) -> dict[str, Any]:
+        """Values for the keys that are cached (local tier, then one batched Redis round trip)."""
+        keys = [str(k) for k in keys]
+        values = await asyncio.gather(*(self.get(k) for k in keys))
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    async def set_many(self, stored: dict[Any, Any], versions: dict[Any, tuple[int, bytes]] | None = None) -> None:
+        """set() for several keys in one pipeline; `versions` (from versions()) are by str(key)."""
+        if not stored:
+            return
+        stored = {str(k): v for k, v in stored.items()}
+        versions = None if versions is None else {str(k): v for k, v in versions.items()}
+        for key, value in stored.items():
+            if versions is None or versions[key][0] == self._generation:
+                self._put_local(key, self._load(value))
+        redis = get_redis()
+        if not redis:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, value in stored.items():
+                    if versions is None:
+                        pipe.set(self._redis_key(key), msgpack.packb(value), ex=self.ttl)
+                    else:
+                        await self._script(redis, "set", _SET_IF_CURRENT)(
+                            keys=[self._redis_key(key), self._generation_key(key)],
+                            args=[msgpack.packb(value), versions[key][1], self.ttl],
+                            client=pipe,
+                        )
+                await pipe.execute()
+        except Exception:
+            pass
+
+    def evict_local(self, key=None) -> None:
+        """Drop one local entry (or all of them)."""
+        self._generation += 1
+        if key is None:
+            self._local.clear()
+        else:
+            self._local.pop(str(key), None)
+
+    async def invalidate(self, key) -> None:
+        """Delete the entry in Redis and in every worker's local tier. Call after the change commits."""
+        key = str(key)
+        self.evict_local(key)
+        redis = get_redis()
+        if not redis:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.incr(self._generation_key(key))
+                # Outlives any in-flight set() holding the old version
+                pipe.expire(self._generation_key(key), self.ttl)
+                pipe.delete(self._redis_key(key))
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._redis_key(key))
+                await pipe.execute()
+        except Exception:
+            pass
+
+
+def _evict_all() -> None:
+    for cache in _caches.values():
+        cache.evict_local()
+
+
+async def _listen() -> None:
+    while True:
+        if not get_redis():
+            return
+        # Own client: an idle subscription must not hit the shared pool's socket timeout
+        redis = pubsub_client()
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                # Invalidations published while unsubscribed were missed
+                _evict_all()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    namespace, _, key = (data.decode() if isinstance(data, bytes) else data).partition(":")
+                    cache = _caches.get(namespace)
+                    if cache is not None:
+                        cache.evict_local(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("cache_invalidation_listener_failed", error=str(e))
+        finally:
+            await redis.aclose()
+        _evict_all()
+        await asyncio.sleep(_RECONNECT_SECONDS)
+
+
+def start_invalidation_listener() -> None:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen())
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
@@ -15,6 +15,11 @@ class Settings(BaseSettings):
 
     # Redis
     redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 50  # per worker; callers wait up to redis_pool_timeout for a free connection
+    redis_pool_timeout: float = 2.0
+    redis_socket_timeout: float = 2.0
+    redis_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30  # seconds idle before a connection is PINGed on checkout
 
     # Google AI Studio (embeddings + chat) — set GOOGLE_API_KEY in .env
     google_api_key: str = ""
@@ -27,15 +32,39 @@ class Settings(BaseSettings):
     jwt_access_expire_minutes: int = 480
     jwt_refresh_expire_days: int = 30
 
+    # Caregivers who may export every child's data (JSON list of emails); the stored role is never trusted for this
+    admin_emails: list[str] = []
+
+    # Password hashing (bcrypt runs in a bounded thread pool; existing hashes are upgraded on login)
+    bcrypt_rounds: int = 12
+    bcrypt_workers: int = 4
+    bcrypt_max_pending: int = 64
+    bcrypt_per_ip_concurrency: int = 0  # 0 = no per-client limit
+
     # RAG
     rag_retrieve_top_k: int = 20
     rag_rerank_top_n: int = 5
     llm_max_tokens: int = 700
     llm_temperature: float = 0.35
 
-    # Usage limits (shown in UI; approximate free-tier limits)
+    # LLM admission control (see app/services/llm_scheduler.py)
+    llm_max_concurrency: int = 8
+    llm_max_queue: int = 32
+    llm_deadline_seconds: float = 20.0  # per ask: embedding + LLM (queue, retries); then the fallback answers
+    llm_hedge_budget_fraction: float = 0.05  # share of llm_daily_limit usable for hedged calls; 0 = no hedging
+
+    # Usage limits (enforced per model by the quota limiter and shown in UI; approximate free-tier limits)
     llm_daily_limit: int = 60
     embed_daily_limit: int = 500
+    llm_rpm_limit: int = 15
+    embed_rpm_limit: int = 100
+
+    # TimescaleDB retention (days of raw rows kept; 0 = keep forever)
+    signals_retention_days: int = 0
+    interactions_retention_days: int = 0
+
+    # FSRS: recall probability at which a topic falls due (higher = more reviews)
+    fsrs_target_retention: float = 0.9
 
 
 _settings: Settings | None = None
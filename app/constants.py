@@ -41,14 +41,87 @@ RERANK_SENSORY_THRESHOLD_FACTOR = 0.8
 # Redis TTLs (seconds)
 CACHE_ADAPTATION_TTL = 30 * 60        # 30 min
 CACHE_EMBEDDING_TTL = 24 * 3600       # 24 h
-CACHE_MASTERY_WEAK_TTL = 10 * 60      # 10 min
 CACHE_SESSION_ACTIVE_TTL = 4 * 3600   # 4 h
+CACHE_TIMELINE_TTL = 15 * 60         # 15 min
+CACHE_PROGRESS_TTL = 15 * 60         # 15 min
+CACHE_FSRS_WEIGHTS_TTL = 3600        # 1 h
+CACHE_REVIEW_INDEX_TTL = 24 * 3600   # 24 h, refreshed on every write
+CACHE_CHILD_OWNERSHIP_TTL = 3600     # 1 h
 
-# Rate limit
-LEARN_ASK_RATE_LIMIT_PER_MINUTE = 30
+# In-process tier of TwoTierCache (app/cache.py); invalidations are broadcast on the channel
+CACHE_LOCAL_TTL = 60                 # bounds staleness if an invalidation is missed
+CACHE_LOCAL_MAX_ENTRIES = 10_000
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
 
-# FSRS-4.5 default weights (pretrained)
+# Derived AdaptationRules kept per distinct profile fingerprint (app/services/accessibility.py)
+ADAPTATION_MEMO_SIZE = 4096
+
+# TimescaleDB policies (compression after, continuous aggregate refresh window)
+TS_SIGNALS_COMPRESS_AFTER = "1 day"
+TS_INTERACTIONS_COMPRESS_AFTER = "7 days"
+TS_AGGREGATE_REFRESH_START = "3 days"
+TS_AGGREGATE_REFRESH_END = "1 hour"
+TS_AGGREGATE_REFRESH_EVERY = "30 minutes"
+
+# Progress report window
+PROGRESS_REPORT_PERIOD_DAYS = 30
+
+# Bulk export (rows per server-side cursor fetch / output batch)
+EXPORT_BATCH_ROWS = 5000
+
+# Auth principal cache (in-process LRU of verified access tokens)
+AUTH_PRINCIPAL_CACHE_SIZE = 10_000
+AUTH_PRINCIPAL_CACHE_MAX_TTL = 5 * 60
+
+# Rate limits (GCRA, see app/rate_limit.py)
+LEARN_ASK_RATE_LIMIT_PER_MINUTE = 30             # per child
+LEARN_ASK_CAREGIVER_RATE_LIMIT_PER_MINUTE = 90   # per caregiver, across their children
+
+# Circuit breaker around Google AI calls (per operation: llm, embed)
+CIRCUIT_WINDOW_SECONDS = 60          # failure rate is measured over this sliding window...
+CIRCUIT_BUCKET_SECONDS = 10          # ...in buckets of this size
+CIRCUIT_MIN_CALLS = 10               # don't trip on fewer calls than this in the window
+CIRCUIT_FAILURE_RATE = 0.5
+CIRCUIT_OPEN_SECONDS = 30            # then half-open: one probe call decides
+CIRCUIT_PROBE_TIMEOUT_SECONDS = 30   # a probe that never reports back frees the slot after this
+
+# LLM hedging: a second call is sent once the first is slower than this quantile of recent latencies
+LLM_HEDGE_QUANTILE = 0.95
+LLM_HEDGE_MIN_SAMPLES = 20   # no hedging until this many latencies are known
+LLM_HEDGE_SAMPLES = 200      # latencies kept
+
+# Usage breakdowns (per child / caregiver / minute) are flushed to Redis this often
+USAGE_FLUSH_SECONDS = 1.0
+
+# Quota degradation: fraction of the daily budget left below which answers get shorter / embeddings are
+# served from cache only (uncached questions are answered without retrieved content)
+QUOTA_SHORT_OUTPUT_BELOW = 0.2
+QUOTA_CACHE_ONLY_BELOW = 0.1
+
+# Mastery below this counts as a weak topic (prompt focus, reranker boost)
+MASTERY_WEAK_THRESHOLD = 0.5
+
+# POST /api/learn/feedback:batch
+FEEDBACK_BATCH_MAX_ITEMS = 200
+
+# POST /api/sessions/start:batch (one class)
+SESSION_START_BATCH_MAX_CHILDREN = 50
+
+# FSRS-4.5 default weights (pretrained). w[0..3] initial stability per rating, w[4..7] difficulty,
+# w[8..10] recall stability, w[11..14] post-lapse stability, w[15] hard penalty, w[16] easy bonus;
+# w[17..18] are FSRS-5 same-day terms, kept so fitted 19-weight sets load unchanged.
 FSRS_W = [
-    0.4072, 1.1829, 3.1264, 15.4722, 7.8958, 0.0, 0.0, 0.0, 0.0, 0.0,
-    0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474, 0.1367,
+    1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755, 0.5034, 0.6567,
 ]
+FSRS_TARGET_RETENTION = 0.90
+FSRS_MAX_INTERVAL_DAYS = 36500
+
+# FSRS optimizer (offline fit from review_logs)
+FSRS_OPT_MIN_REVIEWS = 200       # fewer graded reviews than this -> keep the inherited weights
+FSRS_OPT_MAX_SEQUENCE = 64       # reviews per (child, topic) replayed; older ones are dropped
+FSRS_OPT_ITERATIONS = 150
+FSRS_OPT_LEARNING_RATE = 0.02
+
+# FSRS simulator: LLM calls expected per review (one /learn/ask per reviewed topic)
+FSRS_SIM_LLM_CALLS_PER_REVIEW = 1.0
@@ -1,10 +1,18 @@
 """Async database engine and session factory."""
 
+import re
+from typing import Awaitable, Callable
+
+import structlog
+from sqlalchemy import TextClause, event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
 
 from app.config import get_settings
 from app.models import Base
 
+logger = structlog.get_logger()
+
 _settings = get_settings()
 engine = create_async_engine(
     _settings.database_url,
@@ -21,3 +29,65 @@ async_session_factory = async_sessionmaker(
     autocommit=False,
     autoflush=False,
 )
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session: Session, flush_context) -> None:
+    session.info["writes"] = True
+
+
+# Raw SQL that only reads; any other text() statement (DML, DDL, CALL) counts as a write
+_READ_SQL = re.compile(r"\s*(SELECT|SHOW|EXPLAIN)\b", re.IGNORECASE)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_execute(state: ORMExecuteState) -> None:
+    # Core insert/update/delete and text() bypass the flush, so classify the statement itself
+    statement = state.statement
+    if state.is_insert or state.is_update or state.is_delete or (
+        isinstance(statement, TextClause) and not _READ_SQL.match(statement.text)
+    ):
+        state.session.info["writes"] = True
+
+
+def has_writes(session: AsyncSession) -> bool:
+    """True if the session flushed or executed a write, or holds unflushed changes."""
+    return bool(
+        session.info.get("writes")
+        or session.info.get("after_commit")
+        or session.new
+        or session.dirty
+        or session.deleted
+    )
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """Return the session's pool connection before slow non-DB work (LLM, embedding calls).
+
+    A read-only transaction is committed, so loaded objects stay usable (expire_on_commit=False) and the next
+    query takes a connection again. A session with writes keeps its transaction: ending it early would
+    change what the request commits.
+    """
+    if session.in_transaction() and not has_writes(session):
+        await session.commit()
+
+
+def after_commit(session: AsyncSession, hook: Callable[[], Awaitable[None]]) -> None:
+    """Run hook once this session's transaction has committed; dropped if it rolls back.
+
+    For derived state kept outside Postgres (Redis summaries) that must not reflect uncommitted writes.
+    """
+    session.info.setdefault("after_commit", []).append(hook)
+
+
+async def commit_and_run_hooks(session: AsyncSession) -> None:
+    await session.commit()
+    for hook in session.info.pop("after_commit", []):
+        try:
+            await hook()
+        except Exception as e:
+            logger.warning("after_commit_hook_failed", error=str(e))
+
+
+def discard_hooks(session: AsyncSession) -> None:
+    session.info.pop("after_commit", None)
@@ -1,32 +1,75 @@
-"""FastAPI Depends: get_current_user, get_child."""
+"""FastAPI Depends: get_db, read_only, get_current_user, get_child, ensure_child_access."""
 
+from typing import AsyncIterator
 from uuid import UUID
 
+import structlog
+
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import async_session_factory, commit_and_run_hooks, discard_hooks, has_writes
 from app.models import Caregiver, ChildProfile
 from app.models.child import ChildProfile as ChildProfileModel
 
+logger = structlog.get_logger()
 security = HTTPBearer(auto_error=False)
 
 
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Request session, also exposed as request.state.db. App-wide with scope="function".
+
+    The session takes a pool connection on its first query, so requests that never query (health, metrics,
+    304s, rate-limited) cost nothing. It commits, before the response is sent, only if something was written;
+    otherwise it is closed, which rolls back and returns the connection. Any exception rolls back.
+    """
+    session = async_session_factory()
+    request.state.db = session
+    try:
+        yield session
+        if has_writes(session):
+            if getattr(request.state, "db_read_only", False):
+                logger.warning("write_in_read_only_route", path=request.url.path)
+                discard_hooks(session)
+                await session.rollback()
+            else:
+                await commit_and_run_hooks(session)
+    except Exception:
+        discard_hooks(session)
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+def read_only(request: Request) -> None:
+    """Route dependency: the route never writes, so its session is never committed."""
+    request.state.db_read_only = True
+
+
 async def get_current_user_required(
     request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
 ) -> Caregiver:
-    """Require valid JWT; return caregiver or 401."""
+    """Require valid JWT; return caregiver or 401.
+
+    Cached principals are transient Caregiver objects (not attached to the session); use their fields only.
+    """
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    from app.services.auth_service import decode_access_token, get_caregiver_by_id
+    from app.services.auth_service import decode_access_token, get_caregiver_by_id, principal_cache
 
-    payload = decode_access_token(credentials.credentials)
+    token = credentials.credentials
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+    payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,6 +91,7 @@ async def get_current_user_required(
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    principal_cache.put(token, float(payload["exp"]), caregiver)
     return caregiver
 
 
@@ -71,3 +115,18 @@ async def get_child(
             detail="Child not found or access denied",
         )
     return child
+
+
+async def ensure_child_access(
+    child_id: UUID,
+    request: Request,
+    current_user: Caregiver = Depends(get_current_user_required),
+) -> None:
+    """Verify the caregiver owns this child without loading the profile (Redis ownership set)."""
+    from app.services.auth_service import caregiver_owns_child
+
+    if not await caregiver_owns_child(request.state.db, current_user.caregiver_id, child_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Child not found or access denied",
+        )
@@ -0,0 +1,70 @@
+"""ETag helpers for conditional GET (If-None-Match -> 304) and the per-child change version."""
+
+import hashlib
+import json
+from uuid import UUID
+
+from fastapi import Request, Response
+
+from app.redis_client import get_redis
+
+
+def _version_key(child_id: UUID) -> str:
+    return f"child:ver:{child_id}"
+
+
+def make_etag(payload) -> str:
+    """Weak ETag over the JSON form of a payload."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:20]}"'
+
+
+async def get_child_version(child_id: UUID) -> int | None:
+    """Current change version for a child's data (0 if never written); None if Redis is unavailable."""
+    redis = get_redis()
+    if not redis:
+        return None
+    try:
+        raw = await redis.get(_version_key(child_id))
+        return int(raw) if raw else 0
+    except Exception:
+        return None
+
+
+def queue_child_version_bumps(pipe, child_ids: list[UUID]) -> None:
+    """bump_child_version for several children, queued on the caller's pipeline (sent with its other writes)."""
+    for child_id in child_ids:
+        pipe.incr(_version_key(child_id))
+
+
+async def bump_child_version(child_id: UUID) -> None:
+    """Call from every write path that changes what a child's read endpoints return."""
+    redis = get_redis()
+    if not redis:
+        return
+    try:
+        await redis.incr(_version_key(child_id))
+    except Exception:
+        pass
+
+
+def child_etag(child_id: UUID, version: int | None, resource: str, *extra) -> str | None:
+    """ETag for a child-scoped resource at a given change version; extra parts cover time-dependent reads."""
+    if version is None:
+        return None
+    return make_etag([resource, str(child_id), version, *extra])
+
+
+def etag_matches(request: Request, etag: str | None) -> bool:
+    """True if the request's If-None-Match covers this ETag (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
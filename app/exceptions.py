@@ -7,3 +7,24 @@ class LearningServiceUnavailableError(Exception):
     def __init__(self, message: str = "Learning service temporarily unavailable.", cause: Exception | None = None):
         super().__init__(message)
         self.cause = cause
+
+
+class CircuitOpenError(LearningServiceUnavailableError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class QuotaExceededError(LearningServiceUnavailableError):
+    """Raised before calling the provider when the per-minute or daily quota for a model is spent."""
+
+    def __init__(self, message: str, bucket: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.bucket = bucket
+        self.retry_after = retry_after
+
+
+class AuthBusyError(Exception):
+    """Raised when password hashing capacity is exhausted (whole pool, or one client's share)."""
+
+    def __init__(self, message: str = "Sign-in is busy. Please try again in a moment.", per_client: bool = False):
+        super().__init__(message)
+        self.per_client = per_client
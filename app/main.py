@@ -4,18 +4,20 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 import structlog
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-
 from fastapi.responses import JSONResponse
 
+from app.cache import start_invalidation_listener, stop_invalidation_listener
 from app.config import get_settings
-from app.database import async_session_factory, engine
+from app.database import engine
+from app.dependencies import get_db
 from app.redis_client import close_redis
-from app.exceptions import LearningServiceUnavailableError
+from app.exceptions import AuthBusyError, LearningServiceUnavailableError
 from app.middleware.logging import logging_middleware
 from app.routers import admin, auth, children, learn, progress, sessions
+from app.services.auth_service import password_hasher
+from app.usage import usage_meter
 
 logger = structlog.get_logger()
 
@@ -25,10 +27,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Create DB engine and Redis client; dispose on shutdown."""
     settings = get_settings()
     logger.info("Starting up", redis_url=settings.redis_url[:50] + "...")
+    usage_meter.start()
+    start_invalidation_listener()
     try:
         # Redis is created lazily in services that need it
         yield
     finally:
+        await stop_invalidation_listener()
+        await usage_meter.stop()
+        password_hasher.shutdown()
         await close_redis()
         await engine.dispose()
         logger.info("Shutdown complete")
@@ -40,24 +47,11 @@ def create_app() -> FastAPI:
         description="RAG-powered adaptive learning for neurodiverse and disabled children",
         version="0.1.0",
         lifespan=lifespan,
+        # Session per request, committed before the response is sent; see get_db
+        dependencies=[Depends(get_db, scope="function")],
     )
     app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
-    @app.middleware("http")
-    async def db_session_middleware(request: Request, call_next):
-        async with async_session_factory() as session:
-            request.state.db = session
-            try:
-                response = await call_next(request)
-                await session.commit()
-                return response
-            except Exception:
-                await session.rollback()
-                raise
-            finally:
-                await session.close()
-
-    # Logging runs after DB so request is fully set up
     app.middleware("http")(logging_middleware)
 
     app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -74,6 +68,14 @@ def create_app() -> FastAPI:
             content={"detail": exc.args[0] if exc.args else "Learning service temporarily unavailable. Please try again later."},
         )
 
+    @app.exception_handler(AuthBusyError)
+    async def auth_busy_handler(request: Request, exc: AuthBusyError):
+        return JSONResponse(
+            status_code=429 if exc.per_client else 503,
+            content={"detail": exc.args[0]},
+            headers={"Retry-After": "1"},
+        )
+
     @app.get("/health")
     async def health():
         return {"status": "ok"}
@@ -12,7 +12,7 @@ class Base(DeclarativeBase):
 from app.models.caregiver import Caregiver
 from app.models.child import ChildDisability, ChildProfile, NeuroProfile
 from app.models.session import Interaction, LearningSession
-from app.models.knowledge import KnowledgeChunk, MasteryRecord
+from app.models.knowledge import FSRSParameters, KnowledgeChunk, MasteryRecord, ReviewLog
 from app.models.signals import AdaptiveState, BehavioralSignal
 
 __all__ = [
@@ -25,6 +25,8 @@ __all__ = [
     "Interaction",
     "KnowledgeChunk",
     "MasteryRecord",
+    "ReviewLog",
+    "FSRSParameters",
     "BehavioralSignal",
     "AdaptiveState",
 ]
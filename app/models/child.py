@@ -58,6 +58,9 @@ class ChildProfile(Base):
     date_of_birth: Mapped[date] = mapped_column(Date, nullable=False)
     primary_language: Mapped[str] = mapped_column(String(10), nullable=False, default="en")
     grade_level: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    # Maintained on write so progress reads never COUNT(*) the interactions hypertable
+    session_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    interaction_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow
     )
@@ -3,8 +3,10 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy import (
+    BigInteger, DateTime, Float, ForeignKey, Index, Integer, SmallInteger, String, Text, UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from pgvector.sqlalchemy import Vector
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -35,6 +37,7 @@ class KnowledgeChunk(Base):
 
 class MasteryRecord(Base):
     __tablename__ = "mastery_records"
+    __table_args__ = (UniqueConstraint("child_id", "topic", name="uq_mastery_child_topic"),)
 
     mastery_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -57,3 +60,35 @@ class MasteryRecord(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
     )
+
+
+class ReviewLog(Base):
+    """One graded review; the FSRS optimizer replays these per (child, topic)."""
+
+    __tablename__ = "review_logs"
+    __table_args__ = (Index("idx_review_logs_child_topic_ts", "child_id", "topic", "reviewed_at"),)
+
+    review_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    child_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("child_profiles.child_id"), nullable=False
+    )
+    topic: Mapped[str] = mapped_column(String(100), nullable=False)
+    rating: Mapped[int] = mapped_column(SmallInteger, nullable=False)  # 1-4
+    elapsed_days: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)  # 0 for first review
+    reviewed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow
+    )
+
+
+class FSRSParameters(Base):
+    """Fitted FSRS weights per scope: "child:<uuid>", "grade:<grade_level>" or "global"."""
+
+    __tablename__ = "fsrs_parameters"
+
+    scope: Mapped[str] = mapped_column(String(150), primary_key=True)
+    weights: Mapped[list[float]] = mapped_column(ARRAY(Float), nullable=False)
+    review_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    log_loss: Mapped[float | None] = mapped_column(Float, nullable=True)
+    fitted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
+    )
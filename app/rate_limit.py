@@ -0,0 +1,92 @@
+"""RateLimiter: GCRA (generic cell rate algorithm) limits in one Redis Lua call, with an in-process fallback.
+
+`limit` requests per `period` seconds per subject (child, caregiver, ...), with bursts of up to `limit` and
+no double-burst at window edges. Each subject's state is one key, the theoretical arrival time (TAT),
+written with an expiry in the same script call. When Redis is unavailable each worker enforces the
+same limit on its own.
+
+    ask_child_limit = RateLimiter("ask:child", LEARN_ASK_RATE_LIMIT_PER_MINUTE)
+    await ask_child_limit.check(child_id)                                  # inside a route
+    @router.post(..., dependencies=[Depends(ask_caregiver_limit.per_caregiver())])
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, status
+
+from app.dependencies import get_current_user_required
+from app.models import Caregiver
+from app.redis_client import get_redis
+
+# Subjects tracked in process when Redis is down (least recently seen dropped first)
+_LOCAL_MAX_KEYS = 10_000
+
+# KEYS[1]: subject key. ARGV: emission interval ms, burst tolerance ms, now ms. Returns 0 or ms to wait.
+_GCRA = """
+local interval, tolerance, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+if tat - now > tolerance then return math.ceil(tat - now - tolerance) end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return 0
+"""
+
+
+class RateLimiter:
+    """At most `limit` requests per `period` seconds per subject; check() raises 429 with Retry-After."""
+
+    def __init__(self, name: str, limit: int, period: float = 60.0):
+        self.name = name
+        self.interval_ms = period * 1000 / limit
+        self.tolerance_ms = period * 1000 - self.interval_ms
+        self._script_obj = None
+        self._client = None
+        self._local: OrderedDict[str, float] = OrderedDict()
+
+    def _script(self, redis):
+        if redis is not self._client:
+            self._client, self._script_obj = redis, redis.register_script(_GCRA)
+        return self._script_obj
+
+    def _wait_local(self, key: str, now_ms: float) -> float:
+        tat = max(self._local.pop(key, now_ms), now_ms)
+        if tat - now_ms > self.tolerance_ms:
+            self._local[key] = tat
+            return tat - now_ms - self.tolerance_ms
+        self._local[key] = tat + self.interval_ms
+        if len(self._local) > _LOCAL_MAX_KEYS:
+            self._local.popitem(last=False)
+        return 0.0
+
+    async def wait_ms(self, subject) -> float:
+        """Take one request for `subject`; 0 if allowed, else milliseconds until it would be."""
+        key = f"rate:{self.name}:{subject}"
+        now_ms = time.time() * 1000
+        redis = get_redis()
+        if redis:
+            try:
+                return float(await self._script(redis)(
+                    keys=[key], args=[self.interval_ms, self.tolerance_ms, int(now_ms)]
+                ))
+            except Exception:
+                pass
+        return self._wait_local(key, now_ms)
+
+    async def check(self, subject) -> None:
+        wait = await self.wait_ms(subject)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(wait / 1000))},
+            )
+
+    def per_caregiver(self):
+        """Route dependency limiting the authenticated caregiver."""
+
+        async def dependency(current_user: Caregiver = Depends(get_current_user_required)) -> None:
+            await self.check(current_user.caregiver_id)
+
+        return dependency
@@ -1,8 +1,22 @@
-"""Redis client (lazy singleton)."""
+"""Redis client (lazy singleton with a bounded connection pool) and RedisBatcher.
 
+RedisBatcher sends the commands issued together (by concurrent tasks, within a few event-loop passes) as one
+pipeline, so independent cache reads cost one round trip:
+
+    redis = get_redis()
+    embedding, rules = await asyncio.gather(batched(redis).get(key_a), batched(redis).get(key_b))
+"""
+
+import asyncio
 from typing import Any
 
 _redis: Any = None
+_batcher: "RedisBatcher | None" = None
+
+# A batch is sent after this many event-loop passes without a new command (callers reached through
+# gather or an extra await start one pass later), and after _BATCH_MAX_PASSES at most; passes take microseconds
+_BATCH_QUIET_PASSES = 2
+_BATCH_MAX_PASSES = 8
 
 
 def get_redis():
@@ -11,17 +25,129 @@ def get_redis():
     if _redis is not None:
         return _redis
     try:
-        from redis.asyncio import Redis
+        from redis.asyncio import BlockingConnectionPool, Redis
         from app.config import get_settings
-        url = get_settings().redis_url
-        _redis = Redis.from_url(url, decode_responses=False)
+        settings = get_settings()
+        # Blocking pool: at most redis_max_connections per worker; callers wait redis_pool_timeout for a free one
+        pool = BlockingConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+            decode_responses=False,
+        )
+        _redis = Redis(connection_pool=pool)
         return _redis
     except Exception:
         return None
 
 
+def pubsub_client():
+    """A new client for one long-lived subscription; the caller closes it.
+
+    Not from the shared pool: its socket timeout would make an idle subscription look like a failure every
+    few seconds. Dead connections are still noticed through the health-check pings.
+    """
+    from redis.asyncio import Redis
+    from app.config import get_settings
+    settings = get_settings()
+    return Redis.from_url(
+        settings.redis_url,
+        socket_timeout=None,
+        socket_connect_timeout=settings.redis_connect_timeout,
+        health_check_interval=settings.redis_health_check_interval,
+        decode_responses=False,
+    )
+
+
+class RedisBatcher:
+    """Queue commands from concurrent callers and send each batch as one non-transactional pipeline.
+
+    Every method returns a future for its own reply; an error reply (or a failed round trip) is raised from
+    that future only, so callers keep their usual try/except fallbacks.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._pending: list[tuple[str, tuple, asyncio.Future]] = []
+        self._scheduled = False
+        self._seen = 0
+        self._quiet = 0
+        self._passes = 0
+        self._flushing: set[asyncio.Task] = set()
+
+    def _queue(self, command: str, *args) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((command, args, future))
+        if not self._scheduled:
+            self._scheduled, self._seen, self._quiet, self._passes = True, 1, 0, 0
+            loop.call_soon(self._maybe_flush)
+        return future
+
+    def get(self, key: str) -> asyncio.Future:
+        return self._queue("GET", key)
+
+    def exists(self, key: str) -> asyncio.Future:
+        return self._queue("EXISTS", key)
+
+    def sismember(self, key: str, member: str) -> asyncio.Future:
+        return self._queue("SISMEMBER", key, member)
+
+    async def script(self, script, keys: list, args: list):
+        """Run a registered script (EVALSHA) in the batch; loaded and retried on its own if the server lacks it."""
+        from redis.exceptions import NoScriptError
+
+        try:
+            return await self._queue("EVALSHA", script.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            return await script(keys=keys, args=args)
+
+    def _maybe_flush(self) -> None:
+        self._passes += 1
+        if len(self._pending) != self._seen:
+            self._seen, self._quiet = len(self._pending), 0
+        else:
+            self._quiet += 1
+        if self._quiet < _BATCH_QUIET_PASSES and self._passes < _BATCH_MAX_PASSES:
+            asyncio.get_running_loop().call_soon(self._maybe_flush)
+            return
+        self._scheduled = False
+        pending, self._pending = self._pending, []
+        task = asyncio.create_task(self._flush(pending))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, pending: list[tuple[str, tuple, asyncio.Future]]) -> None:
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for command, args, _ in pending:
+                    pipe.execute_command(command, *args)
+                replies = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            replies = [e] * len(pending)
+        for (_, _, future), reply in zip(pending, replies):
+            if future.done():
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+
+def batched(client) -> RedisBatcher:
+    """The batcher for `client` (a get_redis() result)."""
+    global _batcher
+    if _batcher is None or _batcher.client is not client:
+        _batcher = RedisBatcher(client)
+    return _batcher
+
+
 async def close_redis():
-    global _redis
+    global _redis, _batcher
     if _redis is not None:
-        await _redis.aclose()
+        await _redis.aclose(close_connection_pool=True)
         _redis = None
+        _batcher = None
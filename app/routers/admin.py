@@ -1,16 +1,26 @@
-"""POST /admin/ingest — content ingestion for RAG corpus."""
+"""POST /admin/ingest — content ingestion for RAG corpus; GET /admin/export — streaming bulk export."""
 
-from fastapi import APIRouter, Request, Depends, HTTPException, status
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dependencies import get_current_user_required
+from app.database import async_session_factory
+from app.dependencies import get_current_user_required, read_only
 from app.models import Caregiver
 from app.models import KnowledgeChunk
 from app.schemas.admin import IngestRequest, IngestResponse
+from app.services.auth_service import is_admin
 from app.services.embeddings import EmbeddingService
+from app.services.export import EXPORT_MEDIA_TYPES, ExportService
+from app.usage import attribute_usage
 
 router = APIRouter()
 embedding_svc = EmbeddingService()
+export_svc = ExportService()
 
 
 @router.post("/ingest", response_model=IngestResponse)
@@ -20,6 +30,7 @@ async def ingest_content(
     current_user: Caregiver = Depends(get_current_user_required),
 ):
     db: AsyncSession = request.state.db
+    attribute_usage(caregiver_id=current_user.caregiver_id)
     embedding = await embedding_svc.embed(body.content)
     chunk = KnowledgeChunk(
         content=body.content,
@@ -35,3 +46,37 @@ async def ingest_content(
     db.add(chunk)
     await db.flush()
     return IngestResponse(chunk_id=chunk.chunk_id)
+
+
+@router.get("/export", dependencies=[Depends(read_only)])
+async def export_rows(
+    table: Literal["interactions", "behavioral_signals", "mastery_records"],
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    child_id: list[UUID] | None = Query(None, description="Repeat to export a cohort; omit for all permitted children"),
+    current_user: Caregiver = Depends(get_current_user_required),
+):
+    """Stream rows in time order. Admins (ADMIN_EMAILS) may export any child; other caregivers only their own."""
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Parquet export requires pyarrow on the server",
+            )
+    caregiver_id = None if is_admin(current_user) else current_user.caregiver_id
+    query = export_svc.query(table, child_id, since, until, caregiver_id)
+    batches = export_svc.batches(async_session_factory, query)
+    if format == "csv":
+        body = export_svc.csv(batches, [c.name for c in export_svc.columns(table)])
+    elif format == "parquet":
+        body = export_svc.parquet(batches, table)
+    else:
+        body = export_svc.ndjson(batches)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
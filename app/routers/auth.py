@@ -9,6 +9,7 @@ from app.services.auth_service import (
     decode_refresh_token,
     get_caregiver_by_email,
     hash_password,
+    needs_rehash,
     verify_password,
 )
 from app.models import Caregiver
@@ -17,6 +18,10 @@ from fastapi import Request
 router = APIRouter()
 
 
+def _client_ip(request: Request) -> str | None:
+    return request.client.host if request.client else None
+
+
 @router.post("/register", response_model=TokenResponse)
 async def register(
     body: RegisterRequest,
@@ -32,7 +37,7 @@ async def register(
     caregiver = Caregiver(
         email=body.email,
         full_name=body.full_name,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password(body.password, _client_ip(request)),
         role=body.role,
     )
     db.add(caregiver)
@@ -49,11 +54,14 @@ async def login(
 ):
     db: AsyncSession = request.state.db
     caregiver = await get_caregiver_by_email(db, body.email)
-    if not caregiver or not verify_password(body.password, caregiver.password_hash):
+    ip = _client_ip(request)
+    if not caregiver or not await verify_password(body.password, caregiver.password_hash, ip):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if needs_rehash(caregiver.password_hash):
+        caregiver.password_hash = await hash_password(body.password, ip)
     access = create_access_token(str(caregiver.caregiver_id))
     refresh = create_refresh_token(str(caregiver.caregiver_id))
     return TokenResponse(access_token=access, refresh_token=refresh)
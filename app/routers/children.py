@@ -2,12 +2,16 @@
 
 from uuid import UUID
 
-from fastapi import APIRouter, Request, Depends, HTTPException, status
+from fastapi import APIRouter, Request, Response, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dependencies import get_current_user_required, get_child
+from app.database import after_commit
+from app.dependencies import ensure_child_access, get_current_user_required, get_child, read_only
+from app.etag import bump_child_version, child_etag, etag_matches, get_child_version, not_modified
 from app.models import Caregiver, ChildProfile, ChildDisability, NeuroProfile
+from app.services.accessibility import invalidate_adaptation
+from app.services.auth_service import invalidate_child_ownership
 from app.schemas.child import (
     ChildCreate,
     ChildResponse,
@@ -39,6 +43,8 @@ async def register_child(
     )
     db.add(child)
     await db.flush()
+    caregiver_id = current_user.caregiver_id
+    after_commit(db, lambda: invalidate_child_ownership(caregiver_id))
     return ChildResponse(
         child_id=child.child_id,
         caregiver_id=child.caregiver_id,
@@ -50,7 +56,7 @@ async def register_child(
     )
 
 
-@router.get("", response_model=list[ChildResponse])
+@router.get("", response_model=list[ChildResponse], dependencies=[Depends(read_only)])
 async def list_children(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
@@ -74,12 +80,18 @@ async def list_children(
     ]
 
 
-@router.get("/{child_id}", response_model=ChildFullResponse)
+@router.get("/{child_id}", response_model=ChildFullResponse, dependencies=[Depends(read_only)])
 async def get_child_profile(
     child_id: UUID,
     request: Request,
+    response: Response,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
+    # Ownership and version come from Redis, so a 304 revalidation never touches Postgres
+    await ensure_child_access(child_id, request, current_user)
+    etag = child_etag(child_id, await get_child_version(child_id), "profile")
+    if etag_matches(request, etag):
+        return not_modified(etag)
     child = await get_child(child_id, request, current_user)
     db: AsyncSession = request.state.db
     neuro = None
@@ -112,6 +124,8 @@ async def get_child_profile(
         )
         for d in result.scalars().all()
     ]
+    if etag:
+        response.headers["ETag"] = etag
     return ChildFullResponse(
         child=ChildResponse(
             child_id=child.child_id,
@@ -162,14 +176,9 @@ async def upsert_neuro(
         )
         db.add(np)
         await db.flush()
-    # Invalidate adaptation cache
-    try:
-        from app.redis_client import get_redis
-        r = get_redis()
-        if r:
-            await r.delete(f"adaptation:{child_id}")
-    except Exception:
-        pass
+    # Invalidate adaptation cache (every worker)
+    after_commit(db, lambda: invalidate_adaptation(child_id))
+    after_commit(db, lambda: bump_child_version(child_id))
     return NeuroprofileResponse(
         profile_id=np.profile_id,
         child_id=np.child_id,
@@ -192,7 +201,7 @@ async def add_disability(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
     db: AsyncSession = request.state.db
     result = await db.execute(
         select(ChildDisability).where(
@@ -214,13 +223,8 @@ async def add_disability(
     )
     db.add(d)
     await db.flush()
-    try:
-        from app.redis_client import get_redis
-        r = get_redis()
-        if r:
-            await r.delete(f"adaptation:{child_id}")
-    except Exception:
-        pass
+    after_commit(db, lambda: invalidate_adaptation(child_id))
+    after_commit(db, lambda: bump_child_version(child_id))
     return DisabilityResponse(
         disability_id=d.disability_id,
         child_id=d.child_id,
@@ -239,7 +243,7 @@ async def delete_disability(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
     db: AsyncSession = request.state.db
     result = await db.execute(
         select(ChildDisability).where(
@@ -252,11 +256,6 @@ async def delete_disability(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Disability not found")
     await db.delete(d)
     await db.flush()
-    try:
-        from app.redis_client import get_redis
-        r = get_redis()
-        if r:
-            await r.delete(f"adaptation:{child_id}")
-    except Exception:
-        pass
+    after_commit(db, lambda: invalidate_adaptation(child_id))
+    after_commit(db, lambda: bump_child_version(child_id))
     return {"ok": True}
@@ -1,12 +1,15 @@
-"""POST /learn/ask, /learn/signal, /learn/feedback."""
+"""POST /learn/ask, /learn/signal, /learn/feedback, /learn/feedback:batch."""
 
+import asyncio
+from dataclasses import asdict
 from uuid import UUID
 
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from sqlalchemy import select
 
-from app.dependencies import get_current_user_required, get_child
-from app.models import Caregiver, MasteryRecord, Interaction
+from app.database import after_commit
+from app.dependencies import ensure_child_access, get_current_user_required, read_only
+from app.models import Caregiver
 from app.schemas.learn import (
     AskRequest,
     AskResponse,
@@ -15,56 +18,55 @@ from app.schemas.learn import (
     StateSnapshot,
     FeedbackRequest,
     FeedbackResponse,
+    FeedbackBatchRequest,
+    FeedbackBatchResponse,
     UsageResponse,
 )
-from app.usage import get_usage
+from app.usage import attribute_usage, get_usage
 from app.services.rag import RAGPipeline
 from app.services.signals import SignalProcessor, StateService
-from app.services.fsrs import FSRSService
-from app.constants import LEARN_ASK_RATE_LIMIT_PER_MINUTE
-from app.redis_client import get_redis
+from app.services.mastery import FeedbackItem, MasteryService
+from app.etag import bump_child_version
+from app.constants import LEARN_ASK_CAREGIVER_RATE_LIMIT_PER_MINUTE, LEARN_ASK_RATE_LIMIT_PER_MINUTE
+from app.rate_limit import RateLimiter
 
 router = APIRouter()
 rag = RAGPipeline()
-fsrs = FSRSService()
+mastery_svc = MasteryService()
+ask_child_limit = RateLimiter("ask:child", LEARN_ASK_RATE_LIMIT_PER_MINUTE)
+ask_caregiver_limit = RateLimiter("ask:caregiver", LEARN_ASK_CAREGIVER_RATE_LIMIT_PER_MINUTE)
 
 
-@router.get("/usage", response_model=UsageResponse)
+@router.get("/usage", response_model=UsageResponse, dependencies=[Depends(read_only)])
 async def learn_usage(
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    """Return today's LLM and embedding usage vs configured daily limits (for UI)."""
-    data = await get_usage()
+    """Return today's LLM and embedding usage vs configured daily limits, and this caregiver's share (for UI)."""
+    data = await get_usage(current_user.caregiver_id)
     return UsageResponse(**data)
 
 
-@router.post("/ask", response_model=AskResponse)
+@router.post("/ask", response_model=AskResponse, dependencies=[Depends(ask_caregiver_limit.per_caregiver())])
 async def learn_ask(
     body: AskRequest,
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(body.child_id, request, current_user)
-    redis = get_redis()
-    if redis:
-        try:
-            key = f"rate:ask:{body.child_id}"
-            n = await redis.incr(key)
-            if n == 1:
-                await redis.expire(key, 60)
-            if n > LEARN_ASK_RATE_LIMIT_PER_MINUTE:
-                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
-        except HTTPException:
-            raise
-        except Exception:
-            pass
+    # Ownership and the ask's cache reads share one Redis round trip (the reads are discarded if access is denied)
+    _, cache = await asyncio.gather(
+        ensure_child_access(body.child_id, request, current_user),
+        rag.read_cache(body.child_id, body.input_text),
+    )
+    await ask_child_limit.check(body.child_id)
+    attribute_usage(child_id=body.child_id, caregiver_id=current_user.caregiver_id)
     db = request.state.db
     try:
         interaction_id, response_text, ui_directives, session_constraints, chunks_used, response_time_ms = await rag.ask(
-            db, body.child_id, body.session_id, body.input_text, body.input_type
+            db, body.child_id, body.session_id, body.input_text, body.input_type, cache=cache
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    after_commit(db, lambda: bump_child_version(body.child_id))
     return AskResponse(
         interaction_id=interaction_id,
         response_text=response_text,
@@ -81,7 +83,7 @@ async def learn_signal(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(body.child_id, request, current_user)
+    await ensure_child_access(body.child_id, request, current_user)
     db = request.state.db
     state_svc = StateService()
     await state_svc.ingest_signal(
@@ -113,71 +115,25 @@ async def learn_feedback(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(body.child_id, request, current_user)
-    db = request.state.db
-    result = await db.execute(
-        select(MasteryRecord).where(
-            MasteryRecord.child_id == body.child_id,
-            MasteryRecord.topic == body.topic,
-        )
-    )
-    record = result.scalar_one_or_none()
-    from datetime import datetime, timezone
-    now = datetime.now(timezone.utc)
-    if record and record.last_reviewed:
-        res = fsrs.review(
-            record.stability,
-            record.difficulty,
-            record.last_reviewed,
-            body.rating,
-        )
-        record.stability = res.stability
-        record.difficulty = res.difficulty
-        record.last_reviewed = now
-        record.next_review_due = res.next_review
-        record.review_count = (record.review_count or 0) + 1
-        mastery_level = min(1.0, record.mastery_level + 0.1 * body.rating)
-        record.mastery_level = mastery_level
-        next_days = (res.next_review - now).total_seconds() / 86400
-    else:
-        res = fsrs.initial_review(body.rating)
-        if record:
-            record.stability = res.stability
-            record.difficulty = res.difficulty
-            record.last_reviewed = now
-            record.next_review_due = res.next_review
-            record.review_count = (record.review_count or 0) + 1
-            record.mastery_level = min(1.0, 0.2 * body.rating)
-        else:
-            record = MasteryRecord(
-                child_id=body.child_id,
-                topic=body.topic,
-                stability=res.stability,
-                difficulty=res.difficulty,
-                last_reviewed=now,
-                next_review_due=res.next_review,
-                review_count=1,
-                mastery_level=min(1.0, 0.2 * body.rating),
-            )
-            db.add(record)
-        next_days = (res.next_review - now).total_seconds() / 86400
+    await ensure_child_access(body.child_id, request, current_user)
+    (outcome,) = await mastery_svc.apply_feedback(request.state.db, body.child_id, [
+        FeedbackItem(body.interaction_id, body.topic, body.rating, body.engagement_score, body.child_reaction),
+    ])
+    after_commit(request.state.db, lambda: bump_child_version(body.child_id))
+    return FeedbackResponse(**asdict(outcome))
 
-    # Persist engagement feedback onto the interaction for analytics / timeline
-    interaction = await db.get(Interaction, body.interaction_id)
-    if interaction is not None:
-        interaction.engagement_score = body.engagement_score
-        interaction.child_reaction = body.child_reaction
 
-    await db.flush()
-    from app.redis_client import get_redis
-    r = get_redis()
-    if r:
-        try:
-            await r.delete(f"mastery:weak:{body.child_id}")
-        except Exception:
-            pass
-    return FeedbackResponse(
-        topic=body.topic,
-        mastery_level=record.mastery_level,
-        next_review_days=round(next_days, 1),
-    )
+@router.post("/feedback:batch", response_model=FeedbackBatchResponse)
+async def learn_feedback_batch(
+    body: FeedbackBatchRequest,
+    request: Request,
+    current_user: Caregiver = Depends(get_current_user_required),
+):
+    """Apply many ratings for one child: one FSRS pass, one mastery upsert, one interaction update."""
+    await ensure_child_access(body.child_id, request, current_user)
+    outcomes = await mastery_svc.apply_feedback(request.state.db, body.child_id, [
+        FeedbackItem(i.interaction_id, i.topic, i.rating, i.engagement_score, i.child_reaction)
+        for i in body.items
+    ])
+    after_commit(request.state.db, lambda: bump_child_version(body.child_id))
+    return FeedbackBatchResponse(results=[FeedbackResponse(**asdict(o)) for o in outcomes])
@@ -1,13 +1,13 @@
 """GET /progress/{child_id}, /mastery, /timeline, /report, /review-queue."""
 
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Request, Depends, Query
-from sqlalchemy import select, func
+from fastapi import APIRouter, Request, Response, Depends, Query
 
-from app.dependencies import get_current_user_required, get_child
-from app.models import Caregiver, MasteryRecord, LearningSession, Interaction
+from app.dependencies import ensure_child_access, get_current_user_required, read_only
+from app.constants import PROGRESS_REPORT_PERIOD_DAYS
+from app.models import Caregiver
 from app.schemas.progress import (
     ProgressDashboardResponse,
     MasteryRecordResponse,
@@ -17,47 +17,39 @@ from app.schemas.progress import (
     ReviewQueueResponse,
     ReviewQueueItem,
 )
+from app.etag import child_etag, etag_matches, get_child_version, not_modified
+from app.services.mastery_index import MasteryIndex
+from app.services.progress import ProgressService
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(read_only)])
+progress_svc = ProgressService()
+mastery_index = MasteryIndex()
 
 
 @router.get("/{child_id}", response_model=ProgressDashboardResponse)
 async def progress_dashboard(
     child_id: UUID,
     request: Request,
+    response: Response,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
+    version = await get_child_version(child_id)
+    etag = child_etag(child_id, version, "dashboard")
+    if etag_matches(request, etag):
+        return not_modified(etag)
     db = request.state.db
-    result = await db.execute(select(MasteryRecord).where(MasteryRecord.child_id == child_id))
-    records = result.scalars().all()
-    session_count = await db.execute(
-        select(func.count()).select_from(LearningSession).where(LearningSession.child_id == child_id)
-    )
-    total_sessions = session_count.scalar() or 0
-    interaction_count = await db.execute(
-        select(func.count()).select_from(Interaction).where(Interaction.child_id == child_id)
-    )
-    total_interactions = interaction_count.scalar() or 0
+    snap = await progress_svc.snapshot(db, child_id, version)
+    mastery = await mastery_index.summary(db, child_id)
+    if etag:
+        response.headers["ETag"] = etag
     return ProgressDashboardResponse(
         child_id=child_id,
-        mastery_records=[
-            MasteryRecordResponse(
-                mastery_id=r.mastery_id,
-                child_id=r.child_id,
-                topic=r.topic,
-                mastery_level=r.mastery_level,
-                stability=r.stability,
-                difficulty=r.difficulty,
-                last_reviewed=r.last_reviewed.isoformat() if r.last_reviewed else None,
-                next_review_due=r.next_review_due.isoformat() if r.next_review_due else None,
-                review_count=r.review_count or 0,
-                updated_at=r.updated_at.isoformat() if r.updated_at else "",
-            )
-            for r in records
-        ],
-        total_sessions=total_sessions,
-        total_interactions=total_interactions,
+        mastery_records=[MasteryRecordResponse(**r) for r in snap.mastery_records],
+        total_sessions=snap.total_sessions,
+        total_interactions=snap.total_interactions,
+        weak_topics=mastery.weak_topics,
+        avg_mastery=mastery.avg_mastery,
     )
 
 
@@ -65,58 +57,44 @@ async def progress_dashboard(
 async def get_mastery(
     child_id: UUID,
     request: Request,
+    response: Response,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
+    version = await get_child_version(child_id)
+    etag = child_etag(child_id, version, "mastery")
+    if etag_matches(request, etag):
+        return not_modified(etag)
     db = request.state.db
-    result = await db.execute(select(MasteryRecord).where(MasteryRecord.child_id == child_id))
-    records = result.scalars().all()
-    return [
-        MasteryRecordResponse(
-            mastery_id=r.mastery_id,
-            child_id=r.child_id,
-            topic=r.topic,
-            mastery_level=r.mastery_level,
-            stability=r.stability,
-            difficulty=r.difficulty,
-            last_reviewed=r.last_reviewed.isoformat() if r.last_reviewed else None,
-            next_review_due=r.next_review_due.isoformat() if r.next_review_due else None,
-            review_count=r.review_count or 0,
-            updated_at=r.updated_at.isoformat() if r.updated_at else "",
-        )
-        for r in records
-    ]
+    snap = await progress_svc.snapshot(db, child_id, version)
+    if etag:
+        response.headers["ETag"] = etag
+    return [MasteryRecordResponse(**r) for r in snap.mastery_records]
 
 
 @router.get("/{child_id}/timeline", response_model=TimelineResponse)
 async def get_timeline(
     child_id: UUID,
     request: Request,
+    response: Response,
     days: int = Query(30, ge=1, le=365),
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
+    version = await get_child_version(child_id)
+    # The window moves at midnight even without writes
+    etag = child_etag(child_id, version, "timeline", days, datetime.now(timezone.utc).date().isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
     db = request.state.db
-    since = datetime.now(timezone.utc) - timedelta(days=days)
-    q = select(
-        func.date_trunc("day", Interaction.ts).label("day"),
-        func.count(Interaction.interaction_id).label("count"),
-        func.avg(Interaction.engagement_score).label("avg_eng"),
-    ).where(
-        Interaction.child_id == child_id,
-        Interaction.ts >= since,
-    ).group_by(func.date_trunc("day", Interaction.ts))
-    result = await db.execute(q)
-    rows = result.fetchall()
-    timeline = [
-        TimelineDayPoint(
-            date=row[0].isoformat()[:10] if row[0] else "",
-            interactions=row[1] or 0,
-            avg_engagement=float(row[2]) if row[2] is not None else None,
-        )
-        for row in rows
-    ]
-    return TimelineResponse(child_id=child_id, days=days, timeline=timeline)
+    payload = await progress_svc.timeline(db, child_id, days, version)
+    if etag:
+        response.headers["ETag"] = etag
+    return TimelineResponse(
+        child_id=child_id,
+        days=days,
+        timeline=[TimelineDayPoint(**p) for p in payload["timeline"]],
+    )
 
 
 @router.get("/{child_id}/report", response_model=ReportResponse)
@@ -125,37 +103,30 @@ async def get_report(
     request: Request,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
+    await ensure_child_access(child_id, request, current_user)
     db = request.state.db
-    period = 30
-    since = datetime.now(timezone.utc) - timedelta(days=period)
-    session_count = await db.execute(
-        select(func.count()).select_from(LearningSession).where(
-            LearningSession.child_id == child_id,
-            LearningSession.started_at >= since,
-        )
-    )
-    total_sessions = session_count.scalar() or 0
-    interaction_count = await db.execute(
-        select(func.count()).select_from(Interaction).where(
-            Interaction.child_id == child_id,
-            Interaction.ts >= since,
-        )
-    )
-    total_interactions = interaction_count.scalar() or 0
-    result = await db.execute(select(MasteryRecord).where(MasteryRecord.child_id == child_id))
-    records = result.scalars().all()
+    period = PROGRESS_REPORT_PERIOD_DAYS
+    version = await get_child_version(child_id)
+    snap = await progress_svc.snapshot(db, child_id, version)
+    timeline = await progress_svc.timeline(db, child_id, period, version)
+    mastery = await mastery_index.summary(db, child_id)
     mastery_summary = [
-        {"topic": r.topic, "mastery_level": r.mastery_level, "review_count": r.review_count or 0}
-        for r in records
+        {"topic": r["topic"], "mastery_level": r["mastery_level"], "review_count": r["review_count"]}
+        for r in snap.mastery_records
     ]
     return ReportResponse(
         child_id=child_id,
         period_days=period,
-        total_sessions=total_sessions,
-        total_interactions=total_interactions,
+        total_sessions=snap.period_sessions,
+        total_interactions=snap.period_interactions,
         mastery_summary=mastery_summary,
-        trend_data={"period_days": period},
+        trend_data={
+            "period_days": period,
+            "daily": timeline["timeline"],
+            "avg_mastery": mastery.avg_mastery,
+            "weak_topics": mastery.weak_topics,
+            "due_topics": len(mastery.due),
+        },
         generated_at=datetime.now(timezone.utc).isoformat(),
     )
 
@@ -164,27 +135,28 @@ async def get_report(
 async def get_review_queue(
     child_id: UUID,
     request: Request,
+    response: Response,
     current_user: Caregiver = Depends(get_current_user_required),
 ):
-    await get_child(child_id, request, current_user)
-    db = request.state.db
+    await ensure_child_access(child_id, request, current_user)
     now = datetime.now(timezone.utc)
-    result = await db.execute(
-        select(MasteryRecord).where(
-            MasteryRecord.child_id == child_id,
-            MasteryRecord.next_review_due <= now,
-        ).order_by(MasteryRecord.next_review_due.asc())
-    )
-    records = result.scalars().all()
+    version = await get_child_version(child_id)
+    # Topics fall due as time passes, so the tag also rolls over every minute
+    etag = child_etag(child_id, version, "review-queue", now.strftime("%Y-%m-%dT%H:%M"))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    due = await mastery_index.due(request.state.db, child_id, now)
+    if etag:
+        response.headers["ETag"] = etag
     return ReviewQueueResponse(
         child_id=child_id,
         due_topics=[
             ReviewQueueItem(
-                topic=r.topic,
-                next_review_due=r.next_review_due.isoformat() if r.next_review_due else "",
-                mastery_level=r.mastery_level,
-                stability=r.stability,
+                topic=d.topic,
+                next_review_due=d.next_review_due.isoformat(),
+                mastery_level=d.mastery_level,
+                stability=d.stability,
             )
-            for r in records
+            for d in due
         ],
     )
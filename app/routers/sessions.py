@@ -1,19 +1,26 @@
-"""POST /sessions/start, POST /sessions/{id}/end, GET /sessions/{id}."""
+"""POST /sessions/start, POST /sessions/start:batch, POST /sessions/{id}/end, GET /sessions/{id}."""
 
+import asyncio
 from uuid import UUID
 
 from fastapi import APIRouter, Request, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 
-from app.dependencies import get_current_user_required, get_child
-from app.models import Caregiver, LearningSession
+from app.database import after_commit
+from app.dependencies import ensure_child_access, get_current_user_required, get_child, read_only
+from app.models import Caregiver, ChildProfile, LearningSession
+from app.models.child import ChildDisability, NeuroProfile
 from app.schemas.session import (
     SessionStartRequest,
     SessionStartResponse,
+    SessionStartBatchRequest,
+    SessionStartBatchItem,
+    SessionStartBatchResponse,
     SessionEndResponse,
     SessionStatusResponse,
 )
 from app.services.accessibility import AccessibilityEngine
+from app.etag import bump_child_version, queue_child_version_bumps
 from app.redis_client import get_redis
 from app.constants import CACHE_SESSION_ACTIVE_TTL
 
@@ -31,19 +38,28 @@ async def start_session(
     session = LearningSession(child_id=body.child_id)
     db.add(session)
     await db.flush()
+    await db.execute(
+        update(ChildProfile)
+        .where(ChildProfile.child_id == body.child_id)
+        .values(session_count=ChildProfile.session_count + 1)
+    )
     engine = AccessibilityEngine()
-    from app.models import NeuroProfile, ChildDisability
-    np_result = await db.execute(select(NeuroProfile).where(NeuroProfile.child_id == body.child_id))
-    neuro = np_result.scalar_one_or_none()
-    d_result = await db.execute(select(ChildDisability).where(ChildDisability.child_id == body.child_id))
-    disabilities = list(d_result.scalars().all())
-    rules = await engine.derive(child, neuro, disabilities)
+    # Profile rows are only needed to derive rules on a cache miss
+    rules, version = await asyncio.gather(engine.cached(body.child_id), engine.cache_version(body.child_id))
+    if rules is None:
+        from app.models import NeuroProfile, ChildDisability
+        np_result = await db.execute(select(NeuroProfile).where(NeuroProfile.child_id == body.child_id))
+        neuro = np_result.scalar_one_or_none()
+        d_result = await db.execute(select(ChildDisability).where(ChildDisability.child_id == body.child_id))
+        disabilities = list(d_result.scalars().all())
+        rules = await engine.derive(child, neuro, disabilities, version)
     redis = get_redis()
     if redis:
         try:
             await redis.set(f"session:{session.session_id}:active", "1", ex=CACHE_SESSION_ACTIVE_TTL)
         except Exception:
             pass
+    after_commit(db, lambda: bump_child_version(body.child_id))
     return SessionStartResponse(
         session_id=session.session_id,
         ui_directives=rules.ui_directives,
@@ -51,6 +67,77 @@ async def start_session(
     )
 
 
+@router.post("/start:batch", response_model=SessionStartBatchResponse)
+async def start_sessions_batch(
+    body: SessionStartBatchRequest,
+    request: Request,
+    current_user: Caregiver = Depends(get_current_user_required),
+):
+    """Start sessions for a class: one query per table, one multi-row insert, one Redis pipeline."""
+    db = request.state.db
+    child_ids = list(dict.fromkeys(body.child_ids))
+    result = await db.execute(
+        select(ChildProfile).where(
+            ChildProfile.child_id.in_(child_ids),
+            ChildProfile.caregiver_id == current_user.caregiver_id,
+        )
+    )
+    children = {c.child_id: c for c in result.scalars().all()}
+    if len(children) != len(child_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Child not found or access denied",
+        )
+    engine = AccessibilityEngine()
+    # Taken before the profile rows are read: rules derived from rows changed meanwhile are not cached
+    versions = await engine.cache_versions(child_ids)
+    np_result = await db.execute(select(NeuroProfile).where(NeuroProfile.child_id.in_(child_ids)))
+    neuros = {n.child_id: n for n in np_result.scalars().all()}
+    d_result = await db.execute(select(ChildDisability).where(ChildDisability.child_id.in_(child_ids)))
+    disabilities: dict[UUID, list[ChildDisability]] = {}
+    for d in d_result.scalars().all():
+        disabilities.setdefault(d.child_id, []).append(d)
+    rules = await engine.derive_many([
+        (children[child_id], neuros.get(child_id), disabilities.get(child_id, [])) for child_id in child_ids
+    ], versions)
+    inserted = await db.execute(
+        insert(LearningSession)
+        .values([{"child_id": child_id} for child_id in child_ids])
+        .returning(LearningSession.child_id, LearningSession.session_id)
+    )
+    session_ids = dict(inserted.all())
+    await db.execute(
+        update(ChildProfile)
+        .where(ChildProfile.child_id.in_(child_ids))
+        .values(session_count=ChildProfile.session_count + 1)
+    )
+
+    async def mark_started() -> None:
+        # Active flags and version bumps in one round trip, once the sessions exist
+        redis = get_redis()
+        if not redis:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for session_id in session_ids.values():
+                    pipe.set(f"session:{session_id}:active", "1", ex=CACHE_SESSION_ACTIVE_TTL)
+                queue_child_version_bumps(pipe, child_ids)
+                await pipe.execute()
+        except Exception:
+            pass
+
+    after_commit(db, mark_started)
+    return SessionStartBatchResponse(sessions=[
+        SessionStartBatchItem(
+            child_id=child_id,
+            session_id=session_ids[child_id],
+            ui_directives=rules[child_id].ui_directives,
+            session_constraints=rules[child_id].session_constraints,
+        )
+        for child_id in child_ids
+    ])
+
+
 @router.post("/{session_id}/end", response_model=SessionEndResponse)
 async def end_session(
     session_id: UUID,
@@ -64,7 +151,7 @@ async def end_session(
     session = result.scalar_one_or_none()
     if not session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
-    await get_child(session.child_id, request, current_user)
+    await ensure_child_access(session.child_id, request, current_user)
     from datetime import datetime, timezone
     session.ended_at = datetime.now(timezone.utc)
     await db.flush()
@@ -74,6 +161,7 @@ async def end_session(
             await redis.delete(f"session:{session_id}:active")
         except Exception:
             pass
+    after_commit(db, lambda: bump_child_version(session.child_id))
     return SessionEndResponse(
         session_id=session.session_id,
         total_interactions=session.total_interactions or 0,
@@ -85,7 +173,7 @@ async def end_session(
     )
 
 
-@router.get("/{session_id}", response_model=SessionStatusResponse)
+@router.get("/{session_id}", response_model=SessionStatusResponse, dependencies=[Depends(read_only)])
 async def get_session(
     session_id: UUID,
     request: Request,
@@ -98,7 +186,7 @@ async def get_session(
     session = result.scalar_one_or_none()
     if not session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
-    await get_child(session.child_id, request, current_user)
+    await ensure_child_access(session.child_id, request, current_user)
     return SessionStatusResponse(
         session_id=session.session_id,
         child_id=session.child_id,
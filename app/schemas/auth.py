@@ -1,5 +1,7 @@
 """Auth request/response schemas."""
 
+from typing import Literal
+
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -7,7 +9,8 @@ class RegisterRequest(BaseModel):
     email: EmailStr
     password: str = Field(min_length=8, max_length=128)
     full_name: str = Field(min_length=1, max_length=150)
-    role: str = Field(default="parent", max_length=50)
+    # Self-service accounts are caregivers; admin rights come from ADMIN_EMAILS, never from the request
+    role: Literal["parent"] = "parent"
 
 
 class LoginRequest(BaseModel):
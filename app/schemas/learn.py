@@ -4,6 +4,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from app.constants import FEEDBACK_BATCH_MAX_ITEMS
+
 
 class AskRequest(BaseModel):
     child_id: UUID
@@ -62,6 +64,27 @@ class FeedbackResponse(BaseModel):
     next_review_days: float | None
 
 
+class FeedbackBatchItem(BaseModel):
+    interaction_id: UUID
+    topic: str
+    rating: int = Field(ge=1, le=4)
+    engagement_score: float = Field(ge=0, le=1, default=0.5)
+    child_reaction: str = Field(
+        pattern="^(POSITIVE|NEUTRAL|CONFUSED|FRUSTRATED|EXCITED)$"
+    )
+
+
+class FeedbackBatchRequest(BaseModel):
+    """Several ratings for one child (e.g. end of a quiz); same-topic ratings apply in order."""
+
+    child_id: UUID
+    items: list[FeedbackBatchItem] = Field(min_length=1, max_length=FEEDBACK_BATCH_MAX_ITEMS)
+
+
+class FeedbackBatchResponse(BaseModel):
+    results: list[FeedbackResponse]
+
+
 class UsageResponse(BaseModel):
     """Daily API usage for UI limits display."""
 
@@ -70,3 +93,5 @@ class UsageResponse(BaseModel):
     llm_daily_limit: int
     embed_requests: int
     embed_daily_limit: int
+    caregiver_llm_requests: int | None = None
+    caregiver_embed_requests: int | None = None
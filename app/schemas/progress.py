@@ -25,6 +25,8 @@ class ProgressDashboardResponse(BaseModel):
     mastery_records: list[MasteryRecordResponse] = Field(default_factory=list)
     total_sessions: int = 0
     total_interactions: int = 0
+    weak_topics: list[str] = Field(default_factory=list)
+    avg_mastery: float | None = None
 
 
 class TimelineDayPoint(BaseModel):
@@ -4,6 +4,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from app.constants import SESSION_START_BATCH_MAX_CHILDREN
+
 
 class SessionStartRequest(BaseModel):
     child_id: UUID
@@ -15,6 +17,20 @@ class SessionStartResponse(BaseModel):
     session_constraints: dict = Field(default_factory=dict)
 
 
+class SessionStartBatchRequest(BaseModel):
+    """Start a session for each child (e.g. a whole class); duplicate IDs start one session."""
+
+    child_ids: list[UUID] = Field(min_length=1, max_length=SESSION_START_BATCH_MAX_CHILDREN)
+
+
+class SessionStartBatchItem(SessionStartResponse):
+    child_id: UUID
+
+
+class SessionStartBatchResponse(BaseModel):
+    sessions: list[SessionStartBatchItem]  # in request order
+
+
 class SessionEndResponse(BaseModel):
     session_id: UUID
     total_interactions: int
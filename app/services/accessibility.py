@@ -1,15 +1,27 @@
-"""AccessibilityEngine: derives AdaptationRules from child profile (neuro + disabilities)."""
+"""AccessibilityEngine: derives AdaptationRules from child profile (neuro + disabilities).
 
-from dataclasses import dataclass
-from uuid import UUID
+The rules are a declarative table (RULE_TABLE): one row per diagnosis or disability with its prompt rules
+and adjustments. At import each row gets a bit; a profile maps to a bitmask, and the merged fragment for
+a mask is built once from the rows' precompiled fragments and reused. Deriving is then the mask plus the
+profile-specific parts (sensory threshold, accommodations), memoized by profile fingerprint.
+`python -m app.services.accessibility warm` derives and caches every child's rules (nightly).
+"""
+
+import argparse
+import asyncio
 import json
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
 
+from app.cache import TwoTierCache
 from app.models import ChildProfile
 from app.models.child import NeuroProfile, ChildDisability
-from app.constants import CACHE_ADAPTATION_TTL
-
-# Redis for caching (use app.redis_client.get_redis elsewhere)
-from app.redis_client import get_redis
+from app.constants import ADAPTATION_MEMO_SIZE, CACHE_ADAPTATION_TTL
 
 
 @dataclass
@@ -20,119 +32,283 @@ class AdaptationRules:
     session_constraints: dict
 
 
+@dataclass(frozen=True)
+class Rule:
+    """One row of RULE_TABLE.
+
+    kind: "diagnosis" or "disability"; code: diagnosis (prefix match if `prefix`) or disability type.
+    adjust: (section, key, op, value) with op "set", "min" (never above value) or "max" (never below).
+    Prompt rules may use {visual}, the child's visual sensory threshold.
+    """
+
+    kind: str
+    code: str
+    prefix: bool = False
+    prompt_rules: tuple[str, ...] = ()
+    adjust: tuple[tuple[str, str, str, Any], ...] = ()
+    sensory_cap: bool = False  # content_filters.sensory_cap <= visual + 0.1; no emojis below 0.4
+
+
+# Diagnosis rows first, in prompt order; disability rows only adjust (their order does not matter)
+RULE_TABLE: tuple[Rule, ...] = (
+    Rule("diagnosis", "ADHD", prefix=True, prompt_rules=(
+        "Use at most 4 sentences per response.",
+        "Use gamified framing and one clear next action.",
+    ), adjust=(("session_constraints", "break_every_mins", "min", 10),)),
+    Rule("diagnosis", "ASD", prefix=True, prompt_rules=(
+        "Use literal language only; no metaphors or idioms.",
+        "State the goal first, then give predictable structure.",
+        "Avoid open-ended questions; prefer clear choices.",
+    )),
+    Rule("diagnosis", "DYSLEXIA", prompt_rules=(
+        "Keep Flesch readability >= 70; use numbered steps only; no long passages.",
+    ), adjust=(("content_filters", "min_flesch", "max", 70),)),
+    Rule("diagnosis", "DYSCALCULIA", prompt_rules=(
+        "Always provide visual representations for maths; step-by-step only.",
+    )),
+    Rule("diagnosis", "SPD", prompt_rules=(
+        "Cap sensory load to child's visual threshold ({visual}).",
+    ), sensory_cap=True),
+    Rule("diagnosis", "ANXIETY", prompt_rules=(
+        "Use warm, reassuring tone; no time pressure; set explicit expectations.",
+    )),
+    Rule("disability", "VISUAL_IMPAIRMENT", adjust=(
+        # screen_reader defaults to True; an accommodation of the same name overrides it
+        ("ui_directives", "screen_reader", "set", True),
+        ("ui_directives", "describe_all_visuals", "set", True),
+        ("ui_directives", "no_color_only_cues", "set", True),
+    )),
+    Rule("disability", "HEARING_IMPAIRMENT", adjust=(
+        ("content_filters", "exclude_audio", "set", True),
+        ("ui_directives", "captions", "set", True),
+        ("ui_directives", "text_only_mode", "set", True),
+    )),
+    Rule("disability", "MOTOR_IMPAIRMENT", adjust=(
+        ("ui_directives", "large_targets", "set", True),
+        ("ui_directives", "keyboard_only", "set", True),
+        ("session_constraints", "time_factor", "max", 2.0),
+    )),
+    Rule("disability", "COGNITIVE_DISABILITY", prompt_rules=("One instruction at a time.",), adjust=(
+        ("content_filters", "max_difficulty", "min", 4),
+        ("content_filters", "min_flesch", "max", 70),
+    )),
+    Rule("disability", "SPEECH_IMPAIRMENT", adjust=(
+        ("ui_directives", "no_voice_input_required", "set", True),
+        ("ui_directives", "text_or_selection_only", "set", True),
+    )),
+    Rule("disability", "CHRONIC_FATIGUE", adjust=(
+        ("session_constraints", "max_session_mins", "min", 20),
+        ("session_constraints", "break_every_mins", "min", 5),
+        ("content_filters", "max_word_count", "set", 100),
+    )),
+)
+
+_DEFAULTS = {
+    "content_filters": {"max_difficulty": 10, "min_flesch": 0, "allowed_formats": None, "sensory_cap": 1.0},
+    "session_constraints": {"max_session_mins": 60, "break_every_mins": 15, "time_factor": 1.0},
+}
+
+# Compiled at import: bit per row, exact-code lookups, prefix rows
+_EXACT = {(rule.kind, rule.code): 1 << i for i, rule in enumerate(RULE_TABLE) if not rule.prefix}
+_PREFIXES = [(rule.kind, rule.code, 1 << i) for i, rule in enumerate(RULE_TABLE) if rule.prefix]
+_SENSORY_MASK = sum(1 << i for i, rule in enumerate(RULE_TABLE) if rule.sensory_cap)
+
+
+@lru_cache(maxsize=1024)
+def _code_bits(kind: str, code: str) -> int:
+    bits = _EXACT.get((kind, code), 0)
+    for row_kind, prefix, bit in _PREFIXES:
+        if row_kind == kind and code.startswith(prefix):
+            bits |= bit
+    return bits
+
+
+@dataclass
+class _Fragment:
+    """Merged rows for one mask: everything except the profile-specific values."""
+
+    prompt_rules: tuple[str, ...]
+    sections: dict[str, dict] = field(default_factory=dict)
+
+
+@lru_cache(maxsize=1024)
+def _fragment(mask: int) -> _Fragment:
+    sections = {"ui_directives": {}, **{name: dict(values) for name, values in _DEFAULTS.items()}}
+    prompt_rules: list[str] = []
+    for i, rule in enumerate(RULE_TABLE):
+        if not mask & (1 << i):
+            continue
+        prompt_rules.extend(rule.prompt_rules)
+        for section, key, op, value in rule.adjust:
+            target = sections[section]
+            if op == "min":
+                target[key] = min(target.get(key, value), value)
+            elif op == "max":
+                target[key] = max(target.get(key, value), value)
+            else:
+                target[key] = value
+    return _Fragment(tuple(prompt_rules), sections)
+
+
+def profile_mask(neuro: NeuroProfile | None, disabilities: Sequence[ChildDisability]) -> int:
+    """Bitmask of the RULE_TABLE rows that apply to a profile."""
+    mask = 0
+    for d in (neuro.diagnoses or []) if neuro else []:
+        mask |= _code_bits("diagnosis", d)
+    for d in disabilities:
+        mask |= _code_bits("disability", d.disability_type)
+    return mask
+
+
+def _fingerprint(neuro: NeuroProfile | None, disabilities: Sequence[ChildDisability]) -> tuple:
+    """Everything the derived rules depend on."""
+    mask = profile_mask(neuro, disabilities)
+    visual = ((neuro.sensory_thresholds or {}) if neuro else {}).get("visual", 0.5) if mask & _SENSORY_MASK else None
+    accommodations = tuple(json.dumps(d.accommodations, sort_keys=True) for d in disabilities if d.accommodations)
+    return mask, visual, accommodations
+
+
+def _build(fingerprint: tuple) -> AdaptationRules:
+    mask, visual, accommodations = fingerprint
+    fragment = _fragment(mask)
+    sections = {name: dict(values) for name, values in fragment.sections.items()}
+    prompt_rules = list(fragment.prompt_rules)
+    if visual is not None:
+        prompt_rules = [r.format(visual=visual) if "{visual}" in r else r for r in prompt_rules]
+        content_filters = sections["content_filters"]
+        content_filters["sensory_cap"] = min(content_filters["sensory_cap"], visual + 0.1)
+        if visual < 0.4:
+            sections["ui_directives"]["no_emojis"] = True
+    # Disability accommodations are copied into ui_directives last, so they override the table
+    for raw in accommodations:
+        sections["ui_directives"].update(json.loads(raw))
+    return AdaptationRules(prompt_rules=prompt_rules, **sections)
+
+
+# Rules per child: in process (shared, read-only AdaptationRules) in front of Redis for CACHE_ADAPTATION_TTL
+adaptation_cache = TwoTierCache(
+    "adaptation", ttl=CACHE_ADAPTATION_TTL, load=lambda data: AdaptationRules(**data)
+)
+
+
+async def invalidate_adaptation(child_id: UUID) -> None:
+    """Call after a child's neuro profile or disabilities change (post-commit); evicts it in every worker."""
+    await adaptation_cache.invalidate(child_id)
+
+
 class AccessibilityEngine:
-    """Derive ALL adaptation rules from child's neuro_profile + disabilities. Cached in Redis 30 min."""
-
-    async def derive(self, child: ChildProfile, neuro: NeuroProfile | None, disabilities: list[ChildDisability]) -> AdaptationRules:
-        """Derive rules from profile. Use cache if available."""
-        redis = get_redis()
-        if redis:
-            try:
-                raw = await redis.get(f"adaptation:{child.child_id}")
-                if raw:
-                    data = json.loads(raw)
-                    return AdaptationRules(
-                        prompt_rules=data["prompt_rules"],
-                        ui_directives=data["ui_directives"],
-                        content_filters=data["content_filters"],
-                        session_constraints=data["session_constraints"],
-                    )
-            except Exception:
-                pass
+    """Derive ALL adaptation rules from child's neuro_profile + disabilities. Cached in process and in Redis."""
+
+    # Derived rules by profile fingerprint, shared by every engine (children with the same profile share one)
+    _memo: OrderedDict[tuple, AdaptationRules] = OrderedDict()
+
+    async def derive(
+        self,
+        child: ChildProfile,
+        neuro: NeuroProfile | None,
+        disabilities: list[ChildDisability],
+        version: tuple[int, bytes] | None = None,
+    ) -> AdaptationRules:
+        """Derive rules from profile. Use cache if available.
+
+        `version` (cache_version(), taken before the profile rows were read) keeps rules derived from rows
+        that changed meanwhile out of the cache.
+        """
+        cached = await self.cached(child.child_id)
+        if cached is not None:
+            return cached
         rules = self._derive_impl(child, neuro, disabilities)
-        if redis:
-            try:
-                await redis.set(
-                    f"adaptation:{child.child_id}",
-                    json.dumps({
-                        "prompt_rules": rules.prompt_rules,
-                        "ui_directives": rules.ui_directives,
-                        "content_filters": rules.content_filters,
-                        "session_constraints": rules.session_constraints,
-                    }),
-                    ex=CACHE_ADAPTATION_TTL,
-                )
-            except Exception:
-                pass
+        await adaptation_cache.set(child.child_id, asdict(rules), version)
+        return rules
+
+    async def derive_many(
+        self,
+        profiles: Sequence[tuple[ChildProfile, NeuroProfile | None, list[ChildDisability]]],
+        versions: dict[str, tuple[int, bytes]] | None = None,
+    ) -> dict[UUID, AdaptationRules]:
+        """derive() for many children: one batched cache read, and one pipelined write for the misses."""
+        cached = await adaptation_cache.get_many(child.child_id for child, _, _ in profiles)
+        rules: dict[UUID, AdaptationRules] = {}
+        derived: dict[UUID, dict] = {}
+        for child, neuro, disabilities in profiles:
+            hit = cached.get(str(child.child_id))
+            if hit is None:
+                hit = self._derive_impl(child, neuro, disabilities)
+                derived[child.child_id] = asdict(hit)
+            rules[child.child_id] = hit
+        await adaptation_cache.set_many(derived, versions)
         return rules
 
+    async def cached(self, child_id: UUID) -> AdaptationRules | None:
+        """Cached rules for the child, or None. A local hit is a dict lookup; otherwise one (batched) Redis read."""
+        return await adaptation_cache.get(child_id)
+
+    async def cache_version(self, child_id: UUID) -> tuple[int, bytes]:
+        """Version for derive(); take it before reading the profile rows (batched with concurrent reads)."""
+        return await adaptation_cache.version(child_id)
+
+    async def cache_versions(self, child_ids: Sequence[UUID]) -> dict[str, tuple[int, bytes]]:
+        """Versions for derive_many(), in one batched Redis round trip."""
+        return await adaptation_cache.versions(child_ids)
+
     def _derive_impl(
         self,
         child: ChildProfile,
         neuro: NeuroProfile | None,
         disabilities: list[ChildDisability],
     ) -> AdaptationRules:
-        prompt_rules: list[str] = []
-        ui_directives: dict = {}
-        content_filters: dict = {"max_difficulty": 10, "min_flesch": 0, "allowed_formats": None, "sensory_cap": 1.0}
-        session_constraints: dict = {"max_session_mins": 60, "break_every_mins": 15, "time_factor": 1.0}
-
-        diagnoses = (neuro.diagnoses or []) if neuro else []
-        modalities = (neuro.preferred_modalities or ["TEXT"]) if neuro else []
-        sensory = (neuro.sensory_thresholds or {}) if neuro else {}
-        attention_mins = neuro.attention_span_mins if neuro else 10
-        comm_style = (neuro.communication_style or "LITERAL") if neuro else "LITERAL"
-        frustration = neuro.frustration_threshold if neuro else 0.6
-
-        # Diagnosis-derived rules
-        if any(d.startswith("ADHD") for d in diagnoses):
-            prompt_rules.append("Use at most 4 sentences per response.")
-            prompt_rules.append("Use gamified framing and one clear next action.")
-            session_constraints["break_every_mins"] = min(session_constraints["break_every_mins"], 10)
-        if any(d.startswith("ASD") for d in diagnoses):
-            prompt_rules.append("Use literal language only; no metaphors or idioms.")
-            prompt_rules.append("State the goal first, then give predictable structure.")
-            prompt_rules.append("Avoid open-ended questions; prefer clear choices.")
-        if "DYSLEXIA" in diagnoses:
-            prompt_rules.append("Keep Flesch readability >= 70; use numbered steps only; no long passages.")
-            content_filters["min_flesch"] = max(content_filters.get("min_flesch", 0), 70)
-        if "DYSCALCULIA" in diagnoses:
-            prompt_rules.append("Always provide visual representations for maths; step-by-step only.")
-        if "SPD" in diagnoses:
-            vis = sensory.get("visual", 0.5)
-            content_filters["sensory_cap"] = min(content_filters.get("sensory_cap", 1.0), vis + 0.1)
-            prompt_rules.append(f"Cap sensory load to child's visual threshold ({vis}).")
-            if vis < 0.4:
-                ui_directives["no_emojis"] = True
-        if "ANXIETY" in diagnoses:
-            prompt_rules.append("Use warm, reassuring tone; no time pressure; set explicit expectations.")
-
-        # Disability-derived rules
-        for d in disabilities:
-            t = d.disability_type
-            acc = d.accommodations or {}
-            if t == "VISUAL_IMPAIRMENT":
-                ui_directives["screen_reader"] = acc.get("screen_reader", True)
-                ui_directives["describe_all_visuals"] = True
-                ui_directives["no_color_only_cues"] = True
-            elif t == "HEARING_IMPAIRMENT":
-                content_filters["exclude_audio"] = True
-                ui_directives["captions"] = True
-                ui_directives["text_only_mode"] = True
-            elif t == "MOTOR_IMPAIRMENT":
-                ui_directives["large_targets"] = acc.get("large_targets", True)
-                ui_directives["keyboard_only"] = True
-                session_constraints["time_factor"] = max(session_constraints.get("time_factor", 1.0), 2.0)
-            elif t == "COGNITIVE_DISABILITY":
-                content_filters["max_difficulty"] = min(content_filters.get("max_difficulty", 10), 4)
-                content_filters["min_flesch"] = max(content_filters.get("min_flesch", 0), 70)
-                prompt_rules.append("One instruction at a time.")
-            elif t == "SPEECH_IMPAIRMENT":
-                ui_directives["no_voice_input_required"] = True
-                ui_directives["text_or_selection_only"] = True
-            elif t == "CHRONIC_FATIGUE":
-                session_constraints["max_session_mins"] = min(session_constraints.get("max_session_mins", 60), 20)
-                session_constraints["break_every_mins"] = min(session_constraints.get("break_every_mins", 15), 5)
-                content_filters["max_word_count"] = 100
-
-        # Merge disability accommodations into ui_directives
-        for d in disabilities:
-            for k, v in (d.accommodations or {}).items():
-                ui_directives[k] = v
-
-        return AdaptationRules(
-            prompt_rules=prompt_rules,
-            ui_directives=ui_directives,
-            content_filters=content_filters,
-            session_constraints=session_constraints,
-        )
+        fingerprint = _fingerprint(neuro, disabilities)
+        rules = self._memo.get(fingerprint)
+        if rules is None:
+            rules = self._memo[fingerprint] = _build(fingerprint)
+            if len(self._memo) > ADAPTATION_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(fingerprint)
+        return rules
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.database import async_session_factory, engine
+
+    accessibility = AccessibilityEngine()
+    warmed = 0
+    async with async_session_factory() as db:
+        last_id = None
+        while True:
+            query = select(ChildProfile).order_by(ChildProfile.child_id).limit(args.batch)
+            if last_id is not None:
+                query = query.where(ChildProfile.child_id > last_id)
+            children = list((await db.execute(query)).scalars().all())
+            if not children:
+                break
+            ids = [c.child_id for c in children]
+            versions = await adaptation_cache.versions(ids)
+            neuros = {
+                n.child_id: n
+                for n in (await db.execute(select(NeuroProfile).where(NeuroProfile.child_id.in_(ids)))).scalars()
+            }
+            disabilities: dict[UUID, list[ChildDisability]] = {}
+            for d in (await db.execute(select(ChildDisability).where(ChildDisability.child_id.in_(ids)))).scalars():
+                disabilities.setdefault(d.child_id, []).append(d)
+            # Recompute rather than read: the point is to refresh every entry
+            await adaptation_cache.set_many({
+                c.child_id: asdict(accessibility._derive_impl(c, neuros.get(c.child_id), disabilities.get(c.child_id, [])))
+                for c in children
+            }, versions)
+            warmed += len(children)
+            last_id = ids[-1]
+        print(f"Derived adaptation rules for {warmed} children")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage cached adaptation rules.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("warm", help="derive and cache rules for every child (e.g. nightly)")
+    warm.add_argument("--batch", type=int, default=500, help="children per query and Redis pipeline")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
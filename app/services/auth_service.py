@@ -1,30 +1,131 @@
 """JWT and caregiver auth service."""
 
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
 import bcrypt
 from jose import JWTError, jwt
+from prometheus_client import Counter, Gauge, Histogram
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models import Caregiver
+from app.constants import (
+    AUTH_PRINCIPAL_CACHE_MAX_TTL,
+    AUTH_PRINCIPAL_CACHE_SIZE,
+    CACHE_CHILD_OWNERSHIP_TTL,
+)
+from app.exceptions import AuthBusyError
+from app.models import Caregiver, ChildProfile
+from app.redis_client import batched, get_redis
 
 # bcrypt has a 72-byte limit; use first 72 bytes of UTF-8 to stay within spec
 BCRYPT_MAX_PASSWORD_BYTES = 72
 
+HASH_QUEUE_DEPTH = Gauge("auth_password_hash_queue_depth", "Password hash/verify calls waiting or running")
+HASH_SECONDS = Histogram(
+    "auth_password_hash_seconds",
+    "Password hash/verify latency including pool wait",
+    ["op"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HASH_REJECTED = Counter("auth_password_hash_rejected_total", "Password hash/verify calls refused", ["reason"])
 
-def hash_password(password: str) -> str:
+
+def _hash_sync(password: str, rounds: int) -> str:
     pw_bytes = password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
-    return bcrypt.hashpw(pw_bytes, bcrypt.gensalt(rounds=12)).decode("utf-8")
+    return bcrypt.hashpw(pw_bytes, bcrypt.gensalt(rounds=rounds)).decode("utf-8")
 
 
-def verify_password(plain: str, hashed: str) -> bool:
+def _verify_sync(plain: str, hashed: str) -> bool:
     pw_bytes = plain.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
     return bcrypt.checkpw(pw_bytes, hashed.encode("utf-8"))
 
 
+class PasswordHasher:
+    """Runs bcrypt in a small dedicated thread pool so a login burst never blocks the event loop.
+
+    bcrypt releases the GIL, so threads give real parallelism. Calls beyond BCRYPT_MAX_PENDING are
+    refused (503) instead of queueing without bound; BCRYPT_PER_IP_CONCURRENCY (0 = off) caps
+    concurrent calls from one client (429).
+    """
+
+    def __init__(self):
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._per_ip: dict[str, int] = {}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=get_settings().bcrypt_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run(self, op: str, ip: str | None, fn, *args):
+        settings = get_settings()
+        if self._pending >= settings.bcrypt_max_pending:
+            HASH_REJECTED.labels(reason="queue_full").inc()
+            raise AuthBusyError("Sign-in is busy. Please try again in a moment.")
+        limit = settings.bcrypt_per_ip_concurrency
+        if ip and limit and self._per_ip.get(ip, 0) >= limit:
+            HASH_REJECTED.labels(reason="per_ip").inc()
+            raise AuthBusyError("Too many sign-in attempts in progress.", per_client=True)
+
+        self._pending += 1
+        if ip:
+            self._per_ip[ip] = self._per_ip.get(ip, 0) + 1
+        HASH_QUEUE_DEPTH.set(self._pending)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            HASH_SECONDS.labels(op=op).observe(time.perf_counter() - start)
+            self._pending -= 1
+            HASH_QUEUE_DEPTH.set(self._pending)
+            if ip:
+                left = self._per_ip.get(ip, 1) - 1
+                if left:
+                    self._per_ip[ip] = left
+                else:
+                    self._per_ip.pop(ip, None)
+
+    async def hash(self, password: str, ip: str | None = None) -> str:
+        return await self._run("hash", ip, _hash_sync, password, get_settings().bcrypt_rounds)
+
+    async def verify(self, plain: str, hashed: str, ip: str | None = None) -> bool:
+        return await self._run("verify", ip, _verify_sync, plain, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password(password: str, ip: str | None = None) -> str:
+    return await password_hasher.hash(password, ip)
+
+
+async def verify_password(plain: str, hashed: str, ip: str | None = None) -> bool:
+    return await password_hasher.verify(plain, hashed, ip)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a different cost than BCRYPT_ROUNDS ($2b$<cost>$...)."""
+    try:
+        return int(hashed.split("$")[2]) != get_settings().bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
+
+
 def create_access_token(sub: str) -> str:
     settings = get_settings()
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_access_expire_minutes)
@@ -83,3 +184,119 @@ async def get_caregiver_by_id(db: AsyncSession, caregiver_id: UUID) -> Caregiver
 async def get_caregiver_by_email(db: AsyncSession, email: str) -> Caregiver | None:
     result = await db.execute(select(Caregiver).where(Caregiver.email == email))
     return result.scalar_one_or_none()
+
+
+def is_admin(caregiver: Caregiver) -> bool:
+    """Admin rights come from the ADMIN_EMAILS allowlist only; the role column is caller-influenced."""
+    return caregiver.email.lower() in {e.lower() for e in get_settings().admin_emails}
+
+
+class PrincipalCache:
+    """Bounded in-process LRU: access-token hash -> verified caregiver fields.
+
+    Entries live until the token's exp, capped at AUTH_PRINCIPAL_CACHE_MAX_TTL so role changes show up.
+    A hit skips both JWT verification and the caregivers lookup.
+    """
+
+    def __init__(self, max_size: int = AUTH_PRINCIPAL_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Caregiver | None:
+        """A transient (session-less) Caregiver for a cached token, or None."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, fields = entry
+        if expires <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return Caregiver(**fields)
+
+    def put(self, token: str, token_exp: float, caregiver: Caregiver) -> None:
+        expires = min(token_exp, time.time() + AUTH_PRINCIPAL_CACHE_MAX_TTL)
+        self._entries[self._key(token)] = (expires, {
+            "caregiver_id": caregiver.caregiver_id,
+            "email": caregiver.email,
+            "full_name": caregiver.full_name,
+            "role": caregiver.role,
+        })
+        self._entries.move_to_end(self._key(token))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+# Ownership set per caregiver; the sentinel member marks a complete set (an empty one still exists)
+_OWNERSHIP_SENTINEL = "-"
+
+
+def _ownership_key(caregiver_id: UUID) -> str:
+    return f"caregiver:children:{caregiver_id}"
+
+
+def _ownership_generation_key(caregiver_id: UUID) -> str:
+    # Bumped by every invalidation; a set loaded from the DB is only stored if it did not change meanwhile
+    return f"caregiver:children:{caregiver_id}:gen"
+
+
+async def caregiver_owns_child(db: AsyncSession, caregiver_id: UUID, child_id: UUID) -> bool:
+    """Ownership check from Redis; the caregiver's child IDs are loaded once per TTL on a miss."""
+    redis = get_redis()
+    key = _ownership_key(caregiver_id)
+    generation_key = _ownership_generation_key(caregiver_id)
+    if redis:
+        try:
+            # Batched: goes out with the request's other cache reads when they are issued together
+            batch = batched(redis)
+            built, member, generation = await asyncio.gather(
+                batch.exists(key), batch.sismember(key, str(child_id)), batch.get(generation_key)
+            )
+            if built:
+                return bool(member)
+        except Exception:
+            redis = None
+    result = await db.execute(select(ChildProfile.child_id).where(ChildProfile.caregiver_id == caregiver_id))
+    owned = [str(row[0]) for row in result.all()]
+    if redis:
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                # An invalidation after the generation was read means the rows may predate it: don't store them
+                await pipe.watch(generation_key)
+                if await pipe.get(generation_key) == generation:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.sadd(key, _OWNERSHIP_SENTINEL, *owned)
+                    pipe.expire(key, CACHE_CHILD_OWNERSHIP_TTL)
+                    await pipe.execute()
+        except Exception:
+            pass
+    return str(child_id) in owned
+
+
+async def invalidate_child_ownership(caregiver_id: UUID) -> None:
+    """Call after a child is created, deleted or moved to another caregiver (post-commit)."""
+    redis = get_redis()
+    if not redis:
+        return
+    generation_key = _ownership_generation_key(caregiver_id)
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(generation_key)
+            # Outlives any fill that could have read the old generation
+            pipe.expire(generation_key, CACHE_CHILD_OWNERSHIP_TTL)
+            pipe.delete(_ownership_key(caregiver_id))
+            await pipe.execute()
+    except Exception:
+        pass
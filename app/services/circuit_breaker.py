@@ -0,0 +1,203 @@
+"""CircuitBreaker: fail fast while Google AI is degraded; state shared across workers through Redis.
+
+Per operation (llm, embed):
+  cb:{op}:{bucket}  hash, ok/fail counts for one CIRCUIT_BUCKET_SECONDS bucket (sliding failure-rate window)
+  cb:{op}:open      present while open (expires after CIRCUIT_OPEN_SECONDS)
+  cb:{op}:tripped   present from tripping until a probe succeeds; tripped without open means half-open
+  cb:{op}:probe     the single call let through while half-open (expires after CIRCUIT_PROBE_TIMEOUT_SECONDS)
+
+Closed: calls pass and are counted; CIRCUIT_MIN_CALLS calls at CIRCUIT_FAILURE_RATE or worse in the window
+opens the circuit. Open: calls raise CircuitOpenError without reaching the provider. Half-open: one probe
+goes through; success closes the circuit and clears the window, failure opens it again.
+Without Redis (or when it errors) each worker keeps the same state in process.
+"""
+
+import time
+
+import structlog
+from prometheus_client import Counter
+
+from app.constants import (
+    CIRCUIT_BUCKET_SECONDS,
+    CIRCUIT_FAILURE_RATE,
+    CIRCUIT_MIN_CALLS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_PROBE_TIMEOUT_SECONDS,
+    CIRCUIT_WINDOW_SECONDS,
+)
+from app.exceptions import CircuitOpenError
+from app.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+CIRCUIT_REJECTED = Counter("circuit_rejected_total", "Calls refused by an open circuit", ["operation"])
+CIRCUIT_OPENED = Counter("circuit_opened_total", "Times a circuit opened (tripped or failed probe)", ["operation"])
+
+_BUCKETS = CIRCUIT_WINDOW_SECONDS // CIRCUIT_BUCKET_SECONDS
+
+# KEYS: open, tripped, probe. ARGV[1]: probe ttl ms.
+# {0, ms until open ends (0 = unknown)} refused, {1, 0} allowed, {2, 0} allowed as the half-open probe
+_ALLOW = """
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl > 0 then return {0, ttl} end
+if redis.call('EXISTS', KEYS[2]) == 0 then return {1, 0} end
+if redis.call('SET', KEYS[3], '1', 'NX', 'PX', ARGV[1]) then return {2, 0} end
+return {0, 0}
+"""
+
+# KEYS: open, tripped, probe, window buckets (current first).
+# ARGV: ok (1/0), probe (1/0), bucket ttl s, open ms, min calls, failure rate. Returns 1 if the circuit opened.
+_RECORD = """
+local ok = ARGV[1] == '1'
+if ARGV[2] == '1' then
+    redis.call('DEL', KEYS[3])
+    if ok then
+        redis.call('DEL', KEYS[2], unpack(KEYS, 4))
+        return 0
+    end
+    redis.call('SET', KEYS[1], '1', 'PX', ARGV[4])
+    return 1
+end
+redis.call('HINCRBY', KEYS[4], ok and 'ok' or 'fail', 1)
+redis.call('EXPIRE', KEYS[4], ARGV[3])
+if ok or redis.call('EXISTS', KEYS[2]) == 1 then return 0 end
+local calls, fails = 0, 0
+for i = 4, #KEYS do
+    local v = redis.call('HMGET', KEYS[i], 'ok', 'fail')
+    local o, f = tonumber(v[1]) or 0, tonumber(v[2]) or 0
+    calls, fails = calls + o + f, fails + f
+end
+if calls >= tonumber(ARGV[5]) and fails / calls >= tonumber(ARGV[6]) then
+    redis.call('SET', KEYS[1], '1', 'PX', ARGV[4])
+    redis.call('SET', KEYS[2], '1')
+    return 1
+end
+return 0
+"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one provider operation.
+
+    Usage: `probe = await breaker.allow()` before the call (raises CircuitOpenError while open), then
+    `await breaker.record(ok, probe)` with the outcome, or `await breaker.release(probe)` if the call never
+    reached the provider.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._scripts: dict = {}
+        self._client = None
+        # Open deadline learned from Redis or set locally: refuse without a round trip until then
+        self._open_until = 0.0
+        # In-process state, used when Redis is unavailable
+        self._buckets: dict[int, list[int]] = {}
+        self._tripped = False
+        self._probe_until = 0.0
+
+    def _script(self, redis, name: str, source: str):
+        if redis is not self._client:
+            self._client, self._scripts = redis, {}
+        if name not in self._scripts:
+            self._scripts[name] = redis.register_script(source)
+        return self._scripts[name]
+
+    def _keys(self) -> list[str]:
+        return [f"cb:{self.operation}:open", f"cb:{self.operation}:tripped", f"cb:{self.operation}:probe"]
+
+    def _bucket_keys(self) -> list[str]:
+        current = int(time.time() // CIRCUIT_BUCKET_SECONDS)
+        return [f"cb:{self.operation}:{current - i}" for i in range(_BUCKETS)]
+
+    def _reject(self) -> None:
+        CIRCUIT_REJECTED.labels(operation=self.operation).inc()
+        raise CircuitOpenError(f"{self.operation} circuit is open.")
+
+    def _opened(self) -> None:
+        self._open_until = time.monotonic() + CIRCUIT_OPEN_SECONDS
+        CIRCUIT_OPENED.labels(operation=self.operation).inc()
+        logger.warning("circuit_opened", operation=self.operation)
+
+    async def allow(self) -> bool:
+        """Raise CircuitOpenError while open. Returns True if this call is the half-open probe."""
+        now = time.monotonic()
+        if now < self._open_until:
+            self._reject()
+        redis = get_redis()
+        if redis:
+            try:
+                code, ttl = await self._script(redis, "allow", _ALLOW)(
+                    keys=self._keys(), args=[CIRCUIT_PROBE_TIMEOUT_SECONDS * 1000]
+                )
+            except Exception:
+                pass
+            else:
+                if int(code) == 0:
+                    if int(ttl) > 0:
+                        self._open_until = now + int(ttl) / 1000
+                    self._reject()
+                return int(code) == 2
+        if not self._tripped:
+            return False
+        if now < self._probe_until:
+            self._reject()
+        self._probe_until = now + CIRCUIT_PROBE_TIMEOUT_SECONDS
+        return True
+
+    async def record(self, ok: bool, probe: bool = False) -> None:
+        """Report the outcome of an allowed call."""
+        redis = get_redis()
+        if redis:
+            try:
+                opened = await self._script(redis, "record", _RECORD)(
+                    keys=[*self._keys(), *self._bucket_keys()],
+                    args=[
+                        int(ok), int(probe), CIRCUIT_WINDOW_SECONDS + CIRCUIT_BUCKET_SECONDS,
+                        CIRCUIT_OPEN_SECONDS * 1000, CIRCUIT_MIN_CALLS, CIRCUIT_FAILURE_RATE,
+                    ],
+                )
+            except Exception:
+                pass
+            else:
+                if int(opened):
+                    self._opened()
+                return
+        self._record_local(ok, probe)
+
+    async def release(self, probe: bool) -> None:
+        """Give back a half-open probe that ended without an outcome (refused locally, shed, or cancelled)."""
+        if not probe:
+            return
+        self._probe_until = 0.0
+        redis = get_redis()
+        if redis:
+            try:
+                await redis.delete(f"cb:{self.operation}:probe")
+            except Exception:
+                pass
+
+    def _record_local(self, ok: bool, probe: bool) -> None:
+        if probe:
+            self._probe_until = 0.0
+            if ok:
+                self._tripped = False
+                self._buckets.clear()
+            else:
+                self._opened()
+            return
+        current = int(time.time() // CIRCUIT_BUCKET_SECONDS)
+        for bucket in [b for b in self._buckets if b <= current - _BUCKETS]:
+            del self._buckets[bucket]
+        counts = self._buckets.setdefault(current, [0, 0])
+        counts[0 if ok else 1] += 1
+        if ok or self._tripped:
+            return
+        calls = sum(o + f for o, f in self._buckets.values())
+        fails = sum(f for _, f in self._buckets.values())
+        if calls >= CIRCUIT_MIN_CALLS and fails / calls >= CIRCUIT_FAILURE_RATE:
+            self._tripped = True
+            self._opened()
+
+
+llm_breaker = CircuitBreaker("llm")
+embed_breaker = CircuitBreaker("embed")
@@ -6,8 +6,13 @@ import hashlib
 from app.config import get_settings
 from app.constants import CACHE_EMBEDDING_TTL
 from app.exceptions import LearningServiceUnavailableError
-from app.redis_client import get_redis
-from app.usage import record_embed_use
+from app.redis_client import batched, get_redis
+from app.services.circuit_breaker import embed_breaker
+from app.services.quota import embed_quota
+
+
+def _cache_key(text: str) -> str:
+    return f"embedding:{hashlib.sha256(text.encode()).hexdigest()[:16]}"
 
 
 class EmbeddingService:
@@ -16,65 +21,92 @@ class EmbeddingService:
     def __init__(self):
         self.settings = get_settings()
 
-    async def embed(self, text: str) -> list[float]:
-        """Return 768-dim embedding (Google); use cache if present. Retries on 429, raises LearningServiceUnavailableError on quota/errors."""
-        key_hex = hashlib.sha256(text.encode()).hexdigest()[:16]
+    async def embed(self, text: str, cache_only: bool = False) -> list[float] | None:
+        """Return 768-dim embedding (Google); use cache if present. Retries on 429, raises LearningServiceUnavailableError on quota/errors.
+
+        With cache_only, a cache miss returns None instead of calling Google.
+        """
+        vec = await self.cached(text)
+        if vec is not None or cache_only:
+            return vec
+        return await self.generate(text)
+
+    async def cached(self, text: str) -> list[float] | None:
+        """Cached embedding or None; the read is batched with concurrent Redis reads."""
         redis = get_redis()
         if redis:
             try:
-                raw = await redis.get(f"embedding:{key_hex}")
+                raw = await batched(redis).get(_cache_key(text))
                 if raw:
                     import msgpack
 
                     return msgpack.unpackb(raw)
             except Exception:
                 pass
+        return None
 
+    async def generate(self, text: str) -> list[float]:
+        """Embed with Google (no cache read) and cache the result."""
         from google import genai
         from google.genai.types import EmbedContentConfig
 
         config = EmbedContentConfig(output_dimensionality=768)
         for attempt in range(3):
-            # New client per attempt: exiting "async with client.aio" closes the aio client, so reuse would raise "client has been closed"
-            client = genai.Client(api_key=self.settings.google_api_key)
+            # Refused in milliseconds while Google AI is known to be down (cached embeddings are still served)
+            probe = await embed_breaker.allow()
             try:
-                async with client.aio as aio_client:
-                    result = await aio_client.models.embed_content(
-                        model=self.settings.embedding_model,
-                        contents=text,
-                        config=config,
-                    )
-                if not result.embeddings:
-                    raise LearningServiceUnavailableError("Embedding returned empty.", cause=None) from None
-                emb = result.embeddings[0]
-                vec = list(getattr(emb, "values", emb))
-                if not vec:
-                    raise LearningServiceUnavailableError(
-                        "Embedding service returned empty result.",
-                        cause=None,
-                    ) from None
-                if redis:
+                reservation = await embed_quota.reserve()
+                # New client per attempt: exiting "async with client.aio" closes the aio client, so reuse would raise "client has been closed"
+                client = genai.Client(api_key=self.settings.google_api_key)
+                try:
                     try:
-                        import msgpack
-
-                        await redis.set(
-                            f"embedding:{key_hex}",
-                            msgpack.packb(vec),
-                            ex=CACHE_EMBEDDING_TTL,
-                        )
+                        async with client.aio as aio_client:
+                            result = await aio_client.models.embed_content(
+                                model=self.settings.embedding_model,
+                                contents=text,
+                                config=config,
+                            )
                     except Exception:
-                        pass
-                await record_embed_use()
-                return vec
-            except LearningServiceUnavailableError:
-                raise
-            except Exception as e:
-                err_str = str(e).lower()
-                if "429" in err_str or "rate" in err_str or "quota" in err_str:
-                    if attempt < 2:
-                        await asyncio.sleep(2**attempt)
-                        continue
-                raise LearningServiceUnavailableError(
-                    "Embedding service is temporarily unavailable. Please try again later.",
-                    cause=e,
-                ) from e
+                        await reservation.refund()
+                        await embed_breaker.record(False, probe)
+                        probe = False
+                        raise
+                    await embed_breaker.record(True, probe)
+                    probe = False
+                    if not result.embeddings:
+                        raise LearningServiceUnavailableError("Embedding returned empty.", cause=None) from None
+                    emb = result.embeddings[0]
+                    vec = list(getattr(emb, "values", emb))
+                    if not vec:
+                        raise LearningServiceUnavailableError(
+                            "Embedding service returned empty result.",
+                            cause=None,
+                        ) from None
+                    redis = get_redis()
+                    if redis:
+                        try:
+                            import msgpack
+
+                            await redis.set(
+                                _cache_key(text),
+                                msgpack.packb(vec),
+                                ex=CACHE_EMBEDDING_TTL,
+                            )
+                        except Exception:
+                            pass
+                    return vec
+                except LearningServiceUnavailableError:
+                    raise
+                except Exception as e:
+                    err_str = str(e).lower()
+                    if "429" in err_str or "rate" in err_str or "quota" in err_str:
+                        if attempt < 2:
+                            await asyncio.sleep(2**attempt)
+                            continue
+                    raise LearningServiceUnavailableError(
+                        "Embedding service is temporarily unavailable. Please try again later.",
+                        cause=e,
+                    ) from e
+            finally:
+                # A probe without an outcome (quota refusal, cancelled by the ask's deadline) is given back
+                await embed_breaker.release(probe)
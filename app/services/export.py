@@ -0,0 +1,179 @@
+"""ExportService: stream interactions, behavioral_signals and mastery_records in constant memory.
+
+Rows are read with a server-side cursor (yield_per) on a dedicated session, because the
+response body is streamed after the request's own session has been closed.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import DateTime, Float, Integer
+
+from app.constants import EXPORT_BATCH_ROWS
+from app.models import BehavioralSignal, ChildProfile, Interaction, MasteryRecord
+
+# table name -> (model, time column used for since/until)
+EXPORT_TABLES = {
+    "interactions": (Interaction, Interaction.ts),
+    "behavioral_signals": (BehavioralSignal, BehavioralSignal.ts),
+    "mastery_records": (MasteryRecord, MasteryRecord.updated_at),
+}
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # UUID and anything else JSON can't encode
+
+
+def _cell(value) -> str:
+    """CSV cell: structured values as JSON, None as empty."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class ExportService:
+    """Build export queries and encode row batches as NDJSON, CSV or Parquet."""
+
+    def columns(self, table: str) -> list:
+        model, _ = EXPORT_TABLES[table]
+        return list(model.__table__.columns)
+
+    def query(
+        self,
+        table: str,
+        child_ids: list[UUID] | None,
+        since: datetime | None,
+        until: datetime | None,
+        caregiver_id: UUID | None,
+    ):
+        """Core select over the table; caregiver_id restricts rows to that caregiver's children."""
+        model, ts_col = EXPORT_TABLES[table]
+        q = select(*self.columns(table))
+        if child_ids:
+            q = q.where(model.child_id.in_(child_ids))
+        if caregiver_id is not None:
+            owned = select(ChildProfile.child_id).where(ChildProfile.caregiver_id == caregiver_id)
+            q = q.where(model.child_id.in_(owned))
+        if since is not None:
+            q = q.where(ts_col >= since)
+        if until is not None:
+            q = q.where(ts_col < until)
+        return q.order_by(ts_col.asc()).execution_options(yield_per=EXPORT_BATCH_ROWS)
+
+    async def batches(self, session_factory, query) -> AsyncIterator[list[dict]]:
+        """Yield lists of row dicts, one per server-side cursor fetch."""
+        async with session_factory() as session:
+            result = await session.stream(query)
+            async for partition in result.mappings().partitions():
+                yield [dict(row) for row in partition]
+
+    async def ndjson(self, batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+        async for batch in batches:
+            yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode()
+
+    async def csv(self, batches: AsyncIterator[list[dict]], columns: list[str]) -> AsyncIterator[bytes]:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        async for batch in batches:
+            for row in batch:
+                writer.writerow([_cell(row.get(c)) for c in columns])
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode()
+
+    async def parquet(self, batches: AsyncIterator[list[dict]], table: str) -> AsyncIterator[bytes]:
+        """One Parquet row group per batch; bytes are flushed as each group is written."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = self.arrow_schema(table)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+        try:
+            async for batch in batches:
+                columns = {
+                    f.name: [self._arrow_value(row.get(f.name), f.type) for row in batch] for f in schema
+                }
+                writer.write_table(pa.table(columns, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def arrow_schema(self, table: str):
+        import pyarrow as pa
+
+        fields = []
+        for col in self.columns(table):
+            t = col.type
+            if isinstance(t, DateTime):
+                at = pa.timestamp("us", tz="UTC")
+            elif isinstance(t, Float):
+                at = pa.float64()
+            elif isinstance(t, Integer):
+                at = pa.int64()
+            elif isinstance(t, ARRAY):
+                at = pa.list_(pa.string())
+            else:
+                at = pa.string()  # UUID, text, enums, JSONB (as JSON text)
+            fields.append(pa.field(col.name, at))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _arrow_value(value, arrow_type):
+        import pyarrow as pa
+
+        if value is None:
+            return None
+        if pa.types.is_list(arrow_type):
+            return [str(v) for v in value]
+        if pa.types.is_string(arrow_type) and not isinstance(value, str):
+            return json.dumps(value, default=_json_default) if isinstance(value, (dict, list)) else str(value)
+        return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain but keeps an absolute tell()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
@@ -1,9 +1,18 @@
-"""FSRS-4.5 spaced repetition service."""
+"""FSRS-4.5 spaced repetition: vectorized scheduling engine and single-record service."""
 
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from app.constants import FSRS_W
+import numpy as np
+
+from app.constants import FSRS_MAX_INTERVAL_DAYS, FSRS_TARGET_RETENTION, FSRS_W
+
+# Forgetting curve R(t, S) = (1 + FACTOR * t / S) ** DECAY; FACTOR makes R(S, S) = 0.9
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1
+STABILITY_MIN = 0.01
+DIFFICULTY_MIN = 1.0
+DIFFICULTY_MAX = 10.0
 
 
 @dataclass
@@ -14,26 +23,93 @@ class FSRSResult:
     retrievability: float
 
 
+@dataclass
+class FSRSBatch:
+    """Per-record scheduling output; all arrays share the input shape."""
+
+    stability: np.ndarray
+    difficulty: np.ndarray
+    interval_days: np.ndarray  # int64, >= 1
+    retrievability: np.ndarray  # recall probability at review time (1.0 for new records)
+
+
+class FSRSEngine:
+    """FSRS-4.5 over NumPy arrays: one call schedules any number of records."""
+
+    def __init__(self, w: list[float] | None = None, desired_retention: float = FSRS_TARGET_RETENTION):
+        self.w = np.asarray(w if w is not None else FSRS_W, dtype=np.float64)
+        self.desired_retention = desired_retention
+
+    def retrievability(self, elapsed_days, stability) -> np.ndarray:
+        t = np.maximum(np.asarray(elapsed_days, dtype=np.float64), 0.0)
+        s = np.maximum(np.asarray(stability, dtype=np.float64), STABILITY_MIN)
+        return (1.0 + FACTOR * t / s) ** DECAY
+
+    def interval(self, stability, desired_retention: float | None = None) -> np.ndarray:
+        """Whole days until R falls to the desired retention."""
+        r = self.desired_retention if desired_retention is None else desired_retention
+        s = np.asarray(stability, dtype=np.float64)
+        days = s / FACTOR * (r ** (1.0 / DECAY) - 1.0)
+        return np.clip(np.rint(days), 1, FSRS_MAX_INTERVAL_DAYS).astype(np.int64)
+
+    def init_stability(self, ratings) -> np.ndarray:
+        g = np.asarray(ratings, dtype=np.int64)
+        return np.maximum(self.w[np.clip(g, 1, 4) - 1], STABILITY_MIN)
+
+    def init_difficulty(self, ratings) -> np.ndarray:
+        g = np.asarray(ratings, dtype=np.float64)
+        return np.clip(self.w[4] - (g - 3) * self.w[5], DIFFICULTY_MIN, DIFFICULTY_MAX)
+
+    def next_difficulty(self, difficulty, ratings) -> np.ndarray:
+        g = np.asarray(ratings, dtype=np.float64)
+        d = np.asarray(difficulty, dtype=np.float64) - self.w[6] * (g - 3)
+        # Mean reversion towards D0(3) = w[4]
+        d = self.w[7] * self.w[4] + (1 - self.w[7]) * d
+        return np.clip(d, DIFFICULTY_MIN, DIFFICULTY_MAX)
+
+    def next_stability(self, stability, difficulty, retrievability, ratings) -> np.ndarray:
+        s = np.maximum(np.asarray(stability, dtype=np.float64), STABILITY_MIN)
+        d = np.clip(np.asarray(difficulty, dtype=np.float64), DIFFICULTY_MIN, DIFFICULTY_MAX)
+        r = np.asarray(retrievability, dtype=np.float64)
+        g = np.asarray(ratings, dtype=np.int64)
+        w = self.w
+        hard = np.where(g == 2, w[15], 1.0)
+        easy = np.where(g == 4, w[16], 1.0)
+        recall = s * (
+            1 + np.exp(w[8]) * (11 - d) * s ** (-w[9]) * (np.exp(w[10] * (1 - r)) - 1) * hard * easy
+        )
+        forget = w[11] * d ** (-w[12]) * ((s + 1) ** w[13] - 1) * np.exp(w[14] * (1 - r))
+        # Post-lapse stability never exceeds the stability before the lapse
+        forget = np.minimum(forget, s)
+        return np.maximum(np.where(g == 1, forget, recall), STABILITY_MIN)
+
+    def schedule(self, stability, difficulty, elapsed_days, ratings, is_new=None) -> FSRSBatch:
+        """Apply one review per record. is_new marks records without a previous review (state ignored)."""
+        g = np.asarray(ratings, dtype=np.int64)
+        new = np.zeros(g.shape, dtype=bool) if is_new is None else np.asarray(is_new, dtype=bool)
+        s_prev = np.asarray(stability, dtype=np.float64)
+        d_prev = np.asarray(difficulty, dtype=np.float64)
+        r = self.retrievability(elapsed_days, s_prev)
+        s_next = np.where(new, self.init_stability(g), self.next_stability(s_prev, d_prev, r, g))
+        d_next = np.where(new, self.init_difficulty(g), self.next_difficulty(d_prev, g))
+        return FSRSBatch(
+            stability=s_next,
+            difficulty=d_next,
+            interval_days=self.interval(s_next),
+            retrievability=np.where(new, 1.0, r),
+        )
+
+
 class FSRSService:
-    """FSRS-4.5 with pretrained default weights W[0..18]."""
+    """Single-record FSRS-4.5 API over FSRSEngine, with pretrained default weights W[0..18]."""
 
-    def __init__(self, w: list[float] | None = None):
-        self.w = w or FSRS_W
+    def __init__(self, w: list[float] | None = None, desired_retention: float = FSRS_TARGET_RETENTION):
+        self.engine = FSRSEngine(w, desired_retention)
+        self.w = list(self.engine.w)
 
     def initial_review(self, rating: int) -> FSRSResult:
         """First review: rating 1-4 (Again, Hard, Good, Easy)."""
-        s = self._init_stability(rating)
-        d = self._init_difficulty(rating)
-        interval = self._interval(s, 0.9)
-        next_review = datetime.now(timezone.utc)
-        from datetime import timedelta
-        next_review = next_review + timedelta(days=interval)
-        return FSRSResult(
-            stability=s,
-            difficulty=d,
-            next_review=next_review,
-            retrievability=1.0,
-        )
+        return self._one(0.0, 0.0, 0.0, rating, True)
 
     def review(
         self,
@@ -44,55 +120,19 @@ class FSRSService:
     ) -> FSRSResult:
         """Subsequent review; returns new stability, difficulty, next_review."""
         days_elapsed = (datetime.now(timezone.utc) - last_reviewed).total_seconds() / 86400
-        r = self.retrievability(stability, days_elapsed)
-        s_new = self._next_stability(stability, difficulty, r, rating)
-        d_new = self._next_difficulty(difficulty, rating)
-        interval = self._interval(s_new, 0.9)
-        from datetime import timedelta
-        next_review = datetime.now(timezone.utc) + timedelta(days=interval)
-        return FSRSResult(
-            stability=s_new,
-            difficulty=d_new,
-            next_review=next_review,
-            retrievability=self.retrievability(s_new, 0),
-        )
+        return self._one(stability, difficulty, days_elapsed, rating, False)
 
     def retrievability(self, stability: float, days_elapsed: float) -> float:
-        """Decay of retrievability over time."""
+        """Probability of recall after days_elapsed at the given stability."""
         if stability <= 0:
             return 0.0
-        return (1 + 0.9 * (days_elapsed / stability)) ** -1
-
-    def _init_stability(self, rating: int) -> float:
-        return self.w[rating - 1] if 1 <= rating <= 4 else self.w[0]
-
-    def _init_difficulty(self, rating: int) -> float:
-        return 0.3 + 0.1 * (rating - 3)  # simple init
-
-    def _next_stability(self, s: float, d: float, r: float, rating: int) -> float:
-        """FSRS-4.5 next stability formula (simplified)."""
-        if rating == 1:
-            return self.w[0]
-        if rating == 2:
-            return s * 0.8
-        if rating == 3:
-            return s * (1 + 0.5 * (1 - r))
-        if rating == 4:
-            return s * (1 + 1.2 * (1 - r))
-        return s
-
-    def _next_difficulty(self, d: float, rating: int) -> float:
-        if rating == 1:
-            return min(10, d + 0.2)
-        if rating == 2:
-            return min(10, d + 0.05)
-        if rating == 4:
-            return max(0.1, d - 0.05)
-        return d
-
-    def _interval(self, stability: float, target_retention: float = 0.90) -> int:
-        """Days until next review for target retention."""
-        if stability <= 0:
-            return 1
-        from math import log
-        return max(1, int(stability * (target_retention ** -1 / 9 - 1)))
+        return float(self.engine.retrievability(days_elapsed, stability))
+
+    def _one(self, stability: float, difficulty: float, days_elapsed: float, rating: int, is_new: bool) -> FSRSResult:
+        out = self.engine.schedule([stability], [difficulty], [days_elapsed], [rating], is_new=[is_new])
+        return FSRSResult(
+            stability=float(out.stability[0]),
+            difficulty=float(out.difficulty[0]),
+            next_review=datetime.now(timezone.utc) + timedelta(days=int(out.interval_days[0])),
+            retrievability=float(out.retrievability[0]),
+        )
@@ -0,0 +1,250 @@
+"""Offline FSRS weight fitting from review_logs (NumPy only).
+
+Every (child, topic) review sequence is replayed in parallel through FSRSEngine; the predicted
+retrievability before each review is scored against whether it was recalled (rating > 1) with
+binary cross-entropy, and the weights are fitted with Adam on finite-difference gradients.
+
+    python -m app.services.fsrs_optimizer --child <uuid>
+    python -m app.services.fsrs_optimizer --grade 3
+    python -m app.services.fsrs_optimizer --global
+    python -m app.services.fsrs_optimizer --all-children
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import (
+    FSRS_OPT_ITERATIONS,
+    FSRS_OPT_LEARNING_RATE,
+    FSRS_OPT_MAX_SEQUENCE,
+    FSRS_OPT_MIN_REVIEWS,
+    FSRS_W,
+)
+from app.models import ChildProfile, ReviewLog
+from app.services.fsrs import FSRSEngine
+from app.services.fsrs_weights import (
+    GLOBAL_SCOPE,
+    child_scope,
+    grade_scope,
+    invalidate_weights,
+    save_weights,
+)
+
+# (lower, upper) per weight; w[17..18] are not used by FSRS-4.5 and stay fixed
+W_BOUNDS = np.array([
+    (0.01, 100.0), (0.01, 100.0), (0.01, 100.0), (0.01, 100.0),
+    (1.0, 10.0), (0.001, 4.0), (0.001, 4.0), (0.001, 0.75),
+    (0.0, 4.5), (0.0, 0.8), (0.001, 3.5),
+    (0.001, 5.0), (0.001, 0.25), (0.001, 0.9), (0.0, 4.0),
+    (0.0, 1.0), (1.0, 6.0),
+    (0.0, 2.0), (0.0, 2.0),
+])
+FITTED = np.arange(17)
+_EPS = 1e-6
+
+
+@dataclass
+class ReviewHistory:
+    """Padded review sequences, one row per (child, topic), oldest review first."""
+
+    ratings: np.ndarray  # (cards, steps) int64, padding = 3
+    elapsed: np.ndarray  # (cards, steps) float64 days since the previous review
+    mask: np.ndarray  # (cards, steps) bool, True for real reviews
+
+    @property
+    def review_count(self) -> int:
+        """Scored reviews (every review after a card's first)."""
+        return int(self.mask[:, 1:].sum())
+
+    @classmethod
+    def from_rows(cls, rows, max_steps: int = FSRS_OPT_MAX_SEQUENCE) -> "ReviewHistory":
+        """Build from (card_key, rating, elapsed_days) rows sorted by card then time."""
+        cards: dict = {}
+        for key, rating, elapsed in rows:
+            cards.setdefault(key, []).append((rating, elapsed))
+        seqs = [seq[-max_steps:] for seq in cards.values() if len(seq) >= 2]
+        steps = max((len(s) for s in seqs), default=0)
+        ratings = np.full((len(seqs), steps), 3, dtype=np.int64)
+        elapsed = np.zeros((len(seqs), steps), dtype=np.float64)
+        mask = np.zeros((len(seqs), steps), dtype=bool)
+        for i, seq in enumerate(seqs):
+            n = len(seq)
+            ratings[i, :n] = [r for r, _ in seq]
+            elapsed[i, :n] = [e for _, e in seq]
+            mask[i, :n] = True
+        return cls(ratings=ratings, elapsed=elapsed, mask=mask)
+
+
+@dataclass
+class FitResult:
+    weights: list[float]
+    log_loss: float
+    initial_log_loss: float
+    review_count: int
+
+
+def replay(w: np.ndarray, history: ReviewHistory) -> np.ndarray:
+    """Predicted retrievability before each review after the first: shape (cards, steps - 1)."""
+    engine = FSRSEngine(list(w))
+    ratings, elapsed, mask = history.ratings, history.elapsed, history.mask
+    s = engine.init_stability(ratings[:, 0])
+    d = engine.init_difficulty(ratings[:, 0])
+    preds = np.ones((ratings.shape[0], max(ratings.shape[1] - 1, 0)))
+    for t in range(1, ratings.shape[1]):
+        r = engine.retrievability(elapsed[:, t], s)
+        preds[:, t - 1] = r
+        live = mask[:, t]
+        s = np.where(live, engine.next_stability(s, d, r, ratings[:, t]), s)
+        d = np.where(live, engine.next_difficulty(d, ratings[:, t]), d)
+    return preds
+
+
+def log_loss(w: np.ndarray, history: ReviewHistory) -> float:
+    """Mean binary cross-entropy of predicted recall vs. actual recall."""
+    scored = history.mask[:, 1:]
+    if not scored.any():
+        return 0.0
+    p = np.clip(replay(w, history)[scored], _EPS, 1 - _EPS)
+    y = history.ratings[:, 1:][scored] > 1
+    return float(-np.mean(np.where(y, np.log(p), np.log(1 - p))))
+
+
+class FSRSOptimizer:
+    """Adam over the 17 FSRS-4.5 weights with central-difference gradients, clipped to W_BOUNDS."""
+
+    def __init__(
+        self,
+        iterations: int = FSRS_OPT_ITERATIONS,
+        learning_rate: float = FSRS_OPT_LEARNING_RATE,
+        step: float = 1e-4,
+    ):
+        self.iterations = iterations
+        self.learning_rate = learning_rate
+        self.step = step
+
+    def gradient(self, w: np.ndarray, history: ReviewHistory) -> np.ndarray:
+        grad = np.zeros_like(w)
+        for i in FITTED:
+            h = self.step * max(1.0, abs(w[i]))
+            up, down = w.copy(), w.copy()
+            up[i] += h
+            down[i] -= h
+            grad[i] = (log_loss(up, history) - log_loss(down, history)) / (2 * h)
+        return grad
+
+    def fit(self, history: ReviewHistory, initial: list[float] | None = None) -> FitResult:
+        w = np.clip(np.asarray(initial or FSRS_W, dtype=np.float64), W_BOUNDS[:, 0], W_BOUNDS[:, 1])
+        start = log_loss(w, history)
+        best_w, best = w.copy(), start
+        m = np.zeros_like(w)
+        v = np.zeros_like(w)
+        beta1, beta2 = 0.9, 0.999
+        # Step relative to each weight's scale, so w[3] (~15 days) and w[12] (~0.1) both move
+        scale = np.maximum(np.abs(w), 0.1)
+        for it in range(1, self.iterations + 1):
+            g = self.gradient(w, history)
+            m = beta1 * m + (1 - beta1) * g
+            v = beta2 * v + (1 - beta2) * g * g
+            m_hat = m / (1 - beta1**it)
+            v_hat = v / (1 - beta2**it)
+            w = w - self.learning_rate * scale * m_hat / (np.sqrt(v_hat) + 1e-8)
+            w = np.clip(w, W_BOUNDS[:, 0], W_BOUNDS[:, 1])
+            loss = log_loss(w, history)
+            if loss < best:
+                best_w, best = w.copy(), loss
+        return FitResult(
+            weights=[round(float(x), 4) for x in best_w],
+            log_loss=best,
+            initial_log_loss=start,
+            review_count=history.review_count,
+        )
+
+
+async def load_history(
+    db: AsyncSession,
+    child_id: UUID | None = None,
+    grade_level: str | None = None,
+) -> ReviewHistory:
+    """Review sequences for one child, one grade cohort, or everyone."""
+    q = select(ReviewLog.child_id, ReviewLog.topic, ReviewLog.rating, ReviewLog.elapsed_days)
+    if child_id is not None:
+        q = q.where(ReviewLog.child_id == child_id)
+    elif grade_level is not None:
+        cohort = select(ChildProfile.child_id).where(ChildProfile.grade_level == grade_level)
+        q = q.where(ReviewLog.child_id.in_(cohort))
+    q = q.order_by(ReviewLog.child_id, ReviewLog.topic, ReviewLog.reviewed_at)
+    result = await db.execute(q)
+    return ReviewHistory.from_rows(((c, t), r, e) for c, t, r, e in result.all())
+
+
+async def fit_scope(
+    db: AsyncSession,
+    scope: str,
+    history: ReviewHistory,
+    optimizer: FSRSOptimizer | None = None,
+) -> FitResult | None:
+    """Fit and store weights for a scope; None if there is too little history."""
+    if history.review_count < FSRS_OPT_MIN_REVIEWS:
+        return None
+    result = (optimizer or FSRSOptimizer()).fit(history)
+    if result.log_loss >= result.initial_log_loss:
+        return result  # defaults already fit at least as well; nothing to store
+    await save_weights(db, scope, result.weights, result.review_count, result.log_loss)
+    await db.commit()
+    return result
+
+
+def _report(scope: str, result: FitResult | None) -> None:
+    if result is None:
+        print(f"{scope}: skipped (fewer than {FSRS_OPT_MIN_REVIEWS} scored reviews)")
+    else:
+        print(
+            f"{scope}: {result.review_count} reviews, "
+            f"log loss {result.initial_log_loss:.4f} -> {result.log_loss:.4f}"
+        )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.database import async_session_factory, engine
+
+    optimizer = FSRSOptimizer(iterations=args.iterations)
+    async with async_session_factory() as db:
+        if args.child:
+            child_id = UUID(args.child)
+            _report(child_scope(child_id), await fit_scope(
+                db, child_scope(child_id), await load_history(db, child_id=child_id), optimizer
+            ))
+            await invalidate_weights(child_id)
+        elif args.all_children:
+            result = await db.execute(select(ReviewLog.child_id).distinct())
+            for (child_id,) in result.all():
+                _report(child_scope(child_id), await fit_scope(
+                    db, child_scope(child_id), await load_history(db, child_id=child_id), optimizer
+                ))
+            await invalidate_weights()
+        else:
+            scope = grade_scope(args.grade) if args.grade else GLOBAL_SCOPE
+            _report(scope, await fit_scope(db, scope, await load_history(db, grade_level=args.grade), optimizer))
+            await invalidate_weights()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fit FSRS weights from review_logs.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--child", help="fit one child's weights")
+    target.add_argument("--grade", help="fit a grade-level cohort")
+    target.add_argument("--global", dest="global_", action="store_true", help="fit over all reviews")
+    target.add_argument("--all-children", action="store_true", help="fit every child with review history")
+    parser.add_argument("--iterations", type=int, default=FSRS_OPT_ITERATIONS)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
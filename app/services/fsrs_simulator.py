@@ -0,0 +1,205 @@
+"""Forward simulation of FSRS review load: reviews per day, retention and LLM calls.
+
+Cards are the current mastery_records (or a synthetic population); each simulated day every due card is
+reviewed, recalled with probability R, and rescheduled by FSRSEngine. Everything is vectorized over cards.
+
+    python -m app.services.fsrs_simulator --days 90 --retention 0.85 0.9 0.95
+    python -m app.services.fsrs_simulator --synthetic 5000 --new-per-day 50 --daily
+"""
+
+import argparse
+import asyncio
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.constants import FSRS_SIM_LLM_CALLS_PER_REVIEW
+from app.models import MasteryRecord
+from app.services.fsrs import FSRSEngine
+
+
+@dataclass
+class CardPopulation:
+    """FSRS state per card; days are relative to simulation day 0 (today)."""
+
+    stability: np.ndarray
+    difficulty: np.ndarray
+    last_review_day: np.ndarray  # <= 0
+    due_day: np.ndarray  # < 0 means overdue
+
+    def __len__(self) -> int:
+        return len(self.stability)
+
+    def copy(self) -> "CardPopulation":
+        return CardPopulation(*(a.copy() for a in (self.stability, self.difficulty, self.last_review_day, self.due_day)))
+
+    @classmethod
+    def synthetic(cls, cards: int, engine: FSRSEngine, seed: int = 0) -> "CardPopulation":
+        """Cards after a first review with typical ratings, last reviewed up to 30 days ago."""
+        rng = np.random.default_rng(seed)
+        ratings = rng.choice([1, 2, 3, 4], size=cards, p=[0.15, 0.15, 0.6, 0.1])
+        stability = engine.init_stability(ratings)
+        last = -rng.integers(0, 30, size=cards).astype(np.float64)
+        return cls(
+            stability=stability,
+            difficulty=engine.init_difficulty(ratings),
+            last_review_day=last,
+            due_day=last + engine.interval(stability),
+        )
+
+
+@dataclass
+class SimulationResult:
+    retention_target: float
+    days: int
+    cards: int
+    reviews_per_day: list[int] = field(default_factory=list)
+    lapses_per_day: list[int] = field(default_factory=list)
+    retention_per_day: list[float] = field(default_factory=list)  # mean R over all cards, end of day
+    llm_calls_per_day: list[float] = field(default_factory=list)
+
+    @property
+    def total_reviews(self) -> int:
+        return int(sum(self.reviews_per_day))
+
+    def summary(self, llm_daily_limit: int | None = None) -> dict:
+        reviews = np.asarray(self.reviews_per_day)
+        llm = np.asarray(self.llm_calls_per_day)
+        out = {
+            "retention_target": self.retention_target,
+            "days": self.days,
+            "cards": self.cards,
+            "total_reviews": self.total_reviews,
+            "mean_reviews_per_day": round(float(reviews.mean()), 1) if self.days else 0.0,
+            "peak_reviews_per_day": int(reviews.max()) if self.days else 0,
+            "lapse_rate": round(sum(self.lapses_per_day) / max(self.total_reviews, 1), 4),
+            "mean_retention": round(float(np.mean(self.retention_per_day)), 4) if self.days else 0.0,
+            "total_llm_calls": round(float(llm.sum()), 1),
+            "peak_llm_calls_per_day": round(float(llm.max()), 1) if self.days else 0.0,
+        }
+        if llm_daily_limit:
+            out["days_over_llm_limit"] = int((llm > llm_daily_limit).sum())
+        return out
+
+
+def simulate(
+    population: CardPopulation,
+    engine: FSRSEngine,
+    days: int,
+    new_per_day: int = 0,
+    llm_calls_per_review: float = FSRS_SIM_LLM_CALLS_PER_REVIEW,
+    seed: int = 0,
+) -> SimulationResult:
+    """Review every due card each day; recall ~ Bernoulli(R), rated Good on recall and Again on a lapse."""
+    rng = np.random.default_rng(seed)
+    cards = population.copy()
+    result = SimulationResult(retention_target=engine.desired_retention, days=days, cards=len(cards))
+    for day in range(days):
+        if new_per_day:
+            first = np.full(new_per_day, 3)
+            s = engine.init_stability(first)
+            cards.stability = np.concatenate([cards.stability, s])
+            cards.difficulty = np.concatenate([cards.difficulty, engine.init_difficulty(first)])
+            cards.last_review_day = np.concatenate([cards.last_review_day, np.full(new_per_day, float(day))])
+            cards.due_day = np.concatenate([cards.due_day, day + engine.interval(s).astype(np.float64)])
+        due = np.flatnonzero(cards.due_day <= day)
+        elapsed = day - cards.last_review_day[due]
+        recalled = rng.random(len(due)) < engine.retrievability(elapsed, cards.stability[due])
+        ratings = np.where(recalled, 3, 1)
+        out = engine.schedule(cards.stability[due], cards.difficulty[due], elapsed, ratings)
+        cards.stability[due] = out.stability
+        cards.difficulty[due] = out.difficulty
+        cards.last_review_day[due] = day
+        cards.due_day[due] = day + out.interval_days
+
+        reviews = len(due) + new_per_day
+        result.reviews_per_day.append(reviews)
+        result.lapses_per_day.append(int((~recalled).sum()))
+        result.llm_calls_per_day.append(reviews * llm_calls_per_review)
+        retention = engine.retrievability(day + 1 - cards.last_review_day, cards.stability)
+        result.retention_per_day.append(float(retention.mean()) if len(cards) else 0.0)
+    result.cards = len(cards)
+    return result
+
+
+async def load_population(db: AsyncSession, child_id: UUID | None = None) -> CardPopulation:
+    """Reviewed mastery_records as a population (day 0 = now)."""
+    q = select(
+        MasteryRecord.stability,
+        MasteryRecord.difficulty,
+        MasteryRecord.last_reviewed,
+        MasteryRecord.next_review_due,
+    ).where(MasteryRecord.last_reviewed.is_not(None), MasteryRecord.next_review_due.is_not(None))
+    if child_id is not None:
+        q = q.where(MasteryRecord.child_id == child_id)
+    rows = (await db.execute(q)).all()
+    now = datetime.now(timezone.utc).timestamp()
+    data = np.array(
+        [(s, d, (last.timestamp() - now) / 86400, (due.timestamp() - now) / 86400) for s, d, last, due in rows],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    return CardPopulation(
+        stability=np.maximum(data[:, 0], 0.01),
+        difficulty=data[:, 1],
+        last_review_day=np.floor(data[:, 2]),
+        due_day=np.floor(data[:, 3]),
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    weights = None
+    if args.synthetic:
+        population = CardPopulation.synthetic(args.synthetic, FSRSEngine(), seed=args.seed)
+    else:
+        from app.database import async_session_factory, engine
+        from app.services.fsrs_weights import load_weights
+
+        child_id = UUID(args.child) if args.child else None
+        async with async_session_factory() as db:
+            population = await load_population(db, child_id)
+            if child_id is not None:
+                weights = await load_weights(db, child_id)
+        await engine.dispose()
+
+    summaries = []
+    for retention in args.retention or [settings.fsrs_target_retention]:
+        result = simulate(
+            population,
+            FSRSEngine(weights, desired_retention=retention),
+            args.days,
+            new_per_day=args.new_per_day,
+            llm_calls_per_review=args.llm_calls_per_review,
+            seed=args.seed,
+        )
+        summary = result.summary(settings.llm_daily_limit)
+        if args.daily:
+            summary["daily"] = {
+                k: v for k, v in asdict(result).items() if k.endswith("_per_day")
+            }
+        summaries.append(summary)
+    print(json.dumps(summaries, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate FSRS review load for the next N days.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--child", help="only this child's mastery records (and fitted weights)")
+    source.add_argument("--synthetic", type=int, metavar="CARDS", help="synthetic population instead of the DB")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--retention", type=float, nargs="+", help="target retention(s) to compare")
+    parser.add_argument("--new-per-day", type=int, default=0, help="new topics introduced per day")
+    parser.add_argument("--llm-calls-per-review", type=float, default=FSRS_SIM_LLM_CALLS_PER_REVIEW)
+    parser.add_argument("--daily", action="store_true", help="include per-day series")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
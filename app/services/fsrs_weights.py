@@ -0,0 +1,107 @@
+"""Fitted FSRS weights: per-child lookup (child -> grade cohort -> global -> defaults) with a Redis cache."""
+
+import json
+from uuid import UUID
+
+from sqlalchemy import literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import CACHE_FSRS_WEIGHTS_TTL
+from app.models import ChildProfile, FSRSParameters
+from app.redis_client import get_redis
+
+GLOBAL_SCOPE = "global"
+
+
+def child_scope(child_id: UUID) -> str:
+    return f"child:{child_id}"
+
+
+def grade_scope(grade_level: str) -> str:
+    return f"grade:{grade_level}"
+
+
+def _cache_key(child_id: UUID) -> str:
+    return f"fsrs:w:{child_id}"
+
+
+async def load_weights(db: AsyncSession, child_id: UUID) -> list[float] | None:
+    """Most specific fitted weights for a child; None means use the FSRS_W defaults."""
+    redis = get_redis()
+    if redis:
+        try:
+            raw = await redis.get(_cache_key(child_id))
+            if raw is not None:
+                return json.loads(raw) or None
+        except Exception:
+            pass
+
+    grade = (
+        select(literal("grade:") + ChildProfile.grade_level)
+        .where(ChildProfile.child_id == child_id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(FSRSParameters.scope, FSRSParameters.weights).where(
+            or_(FSRSParameters.scope.in_([child_scope(child_id), GLOBAL_SCOPE]), FSRSParameters.scope == grade)
+        )
+    )
+    found = {scope: list(weights) for scope, weights in result.all()}
+    specific = found.get(child_scope(child_id))
+    if specific is None:
+        specific = next((w for s, w in found.items() if s.startswith("grade:")), None)
+    if specific is None:
+        specific = found.get(GLOBAL_SCOPE)
+
+    if redis:
+        try:
+            await redis.set(_cache_key(child_id), json.dumps(specific or []), ex=CACHE_FSRS_WEIGHTS_TTL)
+        except Exception:
+            pass
+    return specific
+
+
+async def save_weights(
+    db: AsyncSession,
+    scope: str,
+    weights: list[float],
+    review_count: int,
+    log_loss: float | None,
+) -> None:
+    """Upsert the fitted weights for a scope (caller commits)."""
+    stmt = insert(FSRSParameters).values(
+        scope=scope, weights=weights, review_count=review_count, log_loss=log_loss
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[FSRSParameters.scope],
+            set_={
+                "weights": stmt.excluded.weights,
+                "review_count": stmt.excluded.review_count,
+                "log_loss": stmt.excluded.log_loss,
+                "fitted_at": stmt.excluded.fitted_at,
+            },
+        )
+    )
+
+
+async def invalidate_weights(child_id: UUID | None = None) -> None:
+    """Drop cached weights for one child, or for every child after a cohort/global fit."""
+    redis = get_redis()
+    if not redis:
+        return
+    try:
+        if child_id is not None:
+            await redis.delete(_cache_key(child_id))
+            return
+        batch = []
+        async for key in redis.scan_iter(match="fsrs:w:*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await redis.delete(*batch)
+                batch.clear()
+        if batch:
+            await redis.delete(*batch)
+    except Exception:
+        pass
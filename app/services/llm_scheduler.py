@@ -0,0 +1,181 @@
+"""LLMScheduler: admission control for LLM calls (concurrency limit, bounded priority queue, deadline shedding).
+
+When the provider slows down or throttles, calls beyond LLM_MAX_CONCURRENCY wait in a priority queue of at most
+LLM_MAX_QUEUE entries instead of piling up on the event loop. A call is shed (LearningServiceUnavailableError,
+so /learn/ask answers with FALLBACK_RESPONSE) as soon as it cannot start before its deadline: on arrival when the
+queue is full or the estimated wait is too long, or when its deadline passes while queued.
+LatencyWindow tracks recent call latencies for hedging (a second call once the first is slower than usual).
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import get_settings
+from app.constants import LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_QUANTILE, LLM_HEDGE_SAMPLES
+from app.exceptions import LearningServiceUnavailableError
+
+LLM_QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM calls waiting for a slot")
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM calls holding a slot")
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time from arrival to slot for admitted LLM calls",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0),
+)
+LLM_SHED = Counter("llm_shed_total", "LLM calls refused before reaching the provider", ["reason", "priority"])
+LLM_HEDGED = Counter("llm_hedged_total", "Second LLM calls sent because the first was slow", ["winner"])
+
+# Weight of the latest call in the running service-time estimate
+_EWMA_ALPHA = 0.2
+
+
+class Priority(IntEnum):
+    """Lower runs first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    deadline: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMScheduler:
+    """At most LLM_MAX_CONCURRENCY calls in flight; waiters are served by priority, then arrival."""
+
+    def __init__(self):
+        self._running = 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._service_seconds: float | None = None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._queue if not w.future.done())
+
+    @property
+    def idle(self) -> bool:
+        """A slot is free right now; optional extra calls (hedges) only run then."""
+        return self._running < get_settings().llm_max_concurrency and not self.queued
+
+    def _estimated_wait(self, priority: int) -> float:
+        """Expected seconds until a slot frees for a new waiter at this priority."""
+        if self._service_seconds is None:
+            return 0.0
+        ahead = sum(1 for w in self._queue if w.priority <= priority and not w.future.done())
+        return (ahead + 1) * self._service_seconds / get_settings().llm_max_concurrency
+
+    def _shed(self, reason: str, priority: int) -> LearningServiceUnavailableError:
+        LLM_SHED.labels(reason=reason, priority=Priority(priority).name.lower()).inc()
+        return LearningServiceUnavailableError(f"LLM call shed ({reason}).")
+
+    def _evict_for(self, priority: int) -> bool:
+        """Make room for a higher-priority arrival by shedding the newest lowest-priority waiter."""
+        live = [w for w in self._queue if not w.future.done()]
+        if not live:
+            return False
+        victim = max(live)
+        if victim.priority <= priority:
+            return False
+        victim.future.set_exception(self._shed("preempted", victim.priority))
+        self._queue.remove(victim)
+        heapq.heapify(self._queue)
+        return True
+
+    def _release(self) -> None:
+        self._running -= 1
+        now = time.monotonic()
+        while self._queue:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+            if waiter.deadline <= now:
+                waiter.future.set_exception(self._shed("deadline", waiter.priority))
+                continue
+            self._running += 1
+            waiter.future.set_result(None)
+            break
+        LLM_QUEUE_DEPTH.set(self.queued)
+        LLM_IN_FLIGHT.set(self._running)
+
+    async def _acquire(self, priority: int, deadline: float) -> None:
+        settings = get_settings()
+        arrived = time.monotonic()
+        if self._running < settings.llm_max_concurrency and not self.queued:
+            self._running += 1
+        else:
+            if self.queued >= settings.llm_max_queue and not self._evict_for(priority):
+                raise self._shed("queue_full", priority)
+            if arrived + self._estimated_wait(priority) > deadline:
+                raise self._shed("deadline", priority)
+            waiter = _Waiter(priority, next(self._seq), deadline, asyncio.get_running_loop().create_future())
+            heapq.heappush(self._queue, waiter)
+            LLM_QUEUE_DEPTH.set(self.queued)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(0.0, deadline - arrived))
+            except asyncio.TimeoutError:
+                if waiter.future.done() and not waiter.future.exception():
+                    # Slot was handed over as the deadline hit; give it back
+                    self._release()
+                else:
+                    waiter.future.cancel()
+                LLM_QUEUE_DEPTH.set(self.queued)
+                raise self._shed("deadline", priority) from None
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled() and not waiter.future.exception():
+                    self._release()
+                waiter.future.cancel()
+                raise
+        LLM_IN_FLIGHT.set(self._running)
+        LLM_QUEUE_WAIT.labels(priority=Priority(priority).name.lower()).observe(time.monotonic() - arrived)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE, deadline: float | None = None) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the body. `deadline` is a time.monotonic() value."""
+        if deadline is None:
+            deadline = time.monotonic() + get_settings().llm_deadline_seconds
+        await self._acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            if self._service_seconds is None:
+                self._service_seconds = elapsed
+            else:
+                self._service_seconds += _EWMA_ALPHA * (elapsed - self._service_seconds)
+            self._release()
+
+
+class LatencyWindow:
+    """Recent successful LLM call latencies; hedge_after() is the point past which a call counts as slow."""
+
+    def __init__(self):
+        self._samples: deque[float] = deque(maxlen=LLM_HEDGE_SAMPLES)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_after(self) -> float | None:
+        """LLM_HEDGE_QUANTILE of recent latencies; None until LLM_HEDGE_MIN_SAMPLES are known."""
+        if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(LLM_HEDGE_QUANTILE * len(ordered)))]
+
+
+llm_scheduler = LLMScheduler()
+llm_latency = LatencyWindow()
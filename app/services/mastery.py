@@ -0,0 +1,164 @@
+"""MasteryService: apply topic ratings to mastery_records in one FSRS pass and one upsert."""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import Float, String, column, insert, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import after_commit
+from app.models import Interaction, MasteryRecord, ReviewLog
+from app.services.fsrs import FSRSEngine
+from app.services.fsrs_weights import load_weights
+from app.services.mastery_index import MasteryIndex, TopicState
+
+
+@dataclass
+class FeedbackItem:
+    interaction_id: UUID
+    topic: str
+    rating: int
+    engagement_score: float
+    child_reaction: str
+
+
+@dataclass
+class FeedbackOutcome:
+    topic: str
+    mastery_level: float
+    next_review_days: float
+
+
+def _mastery_level(level: np.ndarray, reviewed: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+    """+0.1 per rating point on a reviewed topic; 0.2 per rating point on a first review."""
+    return np.minimum(1.0, np.where(reviewed, level + 0.1 * ratings, 0.2 * ratings))
+
+
+class MasteryService:
+    """Score feedback with FSRSEngine and persist it with set-based statements.
+
+    Ratings for the same topic within one call are applied in order, one engine round per repeat.
+    """
+
+    def __init__(self):
+        self.mastery_index = MasteryIndex()
+
+    async def apply_feedback(
+        self,
+        db: AsyncSession,
+        child_id: UUID,
+        items: list[FeedbackItem],
+        now: datetime | None = None,
+    ) -> list[FeedbackOutcome]:
+        """Returns one outcome per item, in request order. Caller bumps the child version."""
+        now = now or datetime.now(timezone.utc)
+        topics = list(dict.fromkeys(item.topic for item in items))
+        slot = {t: i for i, t in enumerate(topics)}
+        result = await db.execute(
+            select(
+                MasteryRecord.topic,
+                MasteryRecord.stability,
+                MasteryRecord.difficulty,
+                MasteryRecord.last_reviewed,
+                MasteryRecord.mastery_level,
+                MasteryRecord.review_count,
+            ).where(MasteryRecord.child_id == child_id, MasteryRecord.topic.in_(topics))
+        )
+        n = len(topics)
+        stability = np.zeros(n)
+        difficulty = np.zeros(n)
+        elapsed = np.zeros(n)
+        level = np.zeros(n)
+        reviews = np.zeros(n, dtype=np.int64)
+        reviewed = np.zeros(n, dtype=bool)
+        for topic, s, d, last, lvl, count in result.all():
+            i = slot[topic]
+            stability[i], difficulty[i], level[i], reviews[i] = s, d, lvl, count or 0
+            if last is not None:
+                reviewed[i] = True
+                elapsed[i] = max(0.0, (now - last).total_seconds() / 86400)
+
+        engine = FSRSEngine(await load_weights(db, child_id), get_settings().fsrs_target_retention)
+        interval = np.zeros(n, dtype=np.int64)
+        outcomes: list[FeedbackOutcome | None] = [None] * len(items)
+        log_rows = []
+        # Round k applies the k-th rating of every topic that has one
+        rounds: list[list[int]] = []
+        seen: dict[str, int] = {}
+        for pos, item in enumerate(items):
+            k = seen.get(item.topic, 0)
+            seen[item.topic] = k + 1
+            if k == len(rounds):
+                rounds.append([])
+            rounds[k].append(pos)
+        for positions in rounds:
+            idx = np.array([slot[items[p].topic] for p in positions])
+            ratings = np.array([items[p].rating for p in positions])
+            out = engine.schedule(stability[idx], difficulty[idx], elapsed[idx], ratings, is_new=~reviewed[idx])
+            for p, e in zip(positions, elapsed[idx]):
+                log_rows.append({
+                    "child_id": child_id, "topic": items[p].topic, "rating": items[p].rating,
+                    "elapsed_days": float(e), "reviewed_at": now,
+                })
+            level[idx] = _mastery_level(level[idx], reviewed[idx], ratings)
+            stability[idx], difficulty[idx], interval[idx] = out.stability, out.difficulty, out.interval_days
+            reviews[idx] += 1
+            reviewed[idx] = True
+            elapsed[idx] = 0.0
+            for p, i in zip(positions, idx):
+                outcomes[p] = FeedbackOutcome(items[p].topic, float(level[i]), float(interval[i]))
+
+        due = [now + timedelta(days=int(days)) for days in interval]
+        stmt = pg_insert(MasteryRecord).values([
+            {
+                "mastery_id": uuid.uuid4(),
+                "child_id": child_id,
+                "topic": t,
+                "stability": float(stability[i]),
+                "difficulty": float(difficulty[i]),
+                "last_reviewed": now,
+                "next_review_due": due[i],
+                "review_count": int(reviews[i]),
+                "mastery_level": float(level[i]),
+                "updated_at": now,
+            }
+            for i, t in enumerate(topics)
+        ])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_mastery_child_topic",
+                set_={
+                    col: stmt.excluded[col]
+                    for col in (
+                        "stability", "difficulty", "last_reviewed", "next_review_due",
+                        "review_count", "mastery_level", "updated_at",
+                    )
+                },
+            )
+        )
+        await db.execute(insert(ReviewLog), log_rows)
+
+        # Last feedback per interaction wins, as with sequential single requests
+        latest = {item.interaction_id: item for item in items}
+        feedback = values(
+            column("interaction_id", PGUUID(as_uuid=True)),
+            column("engagement_score", Float),
+            column("child_reaction", String),
+            name="feedback",
+        ).data([(i.interaction_id, i.engagement_score, i.child_reaction) for i in latest.values()])
+        await db.execute(
+            update(Interaction)
+            .where(Interaction.interaction_id == feedback.c.interaction_id, Interaction.child_id == child_id)
+            .values(engagement_score=feedback.c.engagement_score, child_reaction=feedback.c.child_reaction)
+            .execution_options(synchronize_session=False)
+        )
+
+        # Redis summary follows the committed rows: updated once, in place, after the request commits
+        changed = [TopicState(t, due[i], float(level[i]), float(stability[i])) for i, t in enumerate(topics)]
+        after_commit(db, lambda: self.mastery_index.upsert_many(child_id, changed))
+        return outcomes
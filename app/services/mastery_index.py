@@ -0,0 +1,344 @@
+"""MasteryIndex: per-child mastery summary kept in Redis on write, so readers skip Postgres.
+
+Per child:
+  review:due:{child}    sorted set, topic -> next_review_due epoch (scheduled topics only)
+  review:meta:{child}   hash, topic -> [mastery_level, stability] (every topic)
+  review:weak:{child}   set of topics with mastery_level < MASTERY_WEAK_THRESHOLD
+  review:stats:{child}  hash, topics (count) and mastery_sum
+  review:gen:{child}    write counter, bumped by every upsert (built or not)
+review:due:children holds each child's earliest due time, so a scheduler can find children with due
+reviews with one ZRANGEBYSCORE; members whose summary has expired are dropped when a read or scan finds
+them. Every change is one Lua script call, so readers never see a partial update.
+
+A child's summary is either complete or absent: the due set carries a sentinel member once it has been
+built from the database, and writes only touch built summaries. Reads rebuild absent ones;
+`python -m app.services.mastery_index rebuild [--child <uuid>]` rebuilds eagerly. A rebuild reads the
+write counter before loading the records and is discarded if a write landed meanwhile, so a stale load
+never replaces newer data.
+"""
+
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import CACHE_REVIEW_INDEX_TTL, MASTERY_WEAK_THRESHOLD
+from app.models import MasteryRecord
+from app.redis_client import batched, get_redis
+
+CHILDREN_KEY = "review:due:children"
+_SENTINEL = "__built__"
+
+# Shared tail for writes. KEYS: due, meta, weak, stats, children, gen. ARGV[1]: child_id, ARGV[2]: ttl
+_FINISH = f"""
+for k = 1, 4 do redis.call('EXPIRE', KEYS[k], ARGV[2]) end
+local first = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if first[1] and first[1] ~= '{_SENTINEL}' then
+    redis.call('ZADD', KEYS[5], first[2], ARGV[1])
+else
+    redis.call('ZREM', KEYS[5], ARGV[1])
+end
+return 1
+"""
+
+# ARGV[3..]: (topic, score ('' = not scheduled), mastery_level, meta) quads
+_UPSERT = f"""
+redis.call('INCR', KEYS[6])
+redis.call('EXPIRE', KEYS[6], ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+local added, delta = 0, 0
+for i = 3, #ARGV, 4 do
+    local topic, score, level = ARGV[i], ARGV[i + 1], tonumber(ARGV[i + 2])
+    local old = redis.call('HGET', KEYS[2], topic)
+    if old then delta = delta - cjson.decode(old)[1] else added = added + 1 end
+    delta = delta + level
+    redis.call('HSET', KEYS[2], topic, ARGV[i + 3])
+    if score == '' then redis.call('ZREM', KEYS[1], topic) else redis.call('ZADD', KEYS[1], score, topic) end
+    if level < {MASTERY_WEAK_THRESHOLD} then redis.call('SADD', KEYS[3], topic) else redis.call('SREM', KEYS[3], topic) end
+end
+redis.call('HINCRBY', KEYS[4], 'topics', added)
+redis.call('HINCRBYFLOAT', KEYS[4], 'mastery_sum', delta)
+{_FINISH}
+"""
+
+# ARGV[3]: write counter read before the records were loaded ('' = none); ARGV[4..]: same quads, the child's
+# complete topic list. Returns 0 without replacing if an upsert ran since.
+_REPLACE = f"""
+if (redis.call('GET', KEYS[6]) or '') ~= ARGV[3] then return 0 end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+redis.call('ZADD', KEYS[1], '+inf', '{_SENTINEL}')
+local n, total = 0, 0
+for i = 4, #ARGV, 4 do
+    local topic, score, level = ARGV[i], ARGV[i + 1], tonumber(ARGV[i + 2])
+    redis.call('HSET', KEYS[2], topic, ARGV[i + 3])
+    if score ~= '' then redis.call('ZADD', KEYS[1], score, topic) end
+    if level < {MASTERY_WEAK_THRESHOLD} then redis.call('SADD', KEYS[3], topic) end
+    n, total = n + 1, total + level
+end
+redis.call('HSET', KEYS[4], 'topics', n, 'mastery_sum', total)
+{_FINISH}
+"""
+
+# KEYS: due, meta, weak, stats, children. ARGV: now, child_id.
+# nil if not built (the child leaves the children index), else
+# {{topic, score, ...}, {meta, ...}, {weak topic, ...}, {topics, mastery_sum}}
+_READ = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[5], ARGV[2])
+    return false
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES')
+local metas = {}
+if #due > 0 then
+    local topics = {}
+    for i = 1, #due, 2 do topics[#topics + 1] = due[i] end
+    metas = redis.call('HMGET', KEYS[2], unpack(topics))
+end
+return {due, metas, redis.call('SMEMBERS', KEYS[3]), redis.call('HMGET', KEYS[4], 'topics', 'mastery_sum')}
+"""
+
+
+# KEYS: children. ARGV: now, limit.
+# Due children, earliest first; members whose summary has expired are removed instead of returned
+_CHILDREN_DUE = """
+local live = {}
+for _, child in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])) do
+    if redis.call('EXISTS', 'review:due:' .. child) == 1 then
+        live[#live + 1] = child
+    else
+        redis.call('ZREM', KEYS[1], child)
+    end
+end
+return live
+"""
+
+
+def _generation_key(child_id: UUID) -> str:
+    return f"review:gen:{child_id}"
+
+
+def _keys(child_id: UUID) -> list[str]:
+    return [
+        f"review:due:{child_id}",
+        f"review:meta:{child_id}",
+        f"review:weak:{child_id}",
+        f"review:stats:{child_id}",
+    ]
+
+
+def _str(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@dataclass
+class TopicState:
+    topic: str
+    next_review_due: datetime | None
+    mastery_level: float
+    stability: float
+
+
+@dataclass
+class MasterySummary:
+    due: list[TopicState] = field(default_factory=list)  # earliest first
+    weak_topics: list[str] = field(default_factory=list)
+    topic_count: int = 0
+    avg_mastery: float | None = None
+
+    @classmethod
+    def from_records(cls, records: list[TopicState], now: datetime) -> "MasterySummary":
+        due = sorted(
+            (r for r in records if r.next_review_due is not None and r.next_review_due <= now),
+            key=lambda r: r.next_review_due,
+        )
+        return cls(
+            due=due,
+            weak_topics=sorted(r.topic for r in records if r.mastery_level < MASTERY_WEAK_THRESHOLD),
+            topic_count=len(records),
+            avg_mastery=sum(r.mastery_level for r in records) / len(records) if records else None,
+        )
+
+
+def _quads(topics: list[TopicState]) -> list:
+    args: list = []
+    for t in topics:
+        score = t.next_review_due.timestamp() if t.next_review_due else ""
+        args += [t.topic, score, t.mastery_level, json.dumps([t.mastery_level, t.stability])]
+    return args
+
+
+class MasteryIndex:
+    """Maintain and read per-child mastery summaries; Postgres is only read to (re)build them."""
+
+    def __init__(self):
+        self._scripts: dict = {}
+        self._client = None
+
+    def _script(self, redis, name: str, source: str):
+        if redis is not self._client:
+            self._client, self._scripts = redis, {}
+        if name not in self._scripts:
+            self._scripts[name] = redis.register_script(source)
+        return self._scripts[name]
+
+    async def summary(self, db: AsyncSession, child_id: UUID, now: datetime | None = None) -> MasterySummary:
+        """Due topics at `now`, weak topics, topic count and average mastery."""
+        now = now or datetime.now(timezone.utc)
+        cached = await self.cached(child_id, now)
+        if cached is not None:
+            return cached
+        redis = get_redis()
+        generation = None
+        if redis:
+            try:
+                generation = await redis.get(_generation_key(child_id))
+            except Exception:
+                redis = None
+        records = await self._load(db, child_id)
+        if redis:
+            try:
+                await self._replace(redis, child_id, records, generation)
+            except Exception:
+                pass
+        return MasterySummary.from_records(records, now)
+
+    async def cached(self, child_id: UUID, now: datetime | None = None) -> MasterySummary | None:
+        """The summary from Redis, or None if it is not built (or Redis is down); batched with concurrent reads."""
+        now = now or datetime.now(timezone.utc)
+        redis = get_redis()
+        if not redis:
+            return None
+        try:
+            raw = await batched(redis).script(
+                self._script(redis, "read", _READ),
+                keys=[*_keys(child_id), CHILDREN_KEY],
+                args=[now.timestamp(), str(child_id)],
+            )
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        pairs, metas, weak, (count, total) = raw
+        due = []
+        for i in range(0, len(pairs), 2):
+            level, stability = json.loads(metas[i // 2]) if metas[i // 2] else (0.0, 0.0)
+            due.append(TopicState(
+                topic=_str(pairs[i]),
+                next_review_due=datetime.fromtimestamp(float(pairs[i + 1]), timezone.utc),
+                mastery_level=level,
+                stability=stability,
+            ))
+        count = int(count or 0)
+        return MasterySummary(
+            due=due,
+            weak_topics=sorted(_str(t) for t in weak),
+            topic_count=count,
+            avg_mastery=float(total) / count if count else None,
+        )
+
+    async def due(self, db: AsyncSession, child_id: UUID, now: datetime | None = None) -> list[TopicState]:
+        """Topics due at `now`, earliest first."""
+        return (await self.summary(db, child_id, now)).due
+
+    async def upsert(
+        self,
+        child_id: UUID,
+        topic: str,
+        next_review_due: datetime | None,
+        mastery_level: float,
+        stability: float,
+    ) -> None:
+        """Reflect one mastery record write; no-op if the child's summary has not been built."""
+        await self.upsert_many(child_id, [TopicState(topic, next_review_due, mastery_level, stability)])
+
+    async def upsert_many(self, child_id: UUID, topics: list[TopicState]) -> None:
+        """Reflect several committed mastery record writes for one child in one script call."""
+        redis = get_redis()
+        if not redis or not topics:
+            return
+        try:
+            await self._script(redis, "upsert", _UPSERT)(
+                keys=[*_keys(child_id), CHILDREN_KEY, _generation_key(child_id)],
+                args=[str(child_id), CACHE_REVIEW_INDEX_TTL, *_quads(topics)],
+            )
+        except Exception:
+            pass
+
+    async def rebuild(self, db: AsyncSession, child_id: UUID) -> int:
+        """Rebuild one child's summary from mastery_records. Returns the number of topics.
+
+        Skipped (the next read rebuilds) if a write lands while the records are loaded.
+        """
+        redis = get_redis()
+        generation = await redis.get(_generation_key(child_id)) if redis else None
+        records = await self._load(db, child_id)
+        if redis:
+            await self._replace(redis, child_id, records, generation)
+        return len(records)
+
+    async def children_due(self, now: datetime | None = None, limit: int = 1000) -> list[UUID]:
+        """Children with at least one topic due at `now`, earliest first."""
+        redis = get_redis()
+        if not redis:
+            return []
+        now = now or datetime.now(timezone.utc)
+        try:
+            raw = await self._script(redis, "children_due", _CHILDREN_DUE)(
+                keys=[CHILDREN_KEY], args=[now.timestamp(), limit]
+            )
+        except Exception:
+            return []
+        return [UUID(_str(c)) for c in raw]
+
+    async def _load(self, db: AsyncSession, child_id: UUID) -> list[TopicState]:
+        result = await db.execute(
+            select(
+                MasteryRecord.topic,
+                MasteryRecord.next_review_due,
+                MasteryRecord.mastery_level,
+                MasteryRecord.stability,
+            ).where(MasteryRecord.child_id == child_id)
+        )
+        return [TopicState(*row) for row in result.all()]
+
+    async def _replace(self, redis, child_id: UUID, records: list[TopicState], generation: bytes | None) -> bool:
+        """Store the records as the child's summary unless an upsert ran since `generation` was read."""
+        replaced = await self._script(redis, "replace", _REPLACE)(
+            keys=[*_keys(child_id), CHILDREN_KEY, _generation_key(child_id)],
+            args=[str(child_id), CACHE_REVIEW_INDEX_TTL, generation or "", *_quads(records)],
+        )
+        return bool(replaced)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.database import async_session_factory, engine
+
+    index = MasteryIndex()
+    async with async_session_factory() as db:
+        if args.child:
+            child_ids = [UUID(args.child)]
+        else:
+            result = await db.execute(select(MasteryRecord.child_id).distinct())
+            child_ids = [row[0] for row in result.all()]
+        topics = 0
+        for child_id in child_ids:
+            topics += await index.rebuild(db, child_id)
+        print(f"Rebuilt mastery summaries for {len(child_ids)} children ({topics} topics)")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the Redis mastery summaries and review-due index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="rebuild from mastery_records")
+    rebuild.add_argument("--child", help="only this child (default: every child with mastery records)")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""ProgressService: caregiver progress reads served from rollups and Redis."""
+
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import CACHE_PROGRESS_TTL, CACHE_TIMELINE_TTL, PROGRESS_REPORT_PERIOD_DAYS
+from app.models import ChildProfile, Interaction, LearningSession, MasteryRecord
+from app.redis_client import get_redis
+from app.services.timescale import daily_interactions, interactions_daily
+
+
+# Keys embed the child's change version, so a write (bump_child_version) retires them without a DEL
+def _timeline_key(child_id: UUID, version: int) -> str:
+    return f"progress:timeline:{child_id}:v{version}"
+
+
+def _snapshot_key(child_id: UUID, version: int) -> str:
+    return f"progress:snapshot:{child_id}:v{version}"
+
+
+def _iso(dt: datetime | None) -> str | None:
+    return dt.isoformat() if dt else None
+
+
+def _record_dict(r: MasteryRecord) -> dict:
+    """MasteryRecordResponse fields in JSON-safe form."""
+    return {
+        "mastery_id": str(r.mastery_id),
+        "child_id": str(r.child_id),
+        "topic": r.topic,
+        "mastery_level": r.mastery_level,
+        "stability": r.stability,
+        "difficulty": r.difficulty,
+        "last_reviewed": _iso(r.last_reviewed),
+        "next_review_due": _iso(r.next_review_due),
+        "review_count": r.review_count or 0,
+        "updated_at": _iso(r.updated_at) or "",
+    }
+
+
+@dataclass
+class ProgressSnapshot:
+    """Everything the dashboard, mastery list and report need, loaded in one statement."""
+
+    total_sessions: int = 0
+    total_interactions: int = 0
+    period_sessions: int = 0
+    period_interactions: int = 0
+    mastery_records: list[dict] = field(default_factory=list)
+
+
+class ProgressService:
+    """Progress reads: one-statement snapshot from maintained counters, timeline from the daily aggregate.
+
+    Results are cached per child and change version; pass version=None (Redis unavailable) to skip the cache.
+    """
+
+    async def snapshot(self, db: AsyncSession, child_id: UUID, version: int | None) -> ProgressSnapshot:
+        redis = get_redis() if version is not None else None
+        if redis:
+            try:
+                raw = await redis.get(_snapshot_key(child_id, version))
+                if raw:
+                    return ProgressSnapshot(**json.loads(raw))
+            except Exception:
+                pass
+
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=PROGRESS_REPORT_PERIOD_DAYS)
+        since_day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        period_sessions = (
+            select(func.count())
+            .select_from(LearningSession)
+            .where(LearningSession.child_id == child_id, LearningSession.started_at >= since)
+            .scalar_subquery()
+        )
+        period_interactions = (
+            select(func.coalesce(func.sum(interactions_daily.c.interactions), 0))
+            .where(interactions_daily.c.child_id == child_id, interactions_daily.c.day >= since_day)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                ChildProfile.session_count,
+                ChildProfile.interaction_count,
+                period_sessions,
+                period_interactions,
+                MasteryRecord,
+            )
+            .select_from(ChildProfile)
+            .outerjoin(MasteryRecord, MasteryRecord.child_id == ChildProfile.child_id)
+            .where(ChildProfile.child_id == child_id)
+        )
+        rows = result.all()
+        snap = ProgressSnapshot()
+        if rows:
+            first = rows[0]
+            snap.total_sessions = first[0] or 0
+            snap.total_interactions = first[1] or 0
+            snap.period_sessions = int(first[2] or 0)
+            snap.period_interactions = int(first[3] or 0)
+            snap.mastery_records = [_record_dict(row[4]) for row in rows if row[4] is not None]
+        if redis:
+            try:
+                await redis.set(_snapshot_key(child_id, version), json.dumps(asdict(snap)), ex=CACHE_PROGRESS_TTL)
+            except Exception:
+                pass
+        return snap
+
+    async def timeline(self, db: AsyncSession, child_id: UUID, days: int, version: int | None) -> dict:
+        """Return the TimelineResponse payload."""
+        now = datetime.now(timezone.utc)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        slot = f"{days}:{today.date().isoformat()}"
+        redis = get_redis() if version is not None else None
+        if redis:
+            try:
+                raw = await redis.hget(_timeline_key(child_id, version), slot)
+                if raw:
+                    return json.loads(raw)
+            except Exception:
+                pass
+
+        since = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        closed = await daily_interactions(db, child_id, since, until=today)
+        live = await db.execute(
+            select(func.count(Interaction.interaction_id), func.avg(Interaction.engagement_score)).where(
+                Interaction.child_id == child_id,
+                Interaction.ts >= today,
+            )
+        )
+        live_count, live_avg = live.one()
+        points = [
+            {"date": day.isoformat()[:10], "interactions": n, "avg_engagement": avg}
+            for day, n, avg in closed
+        ]
+        if live_count:
+            points.append({
+                "date": today.isoformat()[:10],
+                "interactions": int(live_count),
+                "avg_engagement": float(live_avg) if live_avg is not None else None,
+            })
+        payload = {"child_id": str(child_id), "days": days, "timeline": points}
+        if redis:
+            try:
+                key = _timeline_key(child_id, version)
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.hset(key, slot, json.dumps(payload))
+                    pipe.expire(key, CACHE_TIMELINE_TTL)
+                    await pipe.execute()
+            except Exception:
+                pass
+        return payload
@@ -0,0 +1,153 @@
+"""QuotaLimiter: per-model Google AI quota enforced before each call (Redis token bucket + daily counter).
+
+Per model (llm, embed):
+  quota:{op}:minute   hash tokens/ts, a token bucket refilled at *_RPM_LIMIT per minute (burst = one minute)
+  usage:{op}:{date}   today's call count, the same counter app/usage.py shows in the UI
+
+One Lua script checks both and takes a token atomically, so all workers share the limits. A reservation is
+refunded when the call fails without reaching the provider's quota (errors, 429s); a cancelled call (lost
+hedge) keeps it. Without Redis nothing can be counted and calls are let through.
+"""
+
+import asyncio
+import time
+
+from prometheus_client import Counter
+
+from app.config import get_settings
+from app.exceptions import QuotaExceededError
+from app.redis_client import batched, get_redis
+from app.usage import TTL_DAYS, USAGE_KEY_EMBED, USAGE_KEY_LLM, usage_key, usage_meter
+
+QUOTA_REFUSED = Counter("quota_refused_total", "Google AI calls refused locally for quota", ["operation", "bucket"])
+
+# KEYS: minute bucket, day counter. ARGV: rpm, now ms, daily limit, day ttl s.
+# {1, used today, 0} taken; {0, used today, retry ms} minute bucket empty; {-1, used today, 0} daily limit reached
+_TAKE = """
+local rpm, now, limit = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+if used >= limit then return {-1, used, 0} end
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens, ts = tonumber(b[1]) or rpm, tonumber(b[2]) or now
+tokens = math.min(rpm, tokens + math.max(0, now - ts) * rpm / 60000)
+if tokens < 1 then return {0, used, math.ceil((1 - tokens) * 60000 / rpm)} end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+used = redis.call('INCR', KEYS[2])
+if used == 1 then redis.call('EXPIRE', KEYS[2], ARGV[4]) end
+return {1, used, 0}
+"""
+
+# KEYS: minute bucket, day counter. ARGV: rpm.
+_REFUND = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1))) end
+if tonumber(redis.call('GET', KEYS[2]) or '0') > 0 then redis.call('DECR', KEYS[2]) end
+return 1
+"""
+
+
+class Reservation:
+    """One reserved call; refund() gives it back if the call failed."""
+
+    def __init__(self, limiter: "QuotaLimiter", keys: list[str] | None):
+        self._limiter = limiter
+        self._keys = keys
+
+    async def refund(self) -> None:
+        if self._keys is None:
+            return
+        keys, self._keys = self._keys, None
+        usage_meter.record(self._limiter.operation, -1)
+        redis = get_redis()
+        if not redis:
+            return
+        try:
+            await self._limiter._script(redis, "refund", _REFUND)(keys=keys, args=[self._limiter.rpm])
+        except Exception:
+            pass
+
+
+class QuotaLimiter:
+    """Reserve Google AI calls for one model against its per-minute and daily limits."""
+
+    def __init__(self, operation: str, usage_prefix: str, rpm_setting: str, daily_setting: str):
+        self.operation = operation
+        self._usage_prefix = usage_prefix
+        self._rpm_setting = rpm_setting
+        self._daily_setting = daily_setting
+        self._scripts: dict = {}
+        self._client = None
+        # Share of today's budget left as of the last reservation or refresh_level() (approximate across workers)
+        self.level = 1.0
+
+    @property
+    def rpm(self) -> int:
+        return getattr(get_settings(), self._rpm_setting)
+
+    @property
+    def daily_limit(self) -> int:
+        return getattr(get_settings(), self._daily_setting)
+
+    def _script(self, redis, name: str, source: str):
+        if redis is not self._client:
+            self._client, self._scripts = redis, {}
+        if name not in self._scripts:
+            self._scripts[name] = redis.register_script(source)
+        return self._scripts[name]
+
+    def _refuse(self, bucket: str, retry_after: float | None = None) -> QuotaExceededError:
+        QUOTA_REFUSED.labels(operation=self.operation, bucket=bucket).inc()
+        return QuotaExceededError(f"{self.operation} {bucket} quota reached.", bucket, retry_after)
+
+    def _set_level(self, used: int) -> None:
+        limit = self.daily_limit
+        self.level = max(0.0, 1 - used / limit) if limit else 0.0
+
+    async def refresh_level(self) -> float:
+        """Re-read today's counter (one GET, batched with concurrent reads) and return the updated level.
+
+        The counter is keyed by date, so the level recovers at midnight even if nothing was reserved since.
+        Without Redis, or on a Redis error, the level is left as it was.
+        """
+        redis = get_redis()
+        if not redis:
+            return self.level
+        try:
+            used = await batched(redis).get(usage_key(self._usage_prefix))
+        except Exception:
+            return self.level
+        self._set_level(int(used or 0))
+        return self.level
+
+    async def reserve(self, wait_until: float | None = None) -> Reservation:
+        """Take one call from both buckets, waiting for the minute bucket until `wait_until` (time.monotonic()).
+
+        Raises QuotaExceededError when the daily limit is reached or the wait would pass `wait_until`.
+        """
+        redis = get_redis()
+        if not redis:
+            return Reservation(self, None)
+        keys = [f"quota:{self.operation}:minute", usage_key(self._usage_prefix)]
+        limit = self.daily_limit
+        while True:
+            try:
+                status, used, retry_ms = await self._script(redis, "take", _TAKE)(
+                    keys=keys, args=[self.rpm, int(time.time() * 1000), limit, 86400 * TTL_DAYS]
+                )
+            except Exception:
+                return Reservation(self, None)
+            self._set_level(int(used))
+            if int(status) == 1:
+                usage_meter.record(self.operation)
+                return Reservation(self, keys)
+            if int(status) == -1:
+                raise self._refuse("daily")
+            retry_after = int(retry_ms) / 1000
+            if wait_until is None or time.monotonic() + retry_after > wait_until:
+                raise self._refuse("minute", retry_after)
+            await asyncio.sleep(retry_after)
+
+
+llm_quota = QuotaLimiter("llm", USAGE_KEY_LLM, "llm_rpm_limit", "llm_daily_limit")
+embed_quota = QuotaLimiter("embed", USAGE_KEY_EMBED, "embed_rpm_limit", "embed_daily_limit")
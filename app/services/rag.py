@@ -1,24 +1,30 @@
 """RAGPipeline: orchestrate embed -> retrieve -> rerank -> prompt -> LLM."""
 
+import asyncio
 import hashlib
 import time
+from dataclasses import dataclass
 from uuid import UUID
 
 import structlog
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import ChildProfile, NeuroProfile, ChildDisability, AdaptiveState, Interaction, LearningSession, MasteryRecord
+from app.models import ChildProfile, NeuroProfile, ChildDisability, AdaptiveState, Interaction, LearningSession
 from app.services.accessibility import AccessibilityEngine, AdaptationRules
+from app.services.circuit_breaker import llm_breaker
 from app.services.embeddings import EmbeddingService
+from app.services.llm_scheduler import LLM_HEDGED, Priority, llm_latency, llm_scheduler
+from app.services.mastery_index import MasteryIndex, MasterySummary
 from app.services.retriever import HybridRetriever
 from app.services.reranker import ProfileAwareReranker
 from app.services.prompt import DynamicPromptBuilder
+from app.services.quota import embed_quota, llm_quota
 from app.config import get_settings
-from app.redis_client import get_redis
-from app.usage import record_llm_use
-from app.constants import CACHE_MASTERY_WEAK_TTL
-from app.exceptions import LearningServiceUnavailableError
+from app.database import release_connection
+from app.usage import reserve_llm_hedge
+from app.constants import QUOTA_CACHE_ONLY_BELOW, QUOTA_SHORT_OUTPUT_BELOW
+from app.exceptions import LearningServiceUnavailableError, QuotaExceededError
 
 logger = structlog.get_logger()
 
@@ -29,6 +35,17 @@ FALLBACK_RESPONSE = (
 )
 
 
+@dataclass
+class AskCache:
+    """An ask's cache reads, fetched together by RAGPipeline.read_cache(); None where not cached."""
+
+    embedding: list[float] | None = None
+    rules: AdaptationRules | None = None
+    # Cache version of the rules, for caching them if they have to be derived
+    rules_version: tuple[int, bytes] | None = None
+    mastery: MasterySummary | None = None
+
+
 class RAGPipeline:
     """Orchestrate retrieval, rerank, prompt build, and LLM call."""
 
@@ -38,6 +55,7 @@ class RAGPipeline:
         self.reranker = ProfileAwareReranker()
         self.prompt_builder = DynamicPromptBuilder()
         self.accessibility = AccessibilityEngine()
+        self.mastery_index = MasteryIndex()
         self.settings = get_settings()
 
     def _get_llm_client(self):
@@ -46,41 +64,139 @@ class RAGPipeline:
 
         return genai.Client(api_key=self.settings.google_api_key)
 
-    async def _call_llm(self, system_prompt: str, user_message: str) -> str:
-        import asyncio
+    async def _generate(self, config, user_message: str, deadline: float) -> str:
+        """One generate_content call, no retries; reserves LLM quota first and refunds it if the call fails."""
+        reservation = await llm_quota.reserve(wait_until=deadline)
+        # New client per call: exiting "async with client.aio" closes the aio client, so reuse would raise "client has been closed"
+        client = self._get_llm_client()
+        try:
+            async with client.aio as aio_client:
+                response = await aio_client.models.generate_content(
+                    model=self.settings.llm_model,
+                    contents=user_message,
+                    config=config,
+                )
+        except Exception:
+            await reservation.refund()
+            raise
+        if response and getattr(response, "text", None):
+            return response.text.strip()
+        return ""
+
+    async def _hedge(self, config, user_message: str, priority: Priority, deadline: float) -> str:
+        async with llm_scheduler.slot(priority, deadline):
+            return await self._generate(config, user_message, deadline)
 
-        from google.genai.types import GenerateContentConfig
+    async def _generate_hedged(
+        self, config, user_message: str, priority: Priority, deadline: float, hedge: bool
+    ) -> str:
+        """generate_content bounded by `deadline` (TimeoutError past it).
+
+        If hedging is allowed and the call is slower than recent p95, a second call goes out when a scheduler
+        slot is idle and the usage hedge budget allows; the first answer wins and the other is cancelled.
+        """
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._generate(config, user_message, deadline))
+        pending = {primary}
+        hedged = False
+        try:
+            hedge_after = llm_latency.hedge_after() if hedge else None
+            if hedge_after is not None and started + hedge_after < deadline:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done and llm_scheduler.idle and await reserve_llm_hedge():
+                    pending.add(asyncio.ensure_future(self._hedge(config, user_message, priority, deadline)))
+                    hedged = True
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        llm_latency.observe(time.monotonic() - started)
+                        if hedged:
+                            LLM_HEDGED.labels(winner="primary" if task is primary else "hedge").inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
 
-        from app.exceptions import LearningServiceUnavailableError
+    async def _call_llm(
+        self,
+        system_prompt: str,
+        user_message: str,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: float | None = None,
+    ) -> str:
+        """Answer from the LLM by `deadline` (time.monotonic(); default LLM_DEADLINE_SECONDS from now)."""
+        from google.genai.types import GenerateContentConfig
 
+        max_tokens = self.settings.llm_max_tokens
+        if llm_quota.level < QUOTA_SHORT_OUTPUT_BELOW:
+            # Daily budget running low: shorter answers
+            max_tokens //= 2
         config = GenerateContentConfig(
             system_instruction=system_prompt,
-            max_output_tokens=self.settings.llm_max_tokens,
+            max_output_tokens=max_tokens,
             temperature=self.settings.llm_temperature,
         )
+        if deadline is None:
+            deadline = time.monotonic() + self.settings.llm_deadline_seconds
         for attempt in range(3):
-            # New client per attempt: exiting "async with client.aio" closes the aio client, so reuse would raise "client has been closed"
-            client = self._get_llm_client()
+            # Refused in milliseconds while Google AI is known to be down
+            probe = await llm_breaker.allow()
             try:
-                async with client.aio as aio_client:
-                    response = await aio_client.models.generate_content(
-                        model=self.settings.llm_model,
-                        contents=user_message,
-                        config=config,
-                    )
-                if response and getattr(response, "text", None):
-                    return response.text.strip()
-                return ""
-            except Exception as e:
-                err_str = str(e).lower()
-                if "429" in err_str or "rate" in err_str or "quota" in err_str:
-                    if attempt < 2:
-                        await asyncio.sleep(2**attempt)
-                        continue
-                raise LearningServiceUnavailableError(
-                    "Learning assistant is temporarily unavailable. Please try again in a few minutes.",
-                    cause=e,
-                ) from e
+                # Slot is held for the call only, not across the backoff
+                async with llm_scheduler.slot(priority, deadline):
+                    try:
+                        # The half-open probe is a single call: a hedge would make it two
+                        text = await self._generate_hedged(config, user_message, priority, deadline, hedge=not probe)
+                    except QuotaExceededError:
+                        # Refused locally: says nothing about the provider's health
+                        raise
+                    except asyncio.TimeoutError as e:
+                        # Our own deadline passed, not a provider failure: not recorded either
+                        raise LearningServiceUnavailableError("Learning assistant timed out.", cause=e) from e
+                    except Exception as e:
+                        await llm_breaker.record(False, probe)
+                        probe = False
+                        err_str = str(e).lower()
+                        throttled = "429" in err_str or "rate" in err_str or "quota" in err_str
+                        # Retry only if the backoff still leaves time before the deadline
+                        if not (throttled and attempt < 2 and time.monotonic() + 2**attempt < deadline):
+                            raise LearningServiceUnavailableError(
+                                "Learning assistant is temporarily unavailable. Please try again in a few minutes.",
+                                cause=e,
+                            ) from e
+                    else:
+                        await llm_breaker.record(True, probe)
+                        probe = False
+                        return text
+            finally:
+                # A probe without an outcome (quota refusal, shed by the scheduler, cancelled) is given back
+                await llm_breaker.release(probe)
+            await asyncio.sleep(2**attempt)
+
+    async def read_cache(self, child_id: UUID, input_text: str) -> AskCache:
+        """Read the ask's cached embedding, adaptation rules and mastery summary in one Redis round trip.
+
+        Also refreshes the quota levels. Anything issued concurrently (e.g. the route's ownership check) joins
+        the same pipeline.
+        """
+        embedding, rules, rules_version, mastery, *_ = await asyncio.gather(
+            self.embedding_svc.cached(input_text),
+            self.accessibility.cached(child_id),
+            self.accessibility.cache_version(child_id),
+            self.mastery_index.cached(child_id),
+            # The budget levels pick cache-only embedding and shorter answers
+            embed_quota.refresh_level(),
+            llm_quota.refresh_level(),
+        )
+        return AskCache(embedding=embedding, rules=rules, rules_version=rules_version, mastery=mastery)
 
     async def ask(
         self,
@@ -89,11 +205,43 @@ class RAGPipeline:
         session_id: UUID,
         input_text: str,
         input_type: str = "TEXT",
+        deadline: float | None = None,
+        cache: AskCache | None = None,
     ) -> tuple[UUID, str, dict, dict, list[dict], int]:
         """
         Returns (interaction_id, response_text, ui_directives, session_constraints, chunks_used, response_time_ms).
+
+        Phases: embed, read context, release the connection, call the LLM, persist. No pool connection or
+        transaction is held across the embedding or LLM call; the writes run in a new, short transaction.
+        Embedding and LLM share `deadline` (time.monotonic(); default LLM_DEADLINE_SECONDS from now); past it
+        the answer is FALLBACK_RESPONSE. `cache` (from read_cache) skips the Redis reads it already did.
         """
         start_ms = int(time.time() * 1000)
+        if deadline is None:
+            deadline = time.monotonic() + self.settings.llm_deadline_seconds
+        if cache is None:
+            rules_version, *_ = await asyncio.gather(
+                self.accessibility.cache_version(child_id), embed_quota.refresh_level(), llm_quota.refresh_level()
+            )
+            cache = AskCache(rules_version=rules_version)
+        await release_connection(db)
+        unavailable: LearningServiceUnavailableError | None = None
+        query_embedding = cache.embedding
+        if query_embedding is None:
+            try:
+                # Low on embedding budget: cached embeddings only; a miss is answered without retrieved content
+                query_embedding = await asyncio.wait_for(
+                    self.embedding_svc.embed(input_text, cache_only=embed_quota.level < QUOTA_CACHE_ONLY_BELOW),
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            except QuotaExceededError:
+                query_embedding = None
+            except LearningServiceUnavailableError as e:
+                query_embedding, unavailable = None, e
+            except asyncio.TimeoutError as e:
+                query_embedding, unavailable = None, LearningServiceUnavailableError("Embedding timed out.", cause=e)
+
+        # Read phase
         child_result = await db.execute(
             select(ChildProfile).where(ChildProfile.child_id == child_id)
         )
@@ -104,7 +252,7 @@ class RAGPipeline:
         neuro = np_result.scalar_one_or_none()
         d_result = await db.execute(select(ChildDisability).where(ChildDisability.child_id == child_id))
         disabilities = list(d_result.scalars().all())
-        rules = await self.accessibility.derive(child, neuro, disabilities)
+        rules = cache.rules or await self.accessibility.derive(child, neuro, disabilities, cache.rules_version)
         state_result = await db.execute(
             select(AdaptiveState)
             .where(AdaptiveState.child_id == child_id)
@@ -114,33 +262,40 @@ class RAGPipeline:
         state = state_result.scalar_one_or_none()
         if not state:
             state = AdaptiveState(child_id=child_id, session_id=session_id)
-        weak_topics = await self._weak_topics(db, child_id)
-        due_topics = await self._due_topics(db, child_id)
-
-        try:
-            query_embedding = await self.embedding_svc.embed(input_text)
+        mastery = cache.mastery or await self.mastery_index.summary(db, child_id)
+        weak_topics = mastery.weak_topics
+        due_topics = [d.topic for d in mastery.due]
+        chunks = []
+        if query_embedding is not None:
             chunks = await self.retriever.retrieve(
                 db, query_embedding, input_text, state, rules, top_k=self.settings.rag_retrieve_top_k
             )
-            chunks = self.reranker.rerank(
-                chunks, child, state, weak_topics,
-                neuro_profile=neuro, disabilities=disabilities,
-                top_n=self.settings.rag_rerank_top_n,
-            )
-            system_prompt = self.prompt_builder.build(
-                child, state, chunks, weak_topics, due_topics, rules,
-                neuro_profile=neuro, disabilities=disabilities,
-            )
-            response_text = await self._call_llm(system_prompt, input_text)
-            await record_llm_use()
-            chunk_ids = [c.chunk_id for c in chunks]
-            chunks_used = [{"topic": c.topic, "difficulty_level": c.difficulty_level, "format_type": c.format_type} for c in chunks]
-        except LearningServiceUnavailableError as e:
-            logger.warning("llm_unavailable", reason=str(e.cause) if getattr(e, "cause", None) else str(e))
+        await release_connection(db)
+
+        # LLM phase: no connection held
+        if unavailable is None:
+            try:
+                chunks = self.reranker.rerank(
+                    chunks, child, state, weak_topics,
+                    neuro_profile=neuro, disabilities=disabilities,
+                    top_n=self.settings.rag_rerank_top_n,
+                )
+                system_prompt = self.prompt_builder.build(
+                    child, state, chunks, weak_topics, due_topics, rules,
+                    neuro_profile=neuro, disabilities=disabilities,
+                )
+                response_text = await self._call_llm(system_prompt, input_text, deadline=deadline)
+                chunk_ids = [c.chunk_id for c in chunks]
+                chunks_used = [{"topic": c.topic, "difficulty_level": c.difficulty_level, "format_type": c.format_type} for c in chunks]
+            except LearningServiceUnavailableError as e:
+                unavailable = e
+        if unavailable is not None:
+            logger.warning("llm_unavailable", reason=str(unavailable.cause or unavailable))
             response_text = FALLBACK_RESPONSE
             chunk_ids = []
             chunks_used = []
 
+        # Write phase: the request commits right after the route returns
         response_time_ms = int(time.time() * 1000) - start_ms
         prompt_hash = hashlib.md5((response_text or "").encode()).hexdigest()[:16]
         interaction = Interaction(
@@ -155,44 +310,15 @@ class RAGPipeline:
         )
         db.add(interaction)
         await db.flush()
-        session_result = await db.execute(select(LearningSession).where(LearningSession.session_id == session_id))
-        sess = session_result.scalar_one_or_none()
-        if sess:
-            sess.total_interactions = (sess.total_interactions or 0) + 1
-            await db.flush()
-        return interaction.interaction_id, response_text, rules.ui_directives, rules.session_constraints, chunks_used, response_time_ms
-
-    async def _weak_topics(self, db: AsyncSession, child_id: UUID) -> list[str]:
-        redis = get_redis()
-        if redis:
-            try:
-                import json
-                raw = await redis.get(f"mastery:weak:{child_id}")
-                if raw:
-                    return json.loads(raw)
-            except Exception:
-                pass
-        result = await db.execute(
-            select(MasteryRecord.topic).where(
-                MasteryRecord.child_id == child_id,
-                MasteryRecord.mastery_level < 0.5,
-            )
+        await db.execute(
+            update(LearningSession)
+            .where(LearningSession.session_id == session_id)
+            .values(total_interactions=func.coalesce(LearningSession.total_interactions, 0) + 1)
+            .execution_options(synchronize_session=False)
         )
-        topics = [r[0] for r in result.fetchall()]
-        if redis:
-            try:
-                import json
-                await redis.set(f"mastery:weak:{child_id}", json.dumps(topics), ex=CACHE_MASTERY_WEAK_TTL)
-            except Exception:
-                pass
-        return topics
-
-    async def _due_topics(self, db: AsyncSession, child_id: UUID) -> list[str]:
-        from datetime import datetime, timezone
-        result = await db.execute(
-            select(MasteryRecord.topic).where(
-                MasteryRecord.child_id == child_id,
-                MasteryRecord.next_review_due <= datetime.now(timezone.utc),
-            )
+        await db.execute(
+            update(ChildProfile)
+            .where(ChildProfile.child_id == child_id)
+            .values(interaction_count=ChildProfile.interaction_count + 1)
         )
-        return [r[0] for r in result.fetchall()]
+        return interaction.interaction_id, response_text, rules.ui_directives, rules.session_constraints, chunks_used, response_time_ms
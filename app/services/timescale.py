@@ -0,0 +1,186 @@
+"""TimescaleDB policy management and readers for the continuous aggregates (migration 003).
+
+Run `python -m app.services.timescale policies` after changing retention settings, or
+`python -m app.services.timescale refresh --days 30` to backfill the aggregates.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import DateTime, Float, Integer, String, column, func, select, table, text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.config import Settings, get_settings
+from app.constants import (
+    TS_AGGREGATE_REFRESH_END,
+    TS_AGGREGATE_REFRESH_EVERY,
+    TS_AGGREGATE_REFRESH_START,
+    TS_INTERACTIONS_COMPRESS_AFTER,
+    TS_SIGNALS_COMPRESS_AFTER,
+)
+
+# Continuous aggregates are views, so they live outside Base.metadata (no create_all / autogenerate)
+interactions_daily = table(
+    "interactions_daily",
+    column("child_id", PGUUID(as_uuid=True)),
+    column("day", DateTime(timezone=True)),
+    column("interactions", Integer),
+    column("rated_interactions", Integer),
+    column("avg_engagement", Float),
+)
+
+session_signal_summary = table(
+    "session_signal_summary",
+    column("session_id", PGUUID(as_uuid=True)),
+    column("child_id", PGUUID(as_uuid=True)),
+    column("signal_type", String),
+    column("bucket", DateTime(timezone=True)),
+    column("signals", Integer),
+    column("avg_value", Float),
+    column("min_value", Float),
+    column("max_value", Float),
+)
+
+HYPERTABLE_COMPRESS_AFTER = {
+    "behavioral_signals": TS_SIGNALS_COMPRESS_AFTER,
+    "interactions": TS_INTERACTIONS_COMPRESS_AFTER,
+}
+CONTINUOUS_AGGREGATES = ("interactions_daily", "session_signal_summary")
+
+
+def retention_days(settings: Settings) -> dict[str, int]:
+    """Configured raw-row retention per hypertable (0 = keep forever)."""
+    return {
+        "behavioral_signals": settings.signals_retention_days,
+        "interactions": settings.interactions_retention_days,
+    }
+
+
+async def apply_compression_policies(conn: AsyncConnection) -> None:
+    """(Re)create compression policies; no-op for ones that already exist."""
+    for hypertable, after in HYPERTABLE_COMPRESS_AFTER.items():
+        await conn.execute(
+            text("SELECT add_compression_policy(:ht, CAST(:after AS interval), if_not_exists => true)"),
+            {"ht": hypertable, "after": after},
+        )
+
+
+async def apply_retention_policies(conn: AsyncConnection, settings: Settings | None = None) -> dict[str, int]:
+    """Replace retention policies with the configured ones. Returns the applied days per hypertable."""
+    applied = retention_days(settings or get_settings())
+    for hypertable, days in applied.items():
+        await conn.execute(text("SELECT remove_retention_policy(:ht, if_exists => true)"), {"ht": hypertable})
+        if days > 0:
+            await conn.execute(
+                text("SELECT add_retention_policy(:ht, make_interval(days => :days), if_not_exists => true)"),
+                {"ht": hypertable, "days": int(days)},
+            )
+    return applied
+
+
+async def apply_refresh_policies(conn: AsyncConnection) -> None:
+    """(Re)create refresh policies for the continuous aggregates."""
+    for view in CONTINUOUS_AGGREGATES:
+        await conn.execute(text("SELECT remove_continuous_aggregate_policy(:v, if_exists => true)"), {"v": view})
+        await conn.execute(
+            text(
+                "SELECT add_continuous_aggregate_policy(:v, start_offset => CAST(:start AS interval), "
+                "end_offset => CAST(:end AS interval), schedule_interval => CAST(:every AS interval))"
+            ),
+            {
+                "v": view,
+                "start": TS_AGGREGATE_REFRESH_START,
+                "end": TS_AGGREGATE_REFRESH_END,
+                "every": TS_AGGREGATE_REFRESH_EVERY,
+            },
+        )
+
+
+async def refresh_aggregates(conn: AsyncConnection, start: datetime | None, end: datetime | None) -> None:
+    """Materialize the aggregates over [start, end). Connection must be in AUTOCOMMIT mode."""
+    for view in CONTINUOUS_AGGREGATES:
+        await conn.execute(
+            text("CALL refresh_continuous_aggregate(CAST(:v AS regclass), :start, :end)"),
+            {"v": view, "start": start, "end": end},
+        )
+
+
+async def daily_interactions(
+    db: AsyncSession,
+    child_id: UUID,
+    since: datetime,
+    until: datetime | None = None,
+) -> list[tuple[datetime, int, float | None]]:
+    """(day, interactions, avg_engagement) per day from interactions_daily, oldest first."""
+    q = select(
+        interactions_daily.c.day,
+        interactions_daily.c.interactions,
+        interactions_daily.c.avg_engagement,
+    ).where(
+        interactions_daily.c.child_id == child_id,
+        interactions_daily.c.day >= since,
+    )
+    if until is not None:
+        q = q.where(interactions_daily.c.day < until)
+    result = await db.execute(q.order_by(interactions_daily.c.day.asc()))
+    return [(row[0], int(row[1] or 0), float(row[2]) if row[2] is not None else None) for row in result.fetchall()]
+
+
+async def session_signals(db: AsyncSession, session_id: UUID) -> list[dict]:
+    """Per-signal-type totals for one session from session_signal_summary."""
+    s = session_signal_summary.c
+    total = func.sum(s.signals)
+    result = await db.execute(
+        select(
+            s.signal_type,
+            total,
+            func.sum(s.avg_value * s.signals) / func.nullif(total, 0),
+            func.min(s.min_value),
+            func.max(s.max_value),
+        )
+        .where(s.session_id == session_id)
+        .group_by(s.signal_type)
+    )
+    return [
+        {
+            "signal_type": row[0],
+            "signals": int(row[1] or 0),
+            "avg_value": float(row[2]) if row[2] is not None else None,
+            "min_value": row[3],
+            "max_value": row[4],
+        }
+        for row in result.fetchall()
+    ]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.database import engine
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if args.command == "policies":
+            await apply_compression_policies(conn)
+            applied = await apply_retention_policies(conn)
+            await apply_refresh_policies(conn)
+            print(f"Policies applied; retention days: {applied}")
+        elif args.command == "refresh":
+            start = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+            await refresh_aggregates(conn, start, None)
+            print("Continuous aggregates refreshed")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage TimescaleDB policies and continuous aggregates.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("policies", help="apply compression, retention and refresh policies from settings")
+    refresh = sub.add_parser("refresh", help="materialize continuous aggregates")
+    refresh.add_argument("--days", type=int, default=0, help="only the last N days (0 = full history)")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
-"""Track and return API usage (LLM + embeddings) for UI limits display."""
+"""Daily API usage (LLM + embeddings): counters for UI limits display and the quota limiter; hedge budget.
 
+The daily totals are counted atomically by QuotaLimiter reservations (they enforce the limits). UsageMeter
+adds breakdowns off the request path: per child and per caregiver per day, and a per-minute series,
+counted in process and flushed to Redis in one pipeline every USAGE_FLUSH_SECONDS and on shutdown:
+  usage:{op}:child:{date}       hash, child_id -> calls
+  usage:{op}:caregiver:{date}   hash, caregiver_id -> calls
+  usage:{op}:minute:{YYYYmmddHHMM}
+"""
+
+import asyncio
+from collections import Counter
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from uuid import UUID
+
+import structlog
 
 from app.config import get_settings
+from app.constants import USAGE_FLUSH_SECONDS
 from app.redis_client import get_redis
 
+logger = structlog.get_logger()
+
 USAGE_KEY_LLM = "usage:llm"
 USAGE_KEY_EMBED = "usage:embed"
+USAGE_KEY_LLM_HEDGE = "usage:llm_hedge"
 TTL_DAYS = 2
 
 
@@ -14,39 +32,120 @@ def _date() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
 
-async def record_llm_use() -> None:
-    redis = get_redis()
-    if not redis:
-        return
-    key = f"{USAGE_KEY_LLM}:{_date()}"
-    try:
-        n = await redis.incr(key)
-        if n == 1:
-            await redis.expire(key, 86400 * TTL_DAYS)
-    except Exception:
-        pass
+def usage_key(prefix: str) -> str:
+    """Today's counter for USAGE_KEY_LLM / USAGE_KEY_EMBED; incremented by QuotaLimiter reservations."""
+    return f"{prefix}:{_date()}"
+
+
+# (child_id, caregiver_id) that calls made in the current request are attributed to
+_attribution: ContextVar[tuple[UUID | None, UUID | None]] = ContextVar("usage_attribution", default=(None, None))
+
+
+def attribute_usage(child_id: UUID | None = None, caregiver_id: UUID | None = None) -> None:
+    """Attribute provider calls made from here on in this request (and tasks it starts) to a child/caregiver."""
+    _attribution.set((child_id, caregiver_id))
+
+
+class UsageMeter:
+    """In-process usage counts, flushed to Redis by a background task; accurate to within one flush interval."""
 
+    def __init__(self):
+        self._counts: Counter[tuple[str, str | None]] = Counter()
+        self._task: asyncio.Task | None = None
 
-async def record_embed_use() -> None:
+    def record(self, op: str, n: int = 1) -> None:
+        """Count n calls (negative for refunds) for op ('llm' / 'embed'). No I/O."""
+        now = datetime.now(timezone.utc)
+        date = now.strftime("%Y-%m-%d")
+        self._counts[(f"usage:{op}:minute:{now.strftime('%Y%m%d%H%M')}", None)] += n
+        child_id, caregiver_id = _attribution.get()
+        if child_id:
+            self._counts[(f"usage:{op}:child:{date}", str(child_id))] += n
+        if caregiver_id:
+            self._counts[(f"usage:{op}:caregiver:{date}", str(caregiver_id))] += n
+
+    async def flush(self) -> None:
+        """Write pending counts in one pipelined round trip; kept for the next flush if Redis fails."""
+        counts, self._counts = self._counts, Counter()
+        counts = {k: n for k, n in counts.items() if n}
+        redis = get_redis()
+        if not counts or not redis:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for (key, field), n in counts.items():
+                if field is None:
+                    pipe.incrby(key, n)
+                else:
+                    pipe.hincrby(key, field, n)
+            for key in {key for key, _ in counts}:
+                pipe.expire(key, 86400 * TTL_DAYS)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("usage_flush_failed", error=str(e), pending=len(counts))
+            self._counts.update(counts)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(USAGE_FLUSH_SECONDS)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+usage_meter = UsageMeter()
+
+
+async def reserve_llm_hedge() -> bool:
+    """Claim one hedged LLM call from today's hedge budget (LLM_HEDGE_BUDGET_FRACTION of the daily limit).
+
+    False when the budget or the daily limit is spent, or without Redis (usage can't be tracked, so no
+    hedging). The hedged call itself still reserves quota like any other.
+    """
+    settings = get_settings()
+    budget = int(settings.llm_daily_limit * settings.llm_hedge_budget_fraction)
     redis = get_redis()
-    if not redis:
-        return
-    key = f"{USAGE_KEY_EMBED}:{_date()}"
+    if not redis or budget <= 0:
+        return False
     try:
-        n = await redis.incr(key)
-        if n == 1:
-            await redis.expire(key, 86400 * TTL_DAYS)
+        key = usage_key(USAGE_KEY_LLM_HEDGE)
+        # Claim and TTL in one MULTI/EXEC: the counter can't be left without an expiry
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.get(usage_key(USAGE_KEY_LLM))
+            pipe.incr(key)
+            pipe.expire(key, 86400 * TTL_DAYS)
+            raw_llm, n, _ = await pipe.execute()
+        if raw_llm and int(raw_llm) >= settings.llm_daily_limit:
+            return False
+        return n <= budget
     except Exception:
-        pass
+        return False
+
 
+async def get_usage(caregiver_id: UUID | None = None) -> dict:
+    """Return { date, llm_requests, llm_daily_limit, embed_requests, embed_daily_limit }.
 
-async def get_usage() -> dict:
-    """Return { date, llm_requests, llm_daily_limit, embed_requests, embed_daily_limit }."""
+    With caregiver_id, also { caregiver_llm_requests, caregiver_embed_requests } (as of the last meter flush).
+    """
     settings = get_settings()
     today = _date()
     redis = get_redis()
     llm_requests = 0
     embed_requests = 0
+    mine = {"llm": 0, "embed": 0}
     if redis:
         try:
             raw_llm = await redis.get(f"{USAGE_KEY_LLM}:{today}")
@@ -58,10 +157,21 @@ async def get_usage() -> dict:
             embed_requests = int(raw_embed.decode()) if raw_embed else 0
         except Exception:
             pass
-    return {
+        if caregiver_id:
+            for op in mine:
+                try:
+                    raw = await redis.hget(f"usage:{op}:caregiver:{today}", str(caregiver_id))
+                    mine[op] = int(raw.decode()) if raw else 0
+                except Exception:
+                    pass
+    data = {
         "date": today,
         "llm_requests": llm_requests,
         "llm_daily_limit": settings.llm_daily_limit,
         "embed_requests": embed_requests,
         "embed_daily_limit": settings.embed_daily_limit,
     }
+    if caregiver_id:
+        data["caregiver_llm_requests"] = mine["llm"]
+        data["caregiver_embed_requests"] = mine["embed"]
+    return data
@@ -0,0 +1,106 @@
+"""TimescaleDB compression, retention and continuous aggregates for interactions and behavioral_signals.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.config import get_settings
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Compression: segment by child so per-child scans only decompress their own segments
+    op.execute("""
+        ALTER TABLE behavioral_signals SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'child_id',
+            timescaledb.compress_orderby = 'ts DESC'
+        )
+    """)
+    op.execute("SELECT add_compression_policy('behavioral_signals', INTERVAL '1 day', if_not_exists => true)")
+    op.execute("""
+        ALTER TABLE interactions SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'child_id',
+            timescaledb.compress_orderby = 'ts DESC'
+        )
+    """)
+    op.execute("SELECT add_compression_policy('interactions', INTERVAL '7 days', if_not_exists => true)")
+
+    # Per-child per-day interaction counts and engagement (WITH NO DATA: allowed inside a transaction)
+    op.execute("""
+        CREATE MATERIALIZED VIEW interactions_daily
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT child_id,
+               time_bucket(INTERVAL '1 day', ts) AS day,
+               count(*) AS interactions,
+               count(engagement_score) AS rated_interactions,
+               avg(engagement_score) AS avg_engagement
+        FROM interactions
+        GROUP BY child_id, time_bucket(INTERVAL '1 day', ts)
+        WITH NO DATA
+    """)
+    op.execute("""
+        SELECT add_continuous_aggregate_policy('interactions_daily',
+            start_offset => INTERVAL '3 days',
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '30 minutes')
+    """)
+    op.execute("CREATE INDEX idx_interactions_daily_child ON interactions_daily (child_id, day DESC)")
+
+    # Per-session signal summaries (hourly buckets per signal type)
+    op.execute("""
+        CREATE MATERIALIZED VIEW session_signal_summary
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT session_id,
+               child_id,
+               signal_type,
+               time_bucket(INTERVAL '1 hour', ts) AS bucket,
+               count(*) AS signals,
+               avg(value) AS avg_value,
+               min(value) AS min_value,
+               max(value) AS max_value
+        FROM behavioral_signals
+        GROUP BY session_id, child_id, signal_type, time_bucket(INTERVAL '1 hour', ts)
+        WITH NO DATA
+    """)
+    op.execute("""
+        SELECT add_continuous_aggregate_policy('session_signal_summary',
+            start_offset => INTERVAL '3 days',
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '30 minutes')
+    """)
+    op.execute("CREATE INDEX idx_session_signal_summary_session ON session_signal_summary (session_id, bucket)")
+
+    # Retention on raw rows only, and opt-in (the default 0 keeps them); aggregates keep their history
+    settings = get_settings()
+    if settings.signals_retention_days > 0:
+        op.execute(
+            f"SELECT add_retention_policy('behavioral_signals', INTERVAL '{int(settings.signals_retention_days)} days', if_not_exists => true)"
+        )
+    if settings.interactions_retention_days > 0:
+        op.execute(
+            f"SELECT add_retention_policy('interactions', INTERVAL '{int(settings.interactions_retention_days)} days', if_not_exists => true)"
+        )
+
+
+def downgrade() -> None:
+    op.execute("SELECT remove_retention_policy('interactions', if_exists => true)")
+    op.execute("SELECT remove_retention_policy('behavioral_signals', if_exists => true)")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS session_signal_summary")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS interactions_daily")
+    op.execute("SELECT remove_compression_policy('interactions', if_exists => true)")
+    op.execute("SELECT remove_compression_policy('behavioral_signals', if_exists => true)")
+    op.execute("SELECT decompress_chunk(c, true) FROM show_chunks('interactions') c")
+    op.execute("SELECT decompress_chunk(c, true) FROM show_chunks('behavioral_signals') c")
+    op.execute("ALTER TABLE interactions SET (timescaledb.compress = false)")
+    op.execute("ALTER TABLE behavioral_signals SET (timescaledb.compress = false)")
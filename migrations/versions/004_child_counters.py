@@ -0,0 +1,33 @@
+"""Maintained session/interaction counters on child_profiles; index for per-child session scans.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("child_profiles", sa.Column("session_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("child_profiles", sa.Column("interaction_count", sa.Integer(), server_default="0", nullable=False))
+    op.execute("""
+        UPDATE child_profiles c SET
+            session_count = (SELECT count(*) FROM learning_sessions s WHERE s.child_id = c.child_id),
+            interaction_count = (SELECT count(*) FROM interactions i WHERE i.child_id = c.child_id)
+    """)
+    op.create_index("idx_sessions_child_started", "learning_sessions", ["child_id", "started_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_sessions_child_started", table_name="learning_sessions")
+    op.drop_column("child_profiles", "interaction_count")
+    op.drop_column("child_profiles", "session_count")
@@ -0,0 +1,48 @@
+"""review_logs (graded review history) and fsrs_parameters (fitted FSRS weights per scope).
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "review_logs",
+        sa.Column("review_id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("child_id", sa.UUID(), nullable=False),
+        sa.Column("topic", sa.String(100), nullable=False),
+        sa.Column("rating", sa.SmallInteger(), nullable=False),
+        sa.Column("elapsed_days", sa.Float(), server_default="0", nullable=False),
+        sa.Column("reviewed_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["child_id"], ["child_profiles.child_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("review_id"),
+    )
+    op.create_index("idx_review_logs_child_topic_ts", "review_logs", ["child_id", "topic", "reviewed_at"])
+
+    op.create_table(
+        "fsrs_parameters",
+        sa.Column("scope", sa.String(150), nullable=False),
+        sa.Column("weights", postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column("review_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("log_loss", sa.Float(), nullable=True),
+        sa.Column("fitted_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("scope"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fsrs_parameters")
+    op.drop_index("idx_review_logs_child_topic_ts", table_name="review_logs")
+    op.drop_table("review_logs")
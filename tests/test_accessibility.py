@@ -103,3 +103,28 @@ async def test_disability_accommodations_override_defaults():
     disabilities = [_make_disability(child.child_id, "VISUAL_IMPAIRMENT", accommodations=accommodations)]
     rules = await engine.derive(child, None, disabilities)
     assert rules.ui_directives.get("custom") is True
+
+
+@pytest.mark.asyncio
+async def test_derive_many_matches_derive_and_shares_identical_profiles():
+    from unittest.mock import patch
+
+    engine = AccessibilityEngine()
+    children = [_make_child() for _ in range(3)]
+    profiles = [
+        (children[0], _make_neuro(children[0].child_id, diagnoses=["ADHD_COMBINED", "SPD"], sensory={"visual": 0.3}), []),
+        (children[1], _make_neuro(children[1].child_id, diagnoses=["ADHD_COMBINED", "SPD"], sensory={"visual": 0.3}), []),
+        (children[2], None, [_make_disability(children[2].child_id, "MOTOR_IMPAIRMENT", {"large_targets": False})]),
+    ]
+    with patch("app.cache.get_redis", return_value=None):
+        rules = await engine.derive_many(profiles)
+        single = await engine.derive(*profiles[2])
+
+    assert set(rules) == {c.child_id for c in children}
+    # Same fingerprint: one derivation, shared
+    assert rules[children[0].child_id] is rules[children[1].child_id]
+    assert "Cap sensory load to child's visual threshold (0.3)." in rules[children[0].child_id].prompt_rules
+    assert rules[children[0].child_id].ui_directives["no_emojis"] is True
+    assert rules[children[2].child_id] == single
+    assert single.ui_directives["large_targets"] is False
+    assert single.session_constraints["time_factor"] == 2.0
@@ -0,0 +1,150 @@
+"""Password hashing pool and ownership cache tests."""
+
+import asyncio
+
+import pytest
+
+from app.config import get_settings
+from app.exceptions import AuthBusyError
+from app.services.auth_service import PasswordHasher, needs_rehash
+
+
+@pytest.fixture
+def fast_bcrypt(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    monkeypatch.setattr(settings, "bcrypt_workers", 2)
+    return settings
+
+
+async def test_hash_and_verify_run_in_pool(fast_bcrypt):
+    hasher = PasswordHasher()
+    hashed = await hasher.hash("correct horse")
+    assert await hasher.verify("correct horse", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert not needs_rehash(hashed)
+    fast_bcrypt.bcrypt_rounds = 5
+    assert needs_rehash(hashed)
+    hasher.shutdown()
+
+
+async def test_rejects_when_queue_full(fast_bcrypt, monkeypatch):
+    monkeypatch.setattr(fast_bcrypt, "bcrypt_max_pending", 1)
+    hasher = PasswordHasher()
+    first = asyncio.create_task(hasher.hash("a"))
+    await asyncio.sleep(0)
+    with pytest.raises(AuthBusyError) as exc:
+        await hasher.hash("b")
+    assert not exc.value.per_client
+    await first
+    hasher.shutdown()
+
+
+async def test_per_client_limit(fast_bcrypt, monkeypatch):
+    monkeypatch.setattr(fast_bcrypt, "bcrypt_per_ip_concurrency", 1)
+    hasher = PasswordHasher()
+    first = asyncio.create_task(hasher.hash("a", ip="10.0.0.1"))
+    await asyncio.sleep(0)
+    with pytest.raises(AuthBusyError) as exc:
+        await hasher.hash("b", ip="10.0.0.1")
+    assert exc.value.per_client
+    await hasher.hash("c", ip="10.0.0.2")
+    await first
+    assert hasher._per_ip == {}
+    hasher.shutdown()
+
+
+def test_principal_cache_is_bounded_and_expires(monkeypatch):
+    import time
+    from uuid import uuid4
+    from app.models import Caregiver
+    from app.services.auth_service import PrincipalCache
+
+    cache = PrincipalCache(max_size=2)
+    users = [Caregiver(caregiver_id=uuid4(), email=f"u{i}@x.org", full_name="U", role="parent") for i in range(3)]
+    far = time.time() + 3600
+    cache.put("t0", far, users[0])
+    cache.put("t1", far, users[1])
+    assert cache.get("t0").caregiver_id == users[0].caregiver_id  # t0 now most recent
+    cache.put("t2", far, users[2])
+    assert cache.get("t1") is None
+    assert cache.get("t2").email == "u2@x.org"
+
+    cache.put("soon", time.time() + 1, users[0])
+    monkeypatch.setattr(time, "time", lambda: far + 1)
+    assert cache.get("soon") is None
+
+
+class _OwnershipRedis:
+    """Just enough of Redis for the ownership cache; nothing writes between WATCH and EXEC here."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.commands = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def watch(self, key):
+                pass
+
+            async def get(self, key):
+                return redis.data.get(key)
+
+            def multi(self):
+                pass
+
+            def __getattr__(self, name):
+                return lambda *args: self.commands.append((name, args))
+
+            async def execute(self):
+                for name, args in self.commands:
+                    if name == "incr":
+                        redis.data[args[0]] = str(int(redis.data.get(args[0]) or 0) + 1).encode()
+                    elif name == "delete":
+                        redis.data.pop(args[0], None)
+                    elif name == "sadd":
+                        redis.data.setdefault(args[0], set()).update(args[1:])
+
+        return _Pipe()
+
+
+async def test_ownership_fill_racing_an_invalidation_is_not_stored():
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from uuid import uuid4
+
+    from app.services import auth_service
+
+    redis = _OwnershipRedis()
+    caregiver_id, child_id = uuid4(), uuid4()
+    batcher = MagicMock()
+    batcher.exists = AsyncMock(return_value=0)
+    batcher.sismember = AsyncMock(return_value=0)
+    batcher.get = AsyncMock(side_effect=lambda key: redis.data.get(key))
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+
+    async def execute(statement):
+        loaded.set()
+        await release.wait()
+        return MagicMock(all=MagicMock(return_value=[]))  # read before the child was committed
+
+    db = MagicMock(execute=execute)
+    with patch.object(auth_service, "get_redis", return_value=redis), \
+            patch.object(auth_service, "batched", return_value=batcher):
+        check = asyncio.create_task(auth_service.caregiver_owns_child(db, caregiver_id, child_id))
+        await loaded.wait()
+        await auth_service.invalidate_child_ownership(caregiver_id)  # the child's creation commits
+        release.set()
+        assert await check is False
+
+    assert auth_service._ownership_key(caregiver_id) not in redis.data
@@ -0,0 +1,121 @@
+"""TwoTierCache tests: local hits skip Redis; invalidations evict the local tier."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import msgpack
+import pytest
+
+from app.cache import TwoTierCache
+from app.constants import CACHE_INVALIDATION_CHANNEL
+
+
+def _redis():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[1, 1])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    redis.set = AsyncMock()
+    return redis, pipe
+
+
+async def test_local_hit_skips_redis_and_invalidate_publishes():
+    cache = TwoTierCache("test-local", ttl=60, load=tuple)
+    redis, pipe = _redis()
+    batcher = MagicMock()
+    batcher.get.side_effect = lambda key: asyncio.sleep(0, msgpack.packb([1, 2]))
+    with patch("app.cache.get_redis", return_value=redis), patch("app.cache.batched", return_value=batcher):
+        assert await cache.get("k") == (1, 2)
+        assert await cache.get("k") == (1, 2)
+        assert batcher.get.call_count == 1
+
+        await cache.invalidate("k")
+        pipe.delete.assert_called_once_with("test-local:k")
+        pipe.publish.assert_called_once_with(CACHE_INVALIDATION_CHANNEL, "test-local:k")
+        assert cache.get_local("k") is None
+
+
+async def test_read_racing_an_invalidation_is_not_kept_locally():
+    cache = TwoTierCache("test-race", ttl=60)
+    release = asyncio.Event()
+
+    async def slow_get(key):
+        await release.wait()
+        return msgpack.packb("old")
+
+    batcher = MagicMock()
+    batcher.get.side_effect = slow_get
+    with patch("app.cache.get_redis", return_value=MagicMock()), patch("app.cache.batched", return_value=batcher):
+        read = asyncio.create_task(cache.get("k"))
+        await asyncio.sleep(0)
+        cache.evict_local("k")  # invalidation message arrives mid-read
+        release.set()
+        assert await read == "old"
+
+    assert cache.get_local("k") is None
+
+
+async def test_listener_subscribes_on_its_own_client_without_socket_timeout():
+    from app import cache as two_tier
+    from app.redis_client import pubsub_client
+
+    assert pubsub_client().connection_pool.connection_kwargs["socket_timeout"] is None
+
+    cache = TwoTierCache("test-listen", ttl=60)
+    cache._put_local("k", "v")
+    cache._put_local("other", "v")
+    evicted = asyncio.Event()
+
+    async def listen():
+        yield {"type": "subscribe", "data": 1}
+        yield {"type": "message", "data": b"test-listen:k"}
+        evicted.set()
+        await asyncio.Event().wait()  # idle subscription
+
+    pubsub = MagicMock()
+    pubsub.__aenter__ = AsyncMock(return_value=pubsub)
+    pubsub.__aexit__ = AsyncMock(return_value=False)
+    pubsub.subscribe = AsyncMock()
+    pubsub.listen = listen
+    client = MagicMock(aclose=AsyncMock())
+    client.pubsub.return_value = pubsub
+    shared = MagicMock()
+    with patch("app.cache.get_redis", return_value=shared), patch("app.cache.pubsub_client", return_value=client):
+        task = asyncio.create_task(two_tier._listen())
+        await asyncio.wait_for(evicted.wait(), 1)
+        # Subscribing cleared the local tier; the message evicted "k" again
+        assert cache.get_local("k") is None
+        cache._put_local("other", "v")
+        await asyncio.sleep(0.01)
+        assert cache.get_local("other") == "v"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    pubsub.subscribe.assert_awaited_once_with(CACHE_INVALIDATION_CHANNEL)
+    shared.pubsub.assert_not_called()
+    client.aclose.assert_awaited_once()
+
+
+async def test_set_after_an_invalidation_is_conditional_on_the_version():
+    cache = TwoTierCache("test-version", ttl=60)
+    redis, pipe = _redis()
+    script = AsyncMock()
+    redis.register_script.return_value = script
+    batcher = MagicMock()
+    batcher.get = AsyncMock(return_value=b"3")
+    with patch("app.cache.get_redis", return_value=redis), patch("app.cache.batched", return_value=batcher):
+        version = await cache.version("k")  # before the DB read
+        await cache.invalidate("k")  # the row changes and commits meanwhile
+        await cache.set("k", "old", version)
+
+    batcher.get.assert_awaited_once_with("test-version:k:gen")
+    pipe.incr.assert_called_once_with("test-version:k:gen")
+    assert cache.get_local("k") is None
+    # Redis only takes the value if test-version:k:gen is still 3, which the invalidation changed
+    script.assert_awaited_once_with(
+        keys=["test-version:k", "test-version:k:gen"], args=[msgpack.packb("old"), b"3", 60], client=pipe
+    )
+    pipe.set.assert_not_called()
@@ -0,0 +1,64 @@
+"""CircuitBreaker tests (in-process state; the Redis scripts implement the same transitions)."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.exceptions import CircuitOpenError, LearningServiceUnavailableError
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def no_redis():
+    with patch("app.services.circuit_breaker.get_redis", return_value=None):
+        yield
+
+
+async def _fail(breaker, n):
+    for _ in range(n):
+        await breaker.record(False, await breaker.allow())
+
+
+async def test_opens_on_failure_rate_and_refuses_fast():
+    breaker = CircuitBreaker("test")
+    for _ in range(circuit_breaker.CIRCUIT_MIN_CALLS // 2):
+        await breaker.record(True, await breaker.allow())
+    await _fail(breaker, circuit_breaker.CIRCUIT_MIN_CALLS // 2 - 1)
+    assert await breaker.allow() is False  # 4/9 failed, below min calls
+    await breaker.record(False)
+    with pytest.raises(CircuitOpenError) as exc:
+        await breaker.allow()
+    # Callers already fall back on LearningServiceUnavailableError
+    assert isinstance(exc.value, LearningServiceUnavailableError)
+
+
+async def test_half_open_probe_closes_or_reopens(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_OPEN_SECONDS", 0)
+    breaker = CircuitBreaker("test")
+    await _fail(breaker, circuit_breaker.CIRCUIT_MIN_CALLS)
+
+    # Half-open: exactly one probe goes through
+    assert await breaker.allow() is True
+    with pytest.raises(CircuitOpenError):
+        await breaker.allow()
+    await breaker.record(False, probe=True)
+
+    assert await breaker.allow() is True
+    await breaker.record(True, probe=True)
+    # Closed again with a fresh window
+    assert await breaker.allow() is False
+    await breaker.record(False)
+    assert await breaker.allow() is False
+
+
+async def test_released_probe_can_be_taken_again(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_OPEN_SECONDS", 0)
+    breaker = CircuitBreaker("test")
+    await _fail(breaker, circuit_breaker.CIRCUIT_MIN_CALLS)
+
+    assert await breaker.allow() is True
+    await breaker.release(True)
+    assert await breaker.allow() is True
+    with pytest.raises(CircuitOpenError):
+        await breaker.allow()
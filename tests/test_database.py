@@ -0,0 +1,64 @@
+"""Request session lifecycle: lazy connection, commit only on writes, read-only routes."""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi import Depends, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.dependencies import get_db, read_only
+
+
+def _app() -> FastAPI:
+    app = FastAPI(dependencies=[Depends(get_db, scope="function")])
+
+    @app.get("/noop")
+    async def noop(request: Request):
+        return {"connected": request.state.db.in_transaction()}
+
+    @app.get("/read")
+    async def read(request: Request):
+        return {"value": (await request.state.db.execute(select(literal(1)))).scalar()}
+
+    @app.post("/write")
+    async def write(request: Request):
+        await request.state.db.execute(text("CREATE TEMP TABLE written (x INTEGER)"))
+        return {}
+
+    @app.post("/read-only-write", dependencies=[Depends(read_only)])
+    async def read_only_write(request: Request):
+        await request.state.db.execute(text("CREATE TEMP TABLE discarded (x INTEGER)"))
+        return {}
+
+    return app
+
+
+async def test_session_commits_only_when_the_request_wrote():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    commit = AsyncMock()
+    with patch("app.dependencies.async_session_factory", factory), \
+            patch.object(AsyncSession, "commit", commit):
+        async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as client:
+            assert (await client.get("/noop")).json() == {"connected": False}
+            assert (await client.get("/read")).json() == {"value": 1}
+            assert commit.await_count == 0
+            await client.post("/read-only-write")
+            assert commit.await_count == 0
+            await client.post("/write")
+            assert commit.await_count == 1
+    await engine.dispose()
+
+
+async def test_raw_select_is_not_a_write():
+    from app.database import has_writes
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with AsyncSession(engine) as session:
+        await session.execute(text("SELECT 1"))
+        await session.execute(select(literal(1)))
+        assert not has_writes(session)
+        await session.execute(text("CREATE TEMP TABLE raw (x INTEGER)"))
+        assert has_writes(session)
+    await engine.dispose()
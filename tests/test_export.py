@@ -0,0 +1,98 @@
+"""ExportService encoder tests (no DB)."""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.services.export import ExportService
+
+
+def _rows():
+    cid = uuid4()
+    return [
+        [
+            {
+                "signal_id": uuid4(), "session_id": uuid4(), "child_id": cid, "signal_type": "RE_READ",
+                "value": 0.4, "raw_payload": {"k": 1}, "ts": datetime(2026, 1, 1, tzinfo=timezone.utc),
+            },
+        ],
+        [
+            {
+                "signal_id": uuid4(), "session_id": uuid4(), "child_id": cid, "signal_type": "ABANDON",
+                "value": 1.0, "raw_payload": None, "ts": datetime(2026, 1, 2, tzinfo=timezone.utc),
+            },
+        ],
+    ]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_one_line_per_row():
+    out = await _collect(ExportService().ndjson(_aiter(_rows())))
+    lines = out.decode().splitlines()
+    assert len(lines) == 2
+    first = json.loads(lines[0])
+    assert first["raw_payload"] == {"k": 1}
+    assert first["ts"].startswith("2026-01-01")
+
+
+@pytest.mark.asyncio
+async def test_csv_header_and_rows():
+    svc = ExportService()
+    cols = [c.name for c in svc.columns("behavioral_signals")]
+    out = await _collect(svc.csv(_aiter(_rows()), cols))
+    rows = list(csv.reader(io.StringIO(out.decode())))
+    assert rows[0] == cols
+    assert len(rows) == 3
+    assert rows[2][cols.index("raw_payload")] == ""
+
+
+@pytest.mark.asyncio
+async def test_parquet_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = await _collect(ExportService().parquet(_aiter(_rows()), "behavioral_signals"))
+    table = pq.read_table(io.BytesIO(out))
+    assert table.num_rows == 2
+    assert table.column("signal_type").to_pylist() == ["RE_READ", "ABANDON"]
+
+
+async def test_self_registered_admin_role_exports_only_own_children(monkeypatch):
+    from unittest.mock import patch
+    from pydantic import ValidationError
+    from app.config import get_settings
+    from app.models import Caregiver
+    from app.routers import admin
+    from app.schemas.auth import RegisterRequest
+
+    with pytest.raises(ValidationError):
+        RegisterRequest(email="x@example.org", password="password123", full_name="X", role="admin")
+
+    queries = []
+
+    def batches(session_factory, query):
+        queries.append(query)
+        return _aiter([])
+
+    monkeypatch.setattr(get_settings(), "admin_emails", ["ops@example.org"])
+    caller = Caregiver(caregiver_id=uuid4(), email="x@example.org", full_name="X", role="admin")
+    ops = Caregiver(caregiver_id=uuid4(), email="Ops@example.org", full_name="Ops", role="parent")
+    with patch.object(admin.export_svc, "batches", batches):
+        for user in (caller, ops):
+            response = await admin.export_rows("interactions", "ndjson", None, None, None, current_user=user)
+            await _collect(response.body_iterator)
+
+    restricted, unrestricted = (q.compile().params for q in queries)
+    assert restricted == {"caregiver_id_1": caller.caregiver_id}
+    assert unrestricted == {}
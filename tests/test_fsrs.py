@@ -2,9 +2,10 @@
 
 from datetime import datetime, timezone, timedelta
 
+import numpy as np
 import pytest
 
-from app.services.fsrs import FSRSService, FSRSResult
+from app.services.fsrs import FSRSEngine, FSRSResult, FSRSService
 
 
 def test_initial_review_rating_1_low_stability():
@@ -44,3 +45,52 @@ def test_mastery_level_approaches_1_after_many_good_reviews():
         res = fsrs.review(res.stability, res.difficulty, now, 4)
         now = res.next_review
     assert res.stability > 1.0
+
+
+def test_engine_batch_matches_single_record_api():
+    fsrs = FSRSService()
+    stability = np.array([0.5, 3.0, 12.0, 40.0])
+    difficulty = np.array([2.0, 5.0, 7.5, 9.0])
+    elapsed = np.array([1.0, 3.0, 10.0, 60.0])
+    ratings = np.array([1, 2, 3, 4])
+    out = fsrs.engine.schedule(stability, difficulty, elapsed, ratings)
+    now = datetime.now(timezone.utc)
+    for i in range(len(ratings)):
+        res = fsrs.review(stability[i], difficulty[i], now - timedelta(days=elapsed[i]), int(ratings[i]))
+        assert res.stability == pytest.approx(out.stability[i], rel=1e-4)
+        assert res.difficulty == pytest.approx(out.difficulty[i])
+    assert out.interval_days.dtype == np.int64
+    assert (out.interval_days >= 1).all()
+
+
+def test_engine_new_records_use_initial_state():
+    engine = FSRSEngine()
+    out = engine.schedule([5.0, 5.0], [5.0, 5.0], [0.0, 2.0], [3, 3], is_new=[True, False])
+    assert out.stability[0] == pytest.approx(engine.w[2])
+    assert out.retrievability[0] == 1.0
+    assert out.retrievability[1] < 1.0
+
+
+def test_engine_interval_equals_stability_at_90_percent_retention():
+    engine = FSRSEngine(desired_retention=0.9)
+    assert engine.retrievability(10.0, 10.0) == pytest.approx(0.9)
+    assert engine.interval(np.array([10.0]))[0] == 10
+
+
+def test_engine_lapse_never_raises_stability():
+    engine = FSRSEngine()
+    s = np.linspace(0.5, 100.0, 1000)
+    out = engine.schedule(s, np.full_like(s, 5.0), s * 2, np.ones_like(s, dtype=np.int64))
+    assert (out.stability <= s).all()
+
+
+def test_simulator_higher_retention_costs_more_reviews():
+    from app.services.fsrs_simulator import CardPopulation, simulate
+
+    population = CardPopulation.synthetic(2000, FSRSEngine(), seed=1)
+    low = simulate(population, FSRSEngine(desired_retention=0.8), days=60, seed=1)
+    high = simulate(population, FSRSEngine(desired_retention=0.95), days=60, seed=1)
+    assert len(high.reviews_per_day) == 60
+    assert high.total_reviews > low.total_reviews
+    assert np.mean(high.retention_per_day) > np.mean(low.retention_per_day)
+    assert high.summary(llm_daily_limit=60)["total_llm_calls"] == high.total_reviews
@@ -0,0 +1,47 @@
+"""FSRS optimizer tests (synthetic review histories, no database)."""
+
+import numpy as np
+
+from app.constants import FSRS_W
+from app.services.fsrs import FSRSEngine
+from app.services.fsrs_optimizer import FSRSOptimizer, ReviewHistory, log_loss
+
+
+def _simulate(w: list[float], cards: int = 300, steps: int = 8, seed: int = 7) -> ReviewHistory:
+    """Reviews drawn from an FSRS learner with weights w: recall ~ Bernoulli(R), Good on recall, Again on lapse."""
+    rng = np.random.default_rng(seed)
+    engine = FSRSEngine(w)
+    ratings = np.full((cards, steps), 3, dtype=np.int64)
+    elapsed = np.zeros((cards, steps))
+    s = engine.init_stability(ratings[:, 0])
+    d = engine.init_difficulty(ratings[:, 0])
+    for t in range(1, steps):
+        elapsed[:, t] = engine.interval(s) * rng.uniform(0.5, 2.5, cards)
+        r = engine.retrievability(elapsed[:, t], s)
+        ratings[:, t] = np.where(rng.random(cards) < r, 3, 1)
+        s = engine.next_stability(s, d, r, ratings[:, t])
+        d = engine.next_difficulty(d, ratings[:, t])
+    return ReviewHistory(ratings=ratings, elapsed=elapsed, mask=np.ones((cards, steps), dtype=bool))
+
+
+def test_history_from_rows_pads_and_drops_single_reviews():
+    rows = [
+        ("a", 3, 0.0), ("a", 1, 2.0), ("a", 3, 1.0),
+        ("b", 4, 0.0),
+        ("c", 3, 0.0), ("c", 3, 4.0),
+    ]
+    h = ReviewHistory.from_rows(rows)
+    assert h.ratings.shape == (2, 3)
+    assert h.mask.sum() == 5
+    assert h.review_count == 3
+
+
+def test_fit_reduces_loss_on_learner_with_different_weights():
+    true_w = list(FSRS_W)
+    true_w[8], true_w[11] = 0.6, 0.8  # slower recall growth, harsher lapses than the defaults
+    history = _simulate(true_w)
+    result = FSRSOptimizer(iterations=15, learning_rate=0.05).fit(history)
+    assert result.initial_log_loss == log_loss(np.array(FSRS_W), history)
+    assert result.log_loss < result.initial_log_loss
+    assert len(result.weights) == len(FSRS_W)
+    assert result.weights[17:] == [round(x, 4) for x in FSRS_W[17:]]
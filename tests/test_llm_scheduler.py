@@ -0,0 +1,87 @@
+"""LLMScheduler tests: concurrency limit, priority order, shedding."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.config import get_settings
+from app.exceptions import LearningServiceUnavailableError
+from app.services.llm_scheduler import LLMScheduler, Priority
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_max_concurrency", 1)
+    monkeypatch.setattr(settings, "llm_max_queue", 2)
+    monkeypatch.setattr(settings, "llm_deadline_seconds", 5.0)
+    return settings
+
+
+async def test_waiters_run_by_priority_then_arrival(one_slot):
+    scheduler = LLMScheduler()
+    order = []
+    gate = asyncio.Event()
+
+    async def call(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await gate.wait()
+
+    first = asyncio.create_task(call("first", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+    rest = [
+        asyncio.create_task(call("background", Priority.BACKGROUND)),
+        asyncio.create_task(call("interactive", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert order == ["first"] and scheduler.queued == 2
+    gate.set()
+    await asyncio.gather(first, *rest)
+    assert order == ["first", "interactive", "background"]
+
+
+async def test_full_queue_sheds_or_preempts_background(one_slot):
+    scheduler = LLMScheduler()
+    gate = asyncio.Event()
+
+    async def call(priority):
+        async with scheduler.slot(priority):
+            await gate.wait()
+
+    tasks = [asyncio.create_task(call(p)) for p in (Priority.INTERACTIVE, Priority.INTERACTIVE, Priority.BACKGROUND)]
+    await asyncio.sleep(0)
+    # Queue is full: another background call is refused outright...
+    with pytest.raises(LearningServiceUnavailableError):
+        await call(Priority.BACKGROUND)
+    # ...while an interactive one takes the queued background call's place
+    tasks.append(asyncio.create_task(call(Priority.INTERACTIVE)))
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert isinstance(results[2], LearningServiceUnavailableError)
+    assert [r for i, r in enumerate(results) if i != 2] == [None, None, None]
+
+
+async def test_waiter_is_shed_at_its_deadline(one_slot):
+    scheduler = LLMScheduler()
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot():
+            await gate.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    started = time.monotonic()
+    with pytest.raises(LearningServiceUnavailableError):
+        async with scheduler.slot(deadline=time.monotonic() + 0.05):
+            pass
+    assert time.monotonic() - started < 1
+    assert scheduler.queued == 0
+    gate.set()
+    await holder
+    # The slot is free again once the holder is done
+    async with scheduler.slot():
+        pass
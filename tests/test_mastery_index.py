@@ -0,0 +1,65 @@
+"""MasteryIndex Lua scripts, run against fakeredis (with its Lua runtime)."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from uuid import uuid4
+
+import fakeredis
+import pytest
+
+from app.services import mastery_index
+from app.services.mastery_index import CHILDREN_KEY, MasteryIndex, TopicState
+
+
+@pytest.fixture
+def redis():
+    client = fakeredis.FakeAsyncRedis()
+    with patch.object(mastery_index, "get_redis", return_value=client):
+        yield client
+
+
+async def test_rebuild_racing_a_write_does_not_replace_newer_data(redis):
+    index = MasteryIndex()
+    child_id = uuid4()
+    now = datetime.now(timezone.utc)
+    stale = [TopicState("fractions", now - timedelta(days=1), 0.2, 1.0)]
+    fresh = TopicState("fractions", now + timedelta(days=4), 0.6, 5.0)
+
+    async def load_then_feedback_commits(db, cid):
+        # The feedback commit lands after the rows were read, while the summary is not built
+        await index.upsert_many(cid, [fresh])
+        return stale
+
+    with patch.object(index, "_load", load_then_feedback_commits):
+        summary = await index.summary(None, child_id, now)
+    assert [t.topic for t in summary.due] == ["fractions"]  # this request answers from what it read
+    assert await index.cached(child_id, now) is None  # but the stale rows were not stored
+
+    async def load_fresh(db, cid):
+        return [fresh]
+
+    with patch.object(index, "_load", load_fresh):
+        assert await index.rebuild(None, child_id) == 1
+    cached = await index.cached(child_id, now)
+    assert cached.due == [] and cached.weak_topics == [] and cached.avg_mastery == pytest.approx(0.6)
+
+
+async def test_expired_summaries_leave_the_due_children_index(redis):
+    index = MasteryIndex()
+    now = datetime.now(timezone.utc)
+    kept, expired, read = uuid4(), uuid4(), uuid4()
+    for child_id in (kept, expired, read):
+        async def load(db, cid):
+            return [TopicState("decimals", now - timedelta(hours=1), 0.3, 2.0)]
+
+        with patch.object(index, "_load", load):
+            await index.rebuild(None, child_id)
+    assert set(await index.children_due(now)) == {kept, expired, read}
+
+    # TTL runs out for two children's summaries; the index member has no TTL of its own
+    await redis.delete(f"review:due:{expired}", f"review:due:{read}")
+    assert await index.cached(read, now) is None
+    assert await redis.zscore(CHILDREN_KEY, str(read)) is None
+
+    assert await index.children_due(now) == [kept]
+    assert await redis.zrange(CHILDREN_KEY, 0, -1) == [str(kept).encode()]
@@ -0,0 +1,62 @@
+"""QuotaLimiter tests (script results stubbed; the Lua runs in Redis)."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.exceptions import LearningServiceUnavailableError, QuotaExceededError
+from app.services.quota import QuotaLimiter
+from app.usage import USAGE_KEY_LLM, usage_key
+
+
+def _limiter(*results):
+    limiter = QuotaLimiter("llm", USAGE_KEY_LLM, "llm_rpm_limit", "llm_daily_limit")
+    take = AsyncMock(side_effect=list(results))
+    refund = AsyncMock()
+    limiter._script = MagicMock(side_effect=lambda redis, name, source: take if name == "take" else refund)
+    return limiter, take, refund
+
+
+async def test_reserve_waits_for_minute_bucket_within_deadline():
+    limiter, take, refund = _limiter([0, 10, 20], [1, 11, 0])
+    with patch("app.services.quota.get_redis", return_value=MagicMock()):
+        reservation = await limiter.reserve(wait_until=time.monotonic() + 1)
+        assert take.await_count == 2
+        await reservation.refund()
+        await reservation.refund()
+    refund.assert_awaited_once()
+    assert limiter.level == pytest.approx(1 - 11 / 60)
+
+
+async def test_reserve_refuses_without_waiting_past_deadline_or_daily_limit():
+    limiter, _, _ = _limiter([0, 10, 5000], [-1, 60, 0])
+    with patch("app.services.quota.get_redis", return_value=MagicMock()):
+        with pytest.raises(QuotaExceededError) as exc:
+            await limiter.reserve(wait_until=time.monotonic() + 1)
+        assert exc.value.bucket == "minute" and exc.value.retry_after == 5
+        with pytest.raises(LearningServiceUnavailableError):
+            await limiter.reserve()
+    assert limiter.level == 0.0
+
+
+async def test_reserve_lets_calls_through_without_redis():
+    limiter, take, _ = _limiter()
+    with patch("app.services.quota.get_redis", return_value=None):
+        await (await limiter.reserve()).refund()
+    take.assert_not_awaited()
+
+
+async def test_level_recovers_when_the_day_rolls_over():
+    limiter, _, _ = _limiter([-1, 60, 0])
+    counters = {usage_key(USAGE_KEY_LLM): b"60"}
+    batcher = MagicMock()
+    batcher.get = AsyncMock(side_effect=lambda key: counters.get(key))
+    with patch("app.services.quota.get_redis", return_value=MagicMock()), \
+            patch("app.services.quota.batched", return_value=batcher):
+        with pytest.raises(QuotaExceededError):
+            await limiter.reserve()
+        assert limiter.level == 0.0
+        assert await limiter.refresh_level() == 0.0
+        counters.clear()  # midnight: today's counter does not exist yet
+        assert await limiter.refresh_level() == 1.0
@@ -134,3 +134,244 @@ def test_high_cognitive_load_triggers_override_rule():
     rules = AdaptationRules(prompt_rules=[], ui_directives={}, content_filters={}, session_constraints={})
     prompt = builder.build(child, state, [], [], [], rules)
     assert "CRITICAL" in prompt and "shortest" in prompt
+
+
+class _PoolTracker:
+    def __init__(self):
+        self.held = 0
+        self.peak = 0
+        self.held_during_llm = []
+
+
+class _TrackedSession:
+    """Stands in for AsyncSession: a connection is checked out on the first execute and returned on commit."""
+
+    def __init__(self, pool: _PoolTracker):
+        self.pool = pool
+        self.connected = False
+        self.info, self.new, self.dirty, self.deleted = {}, set(), set(), set()
+
+    def in_transaction(self):
+        return self.connected
+
+    async def execute(self, stmt, *args, **kwargs):
+        from unittest.mock import MagicMock
+        from app.models import ChildProfile
+
+        if not self.connected:
+            self.connected = True
+            self.pool.held += 1
+            self.pool.peak = max(self.pool.peak, self.pool.held)
+        if getattr(stmt, "is_select", False) and stmt.column_descriptions[0]["entity"] is ChildProfile:
+            return MagicMock(scalar_one_or_none=MagicMock(return_value=ChildProfile(child_id=uuid4())))
+        if not getattr(stmt, "is_select", False):
+            self.info["writes"] = True
+        return MagicMock(scalar_one_or_none=MagicMock(return_value=None), scalars=MagicMock(return_value=MagicMock(all=list)))
+
+    def add(self, obj):
+        obj.interaction_id = uuid4()
+
+    async def flush(self):
+        self.info["writes"] = True
+
+    async def commit(self):
+        if self.connected:
+            self.connected = False
+            self.pool.held -= 1
+
+
+@pytest.mark.parametrize("llm_latency", [0.01, 0.1])
+async def test_concurrent_asks_hold_no_connection_during_llm_call(llm_latency):
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from app.services.mastery_index import MasterySummary
+    from app.services.rag import RAGPipeline
+
+    pool = _PoolTracker()
+    pipeline = RAGPipeline()
+    rules = AdaptationRules(prompt_rules=[], ui_directives={}, content_filters={}, session_constraints={})
+
+    async def llm(system_prompt, user_message, **kwargs):
+        pool.held_during_llm.append(pool.held)
+        await asyncio.sleep(llm_latency)
+        return "answer"
+
+    async def request(session):
+        result = await pipeline.ask(session, uuid4(), uuid4(), "what is 2+2?")
+        await session.commit()  # get_db
+        return result
+
+    with patch.object(pipeline.embedding_svc, "embed", AsyncMock(return_value=[0.1] * 768)), \
+            patch.object(pipeline.accessibility, "derive", AsyncMock(return_value=rules)), \
+            patch.object(pipeline.mastery_index, "summary", AsyncMock(return_value=MasterySummary())), \
+            patch.object(pipeline.retriever, "retrieve", AsyncMock(return_value=[])), \
+            patch.object(pipeline.reranker, "rerank", MagicMock(return_value=[])), \
+            patch.object(pipeline.prompt_builder, "build", MagicMock(return_value="prompt")), \
+            patch.object(pipeline, "_call_llm", llm):
+        results = await asyncio.gather(*(request(_TrackedSession(pool)) for _ in range(30)))
+
+    assert all(r[1] == "answer" for r in results)
+    # All 30 asks wait on the model at once, holding no pool connection
+    assert pool.held_during_llm == [0] * 30
+    # Peak pool usage is the read or write phase of one request, not one per in-flight LLM call
+    assert pool.peak == 1
+    assert pool.held == 0
+
+
+async def test_slow_llm_call_is_hedged_and_loser_cancelled(monkeypatch):
+    import asyncio
+    import time
+    from unittest.mock import AsyncMock
+    from app.services import rag as rag_module
+    from app.services.llm_scheduler import LatencyWindow, Priority
+
+    latency = LatencyWindow()
+    for _ in range(50):
+        latency.observe(0.02)
+    monkeypatch.setattr(rag_module, "llm_latency", latency)
+    reserve = AsyncMock(return_value=True)
+    monkeypatch.setattr(rag_module, "reserve_llm_hedge", reserve)
+
+    calls = []
+
+    async def generate(config, user_message, deadline):
+        calls.append(asyncio.current_task())
+        await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        return f"answer {len(calls)}"
+
+    pipeline = rag_module.RAGPipeline()
+    monkeypatch.setattr(pipeline, "_generate", generate)
+    text = await pipeline._generate_hedged(None, "q", Priority.INTERACTIVE, time.monotonic() + 2, hedge=True)
+    await asyncio.sleep(0)
+
+    assert text == "answer 2"
+    reserve.assert_awaited_once()
+    assert calls[0].cancelled()
+
+
+async def test_llm_call_is_bounded_by_deadline(monkeypatch):
+    import asyncio
+    import time
+    from app.services.llm_scheduler import Priority
+    from app.services.rag import RAGPipeline
+
+    async def generate(config, user_message, deadline):
+        await asyncio.sleep(5)
+
+    pipeline = RAGPipeline()
+    monkeypatch.setattr(pipeline, "_generate", generate)
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await pipeline._generate_hedged(None, "q", Priority.INTERACTIVE, started + 0.05, hedge=False)
+    assert time.monotonic() - started < 1
+
+
+async def test_retriever_read_phase_releases_the_connection():
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.database import release_connection
+    from app.services.retriever import HybridRetriever
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(KnowledgeChunk.__table__.create)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute", retval=True)
+    def no_vector_rows(conn, cursor, statement, parameters, context, executemany):
+        # SQLite has no pgvector; the session still sees the retriever's own text() statement
+        if "<=>" in statement:
+            return "SELECT NULL WHERE 0", ()
+        return statement, parameters
+
+    rules = AdaptationRules(prompt_rules=[], ui_directives={}, content_filters={}, session_constraints={})
+    async with AsyncSession(engine) as session:
+        assert await HybridRetriever().retrieve(session, [0.1] * 768, "fractions", None, rules) == []
+        assert session.in_transaction()
+        assert not session.info.get("writes")
+        await release_connection(session)
+        assert not session.in_transaction()
+    await engine.dispose()
+
+
+async def test_probe_refused_locally_is_released(monkeypatch):
+    from unittest.mock import patch
+    from app.exceptions import QuotaExceededError
+    from app.services import circuit_breaker, rag as rag_module
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.services.rag import RAGPipeline
+
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_OPEN_SECONDS", 0)
+    breaker = CircuitBreaker("test")
+    monkeypatch.setattr(rag_module, "llm_breaker", breaker)
+    pipeline = RAGPipeline()
+    hedges = []
+
+    async def generate_hedged(config, user_message, priority, deadline, hedge):
+        hedges.append(hedge)
+        if len(hedges) == 1:
+            raise QuotaExceededError("llm daily quota reached.", "daily")
+        return "answer"
+
+    with patch("app.services.circuit_breaker.get_redis", return_value=None):
+        for _ in range(circuit_breaker.CIRCUIT_MIN_CALLS):
+            await breaker.record(False, await breaker.allow())
+        monkeypatch.setattr(pipeline, "_generate_hedged", generate_hedged)
+        with pytest.raises(QuotaExceededError):
+            await pipeline._call_llm("system", "question")
+        # The refused call was the half-open probe; the next call may probe instead of being refused
+        assert await pipeline._call_llm("system", "question") == "answer"
+    assert hedges == [False, False]
+    assert await breaker.allow() is False
+
+
+async def test_cancelled_embed_releases_the_probe(monkeypatch):
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from app.services import circuit_breaker, embeddings as embeddings_module
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.services.embeddings import EmbeddingService
+
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_OPEN_SECONDS", 0)
+    breaker = CircuitBreaker("test")
+    monkeypatch.setattr(embeddings_module, "embed_breaker", breaker)
+    monkeypatch.setattr(embeddings_module.embed_quota, "reserve", AsyncMock())
+
+    async def hang(**kwargs):
+        await asyncio.sleep(60)
+
+    aio = MagicMock()
+    aio.__aenter__ = AsyncMock(return_value=aio)
+    aio.__aexit__ = AsyncMock(return_value=False)
+    aio.models.embed_content = hang
+    with patch("app.services.circuit_breaker.get_redis", return_value=None), \
+            patch("google.genai.Client", return_value=MagicMock(aio=aio)):
+        for _ in range(circuit_breaker.CIRCUIT_MIN_CALLS):
+            await breaker.record(False, await breaker.allow())
+        # The ask's deadline cancels the embed that holds the half-open probe
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(EmbeddingService().generate("question"), 0.01)
+        # The probe was given back: the next embed may probe instead of being refused until its TTL
+        assert await breaker.allow() is True
+
+
+async def test_deadline_expiry_is_not_a_breaker_failure(monkeypatch):
+    import asyncio
+    import time
+    from unittest.mock import patch
+    from app.exceptions import LearningServiceUnavailableError
+    from app.services import rag as rag_module
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.services.rag import RAGPipeline
+
+    breaker = CircuitBreaker("test")
+    monkeypatch.setattr(rag_module, "llm_breaker", breaker)
+    pipeline = RAGPipeline()
+
+    async def generate_hedged(config, user_message, priority, deadline, hedge):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(pipeline, "_generate_hedged", generate_hedged)
+    with patch("app.services.circuit_breaker.get_redis", return_value=None):
+        with pytest.raises(LearningServiceUnavailableError):
+            await pipeline._call_llm("system", "question", deadline=time.monotonic() + 1)
+    assert breaker._buckets == {}
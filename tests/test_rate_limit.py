@@ -0,0 +1,38 @@
+"""GCRA rate limiter tests (in-process path; the Redis script computes the same)."""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def clock():
+    now = [1_000_000.0]
+    with patch("app.rate_limit.get_redis", return_value=None), \
+            patch("app.rate_limit.time.time", side_effect=lambda: now[0]):
+        yield now
+
+
+async def test_burst_up_to_limit_then_spaced(clock):
+    limiter = RateLimiter("test", limit=3, period=60)
+    for _ in range(3):
+        assert await limiter.wait_ms("child-1") == 0
+    assert await limiter.wait_ms("child-1") == pytest.approx(20_000)
+    assert await limiter.wait_ms("child-2") == 0  # per subject
+
+    # One emission interval later exactly one more request fits: no second burst at a window edge
+    clock[0] += 20
+    assert await limiter.wait_ms("child-1") == 0
+    assert await limiter.wait_ms("child-1") > 0
+
+
+async def test_check_raises_429_with_retry_after(clock):
+    limiter = RateLimiter("test", limit=1, period=60)
+    await limiter.check("c")
+    with pytest.raises(HTTPException) as exc:
+        await limiter.check("c")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "60"
@@ -0,0 +1,91 @@
+"""RedisBatcher tests: concurrent commands share one pipeline."""
+
+import asyncio
+from unittest.mock import patch
+from uuid import uuid4
+
+from redis.exceptions import ResponseError
+
+from app.redis_client import RedisBatcher
+
+
+class _Pipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def execute_command(self, *args):
+        self.commands.append(args)
+
+    async def execute(self, raise_on_error=True):
+        self.client.round_trips.append(self.commands)
+        return [self.client.reply(c) for c in self.commands]
+
+
+class _FakeRedis:
+    def __init__(self, values=None):
+        self.values = values or {}
+        self.round_trips = []
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def register_script(self, source):
+        class _Script:
+            sha = "sha"
+        return _Script()
+
+    def reply(self, command):
+        if command[0] == "GET":
+            return self.values.get(command[1])
+        if command[0] == "EVALSHA":
+            return None  # summary not built
+        if command[0] == "EXISTS":
+            return 1
+        if command[0] == "SISMEMBER":
+            return 1
+        return ResponseError("unknown")
+
+
+async def test_concurrent_reads_share_one_round_trip_and_errors_stay_per_command():
+    redis = _FakeRedis({"a": b"1"})
+    batch = RedisBatcher(redis)
+
+    async def nested():
+        await asyncio.sleep(0)
+        return await batch.get("b")
+
+    a, b, bad = await asyncio.gather(batch.get("a"), nested(), batch._queue("NOPE"), return_exceptions=True)
+
+    assert (a, b) == (b"1", None)
+    assert isinstance(bad, ResponseError)
+    assert len(redis.round_trips) == 1
+
+
+async def test_ask_ownership_and_cache_reads_are_one_round_trip():
+    from app import cache as two_tier
+    from app.services import auth_service, embeddings, mastery_index, quota
+    from app.services.rag import RAGPipeline
+
+    redis = _FakeRedis()
+    child_id = uuid4()
+    with patch.object(auth_service, "get_redis", return_value=redis), \
+            patch.object(embeddings, "get_redis", return_value=redis), \
+            patch.object(two_tier, "get_redis", return_value=redis), \
+            patch.object(mastery_index, "get_redis", return_value=redis), \
+            patch.object(quota, "get_redis", return_value=redis):
+        owned, cache = await asyncio.gather(
+            auth_service.caregiver_owns_child(None, uuid4(), child_id),
+            RAGPipeline().read_cache(child_id, "what is 2+2?"),
+        )
+
+    assert owned is True
+    assert cache.embedding is None and cache.rules is None and cache.mastery is None
+    [commands] = redis.round_trips
+    assert sorted(c[0] for c in commands) == ["EVALSHA", "EXISTS", "GET", "GET", "GET", "GET", "GET", "GET", "SISMEMBER"]
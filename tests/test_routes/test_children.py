@@ -31,3 +31,25 @@ async def test_register_and_get_child(async_client: AsyncClient):
         data = r2.json()
         assert "child_id" in data
         assert data["full_name"] == "Child One"
+
+
+async def test_profile_revalidation_is_answered_without_the_database():
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from uuid import uuid4
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from app.etag import child_etag
+    from app.models import Caregiver
+    from app.routers.children import get_child_profile
+
+    child_id = uuid4()
+    etag = child_etag(child_id, 3, "profile")
+    request = Request({"type": "http", "headers": [(b"if-none-match", etag.encode())]})
+    request.state.db = MagicMock(execute=AsyncMock())
+    with patch("app.services.auth_service.caregiver_owns_child", AsyncMock(return_value=True)) as owns, \
+            patch("app.routers.children.get_child_version", AsyncMock(return_value=3)):
+        response = await get_child_profile(child_id, request, Response(), Caregiver(caregiver_id=uuid4()))
+
+    assert response.status_code == 304
+    owns.assert_awaited_once()
+    request.state.db.execute.assert_not_awaited()
@@ -21,3 +21,31 @@ async def test_ask_returns_ui_directives():
         # Call would need db, child_id, session_id, input_text
         # We only test that the pipeline returns the right shape
         assert mock_ask.return_value[2].get("screen_reader") is True
+
+
+async def test_feedback_batch_applies_repeated_topics_in_order():
+    from unittest.mock import MagicMock
+    from uuid import uuid4
+    from app.services.mastery import FeedbackItem, MasteryService
+
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[])))
+    db.info = {}
+    svc = MasteryService()
+    items = [
+        FeedbackItem(uuid4(), "fractions", 3, 0.8, "POSITIVE"),
+        FeedbackItem(uuid4(), "decimals", 1, 0.2, "CONFUSED"),
+        FeedbackItem(uuid4(), "fractions", 4, 0.9, "EXCITED"),
+    ]
+    with patch("app.services.mastery.load_weights", AsyncMock(return_value=None)):
+        outcomes = await svc.apply_feedback(db, uuid4(), items)
+
+    assert [o.topic for o in outcomes] == ["fractions", "decimals", "fractions"]
+    assert outcomes[0].mastery_level == pytest.approx(0.6)  # first review: 0.2 * rating
+    assert outcomes[2].mastery_level == 1.0  # second review: + 0.1 * rating, capped
+    assert outcomes[2].next_review_days >= outcomes[0].next_review_days  # same-day review: no stability gain
+    assert outcomes[1].next_review_days == 1
+    # select, mastery upsert, review log insert, interaction update
+    assert db.execute.await_count == 4
+    # Redis summary is updated only after the request's transaction commits
+    assert len(db.info["after_commit"]) == 1
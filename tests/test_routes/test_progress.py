@@ -15,3 +15,205 @@ def test_progress_schemas():
     )
     assert r.child_id == uid
     assert r.total_sessions == 0
+
+
+def test_timeline_etag_matches_if_none_match():
+    from starlette.requests import Request
+    from app.etag import make_etag, etag_matches
+
+    payload = {"child_id": "c1", "days": 30, "timeline": [{"date": "2026-01-01", "interactions": 3, "avg_engagement": 0.5}]}
+    etag = make_etag(payload)
+    assert etag == make_etag(dict(reversed(list(payload.items()))))
+
+    def req(value):
+        headers = [(b"if-none-match", value.encode())] if value is not None else []
+        return Request({"type": "http", "headers": headers})
+
+    assert etag_matches(req(etag), etag)
+    assert etag_matches(req(f'"other", {etag.removeprefix("W/")}'), etag)
+    assert not etag_matches(req('W/"stale"'), etag)
+    assert not etag_matches(req(None), etag)
+
+
+def test_snapshot_records_round_trip_to_response():
+    import json
+    from dataclasses import asdict
+    from datetime import datetime, timezone
+    from uuid import uuid4
+    from app.models import MasteryRecord
+    from app.schemas.progress import MasteryRecordResponse
+    from app.services.progress import ProgressSnapshot, _record_dict
+
+    rec = MasteryRecord(
+        mastery_id=uuid4(), child_id=uuid4(), topic="fractions", mastery_level=0.4,
+        stability=3.1, difficulty=5.0, last_reviewed=datetime.now(timezone.utc),
+        next_review_due=None, review_count=2, updated_at=datetime.now(timezone.utc),
+    )
+    snap = ProgressSnapshot(total_sessions=3, total_interactions=12, mastery_records=[_record_dict(rec)])
+    cached = ProgressSnapshot(**json.loads(json.dumps(asdict(snap))))
+    out = MasteryRecordResponse(**cached.mastery_records[0])
+    assert out.mastery_id == rec.mastery_id
+    assert out.next_review_due is None
+    assert cached.total_interactions == 12
+
+
+def test_child_etag_tracks_change_version():
+    from uuid import uuid4
+    from app.etag import child_etag
+
+    cid = uuid4()
+    assert child_etag(cid, 3, "dashboard") == child_etag(cid, 3, "dashboard")
+    assert child_etag(cid, 3, "dashboard") != child_etag(cid, 4, "dashboard")
+    assert child_etag(cid, 3, "dashboard") != child_etag(cid, 3, "mastery")
+    assert child_etag(cid, None, "dashboard") is None
+
+
+async def test_mastery_summary_falls_back_to_database_without_redis():
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import AsyncMock, patch
+    from uuid import uuid4
+    from app.services.mastery_index import MasteryIndex, TopicState
+
+    now = datetime.now(timezone.utc)
+    index = MasteryIndex()
+    rows = [
+        TopicState("fractions", now - timedelta(days=1), 0.4, 2.0),
+        TopicState("decimals", now + timedelta(days=3), 0.7, 9.0),
+    ]
+    with patch("app.services.mastery_index.get_redis", return_value=None), \
+            patch.object(index, "_load", AsyncMock(return_value=rows)):
+        summary = await index.summary(None, uuid4(), now)
+    assert [d.topic for d in summary.due] == ["fractions"]
+    assert summary.weak_topics == ["fractions"]
+    assert summary.topic_count == 2
+    assert summary.avg_mastery == pytest.approx(0.55)
+
+
+class _RecordingSession:
+    """Collects executed statements and answers them from `results` in order."""
+
+    def __init__(self, *results):
+        self.statements = []
+        self._results = list(results)
+
+    async def execute(self, statement):
+        from unittest.mock import MagicMock
+
+        self.statements.append(statement)
+        rows = self._results.pop(0)
+        return MagicMock(all=MagicMock(return_value=rows), fetchall=MagicMock(return_value=rows), one=MagicMock(return_value=rows[0]))
+
+
+def _postgres(statement):
+    from sqlalchemy.dialects import postgresql
+
+    compiled = statement.compile(dialect=postgresql.dialect())
+    return " ".join(str(compiled).split()), compiled.params
+
+
+async def test_snapshot_is_one_statement_over_counters_rollup_and_mastery():
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import patch
+    from uuid import uuid4
+    from app.constants import PROGRESS_REPORT_PERIOD_DAYS
+    from app.models import MasteryRecord
+    from app.services.progress import ProgressService
+
+    child_id = uuid4()
+    rec = MasteryRecord(mastery_id=uuid4(), child_id=child_id, topic="fractions", mastery_level=0.4, review_count=2)
+    db = _RecordingSession([(5, 40, 2, 9, rec)])
+    with patch("app.services.progress.get_redis", return_value=None):
+        snap = await ProgressService().snapshot(db, child_id, None)
+    since = datetime.now(timezone.utc) - timedelta(days=PROGRESS_REPORT_PERIOD_DAYS)
+
+    [statement] = db.statements
+    sql, params = _postgres(statement)
+    assert sql.startswith("SELECT child_profiles.session_count, child_profiles.interaction_count, (SELECT count(*)")
+    assert (
+        "FROM learning_sessions WHERE learning_sessions.child_id = %(child_id_1)s::UUID "
+        "AND learning_sessions.started_at >= %(started_at_1)s::TIMESTAMP WITH TIME ZONE"
+    ) in sql
+    assert (
+        "(SELECT coalesce(sum(interactions_daily.interactions), %(coalesce_2)s::INTEGER) AS coalesce_1 "
+        "FROM interactions_daily WHERE interactions_daily.child_id = %(child_id_2)s::UUID "
+        "AND interactions_daily.day >= %(day_1)s::TIMESTAMP WITH TIME ZONE)"
+    ) in sql
+    assert sql.endswith(
+        "FROM child_profiles LEFT OUTER JOIN mastery_records ON mastery_records.child_id = child_profiles.child_id "
+        "WHERE child_profiles.child_id = %(child_id_3)s::UUID"
+    )
+    assert params["child_id_1"] == params["child_id_2"] == params["child_id_3"] == child_id
+    assert abs(params["started_at_1"] - since) < timedelta(seconds=5)
+    # Rollup rows are bucketed by UTC day, so the period starts at midnight
+    assert params["day_1"] == params["started_at_1"].replace(hour=0, minute=0, second=0, microsecond=0)
+    assert params["coalesce_2"] == 0
+
+    assert (snap.total_sessions, snap.total_interactions, snap.period_sessions, snap.period_interactions) == (5, 40, 2, 9)
+    assert [r["topic"] for r in snap.mastery_records] == ["fractions"]
+
+
+async def test_timeline_reads_closed_days_from_rollup_and_today_live():
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import patch
+    from uuid import uuid4
+    from app.services.progress import ProgressService
+
+    child_id = uuid4()
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    db = _RecordingSession([(yesterday, 4, 0.5)], [(2, 0.75)])
+    with patch("app.services.progress.get_redis", return_value=None):
+        payload = await ProgressService().timeline(db, child_id, 7, None)
+
+    rollup, live = (_postgres(s) for s in db.statements)
+    assert rollup[0] == (
+        "SELECT interactions_daily.day, interactions_daily.interactions, interactions_daily.avg_engagement "
+        "FROM interactions_daily WHERE interactions_daily.child_id = %(child_id_1)s::UUID "
+        "AND interactions_daily.day >= %(day_1)s::TIMESTAMP WITH TIME ZONE "
+        "AND interactions_daily.day < %(day_2)s::TIMESTAMP WITH TIME ZONE ORDER BY interactions_daily.day ASC"
+    )
+    assert rollup[1] == {"child_id_1": child_id, "day_1": today - timedelta(days=7), "day_2": today}
+    assert live[0] == (
+        "SELECT count(interactions.interaction_id) AS count_1, avg(interactions.engagement_score) AS avg_1 "
+        "FROM interactions WHERE interactions.child_id = %(child_id_1)s::UUID "
+        "AND interactions.ts >= %(ts_1)s::TIMESTAMP WITH TIME ZONE"
+    )
+    assert live[1] == {"child_id_1": child_id, "ts_1": today}
+    assert payload["timeline"] == [
+        {"date": yesterday.date().isoformat(), "interactions": 4, "avg_engagement": 0.5},
+        {"date": today.date().isoformat(), "interactions": 2, "avg_engagement": 0.75},
+    ]
+
+
+async def test_session_signals_weights_bucket_averages_by_count():
+    from uuid import uuid4
+    from app.services.timescale import session_signals
+
+    session_id = uuid4()
+    db = _RecordingSession([("FRUSTRATION", 3, 0.5, 0.1, 0.9)])
+    assert await session_signals(db, session_id) == [
+        {"signal_type": "FRUSTRATION", "signals": 3, "avg_value": 0.5, "min_value": 0.1, "max_value": 0.9}
+    ]
+    sql, params = _postgres(db.statements[0])
+    assert sql == (
+        "SELECT session_signal_summary.signal_type, sum(session_signal_summary.signals) AS sum_1, "
+        "sum(session_signal_summary.avg_value * session_signal_summary.signals) "
+        "/ CAST(nullif(sum(session_signal_summary.signals), %(nullif_1)s::INTEGER) AS NUMERIC) AS anon_1, "
+        "min(session_signal_summary.min_value) AS min_1, max(session_signal_summary.max_value) AS max_1 "
+        "FROM session_signal_summary WHERE session_signal_summary.session_id = %(session_id_1)s::UUID "
+        "GROUP BY session_signal_summary.signal_type"
+    )
+    assert params == {"nullif_1": 0, "session_id_1": session_id}
+
+
+def test_aggregate_readers_match_the_migrated_views():
+    import re
+    from pathlib import Path
+    from app.services.timescale import interactions_daily, session_signal_summary
+
+    migration = (Path(__file__).parents[2] / "migrations/versions/003_timescale_policies.py").read_text()
+    for view in (interactions_daily, session_signal_summary):
+        select_list = re.search(rf"CREATE MATERIALIZED VIEW {view.name}\b.*?\bSELECT\b(.*?)\bFROM\b", migration, re.S)
+        # One output column per line: "child_id," or "count(*) AS interactions,"
+        selected = {line.strip().rstrip(",").split()[-1] for line in select_list.group(1).strip().splitlines()}
+        assert {c.name for c in view.c} <= selected, view.name
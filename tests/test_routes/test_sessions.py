@@ -0,0 +1,83 @@
+"""Session route tests (mock DB and Redis)."""
+
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Caregiver, ChildProfile
+from app.models.child import ChildDisability
+from app.routers.sessions import start_sessions_batch
+from app.schemas.session import SessionStartBatchRequest
+
+
+def _result(rows):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    result.all.return_value = rows
+    return result
+
+
+def _request(*results):
+    db = MagicMock(info={})
+    db.execute = AsyncMock(side_effect=list(results))
+    return MagicMock(state=MagicMock(db=db)), db
+
+
+def _pipeline():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(pipeline=MagicMock(return_value=pipe)), pipe
+
+
+async def test_start_batch_is_one_query_per_table_and_one_pipeline():
+    caregiver = Caregiver(caregiver_id=uuid4())
+    children = [
+        ChildProfile(child_id=uuid4(), caregiver_id=caregiver.caregiver_id, full_name=f"C{i}", date_of_birth=date(2015, 1, 1))
+        for i in range(3)
+    ]
+    disability = ChildDisability(child_id=children[1].child_id, disability_type="CHRONIC_FATIGUE", accommodations={})
+    session_ids = {c.child_id: uuid4() for c in children}
+    request, db = _request(
+        _result(children),
+        _result([]),
+        _result([disability]),
+        _result(list(session_ids.items())),
+        _result([]),
+    )
+    redis, pipe = _pipeline()
+    ids = [c.child_id for c in children]
+    with patch("app.routers.sessions.get_redis", return_value=redis), \
+            patch("app.cache.get_redis", return_value=None):
+        response = await start_sessions_batch(
+            SessionStartBatchRequest(child_ids=[*ids, ids[0]]), request, caregiver
+        )
+        # Nothing reaches Redis before the sessions are committed
+        pipe.execute.assert_not_awaited()
+        for hook in db.info["after_commit"]:
+            await hook()
+
+    assert [s.child_id for s in response.sessions] == ids
+    assert [s.session_id for s in response.sessions] == [session_ids[i] for i in ids]
+    assert response.sessions[1].session_constraints["max_session_mins"] == 20
+    assert response.sessions[0].session_constraints["max_session_mins"] == 60
+    # children, neuro profiles, disabilities, sessions insert, session_count update
+    assert db.execute.await_count == 5
+    # Active flags and version bumps: one pipeline
+    assert pipe.set.call_count == 3
+    assert [c.args[0] for c in pipe.incr.call_args_list] == [f"child:ver:{i}" for i in ids]
+    pipe.execute.assert_awaited_once()
+
+
+async def test_start_batch_refuses_children_of_another_caregiver():
+    caregiver = Caregiver(caregiver_id=uuid4())
+    own = ChildProfile(child_id=uuid4(), caregiver_id=caregiver.caregiver_id, full_name="Own", date_of_birth=date(2015, 1, 1))
+    request, db = _request(_result([own]))
+    with pytest.raises(HTTPException) as exc:
+        await start_sessions_batch(SessionStartBatchRequest(child_ids=[own.child_id, uuid4()]), request, caregiver)
+    assert exc.value.status_code == 404
+    assert db.execute.await_count == 1
@@ -0,0 +1,68 @@
+"""UsageMeter tests: counts stay in process until a flush writes them in one pipeline."""
+
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.usage import UsageMeter, attribute_usage
+
+
+def _redis():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    return redis, pipe
+
+
+async def test_records_batch_into_one_pipeline():
+    redis, pipe = _redis()
+    child_id, caregiver_id = uuid.uuid4(), uuid.uuid4()
+    meter = UsageMeter()
+    with patch("app.usage.get_redis", return_value=redis):
+        attribute_usage(child_id=child_id, caregiver_id=caregiver_id)
+        for _ in range(3):
+            meter.record("llm")
+        meter.record("llm", -1)
+        pipe.execute.assert_not_called()
+
+        await meter.flush()
+
+    redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.execute.assert_awaited_once()
+    [(minute_key, n)] = [c.args for c in pipe.incrby.call_args_list]
+    assert minute_key.startswith("usage:llm:minute:") and n == 2
+    hashes = {c.args[0].split(":")[2]: c.args[1:] for c in pipe.hincrby.call_args_list}
+    assert hashes == {"child": (str(child_id), 2), "caregiver": (str(caregiver_id), 2)}
+    assert pipe.expire.call_count == 3
+
+
+async def test_failed_flush_keeps_counts_and_stop_flushes():
+    redis, pipe = _redis()
+    pipe.execute.side_effect = [ConnectionError("down"), []]
+    meter = UsageMeter()
+    with patch("app.usage.get_redis", return_value=redis):
+        attribute_usage()
+        meter.start()
+        meter.record("embed")
+        await meter.flush()
+        await meter.stop()
+
+    assert pipe.execute.await_count == 2
+    assert pipe.incrby.call_args.args[1] == 1
+
+
+async def test_hedge_claims_always_carry_a_ttl(monkeypatch):
+    import fakeredis
+    from app.config import get_settings
+    from app.usage import USAGE_KEY_LLM, USAGE_KEY_LLM_HEDGE, reserve_llm_hedge, usage_key
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_daily_limit", 100)
+    monkeypatch.setattr(settings, "llm_hedge_budget_fraction", 0.02)
+    redis = fakeredis.FakeAsyncRedis()
+    with patch("app.usage.get_redis", return_value=redis):
+        assert [await reserve_llm_hedge() for _ in range(3)] == [True, True, False]
+        assert await redis.ttl(usage_key(USAGE_KEY_LLM_HEDGE)) > 0
+        await redis.set(usage_key(USAGE_KEY_LLM), 100)
+        await redis.delete(usage_key(USAGE_KEY_LLM_HEDGE))
+        assert await reserve_llm_hedge() is False